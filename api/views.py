@@ -5,8 +5,8 @@ from django_filters import rest_framework as filters
 from rest_framework import viewsets, renderers
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
-from rest_framework_extensions.cache.mixins import CacheResponseMixin
 
+from bestiary.cache import GameDataCacheResponseMixin
 from bestiary.models import Monster, Skill, LeaderSkill, SkillEffect, Source
 from herders.models import RuneCraftInstance, MonsterInstance, RuneInstance, TeamGroup, Team, Summoner, ArtifactInstance
 from .serializers import MonsterSerializer, MonsterSummarySerializer, MonsterSkillSerializer, \
@@ -26,7 +26,7 @@ class BestiarySetPagination(PageNumberPagination):
 
 
 # Django REST framework views
-class MonsterViewSet(CacheResponseMixin, viewsets.ReadOnlyModelViewSet):
+class MonsterViewSet(GameDataCacheResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Monster.objects.all()
     renderer_classes = (renderers.BrowsableAPIRenderer, renderers.JSONRenderer)
     filter_backends = (filters.DjangoFilterBackend,)
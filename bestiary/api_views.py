@@ -1,13 +1,13 @@
 from django_filters import rest_framework as filters
 from rest_framework import viewsets
 from rest_framework.filters import OrderingFilter
-from rest_framework_extensions.cache.mixins import CacheResponseMixin
 
 from bestiary import api_filters, models, pagination, serializers
+from bestiary.cache import GameDataCacheResponseMixin
 
 
 # Django REST framework views
-class MonsterViewSet(CacheResponseMixin, viewsets.ReadOnlyModelViewSet):
+class MonsterViewSet(GameDataCacheResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = models.Monster.objects.all().select_related('leader_skill').prefetch_related(
         'skills',
         'skills__effect',
@@ -47,7 +47,7 @@ class MonsterViewSet(CacheResponseMixin, viewsets.ReadOnlyModelViewSet):
     )
 
 
-class MonsterSkillViewSet(CacheResponseMixin, viewsets.ReadOnlyModelViewSet):
+class MonsterSkillViewSet(GameDataCacheResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = models.Skill.objects.all().prefetch_related(
         'upgrades',
         'scaling_stats',
@@ -70,26 +70,26 @@ class MonsterSkillViewSet(CacheResponseMixin, viewsets.ReadOnlyModelViewSet):
     )
 
 
-class MonsterLeaderSkillViewSet(CacheResponseMixin, viewsets.ReadOnlyModelViewSet):
+class MonsterLeaderSkillViewSet(GameDataCacheResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = models.LeaderSkill.objects.all().order_by('pk')
     serializer_class = serializers.LeaderSkillSerializer
     pagination_class = pagination.BestiarySetPagination
     # TODO: Add filters
 
 
-class MonsterSkillEffectViewSet(CacheResponseMixin, viewsets.ReadOnlyModelViewSet):
+class MonsterSkillEffectViewSet(GameDataCacheResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = models.SkillEffect.objects.all().order_by('pk')
     serializer_class = serializers.SkillEffectSerializer
     pagination_class = pagination.BestiarySetPagination
 
 
-class MonsterSourceViewSet(CacheResponseMixin, viewsets.ReadOnlyModelViewSet):
+class MonsterSourceViewSet(GameDataCacheResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = models.Source.objects.all().order_by('pk')
     serializer_class = serializers.SourceSerializer
     pagination_class = pagination.BestiarySetPagination
 
 
-class HomunculusSkillViewSet(CacheResponseMixin, viewsets.ReadOnlyModelViewSet):
+class HomunculusSkillViewSet(GameDataCacheResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = models.HomunculusSkill.objects.all().order_by('pk').prefetch_related(
         'skill',
         'skill__monster_set',
@@ -104,13 +104,13 @@ class HomunculusSkillViewSet(CacheResponseMixin, viewsets.ReadOnlyModelViewSet):
     pagination_class = pagination.BestiarySetPagination
 
 
-class GameItemViewSet(CacheResponseMixin, viewsets.ReadOnlyModelViewSet):
+class GameItemViewSet(GameDataCacheResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = models.GameItem.objects.all()
     serializer_class = serializers.GameItemSerializer
     pagination_class = pagination.BestiarySetPagination
 
 
-class FusionViewSet(CacheResponseMixin, viewsets.ReadOnlyModelViewSet):
+class FusionViewSet(GameDataCacheResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = models.Fusion.objects.all().prefetch_related(
         'ingredients',
     ).order_by('pk')
@@ -118,19 +118,19 @@ class FusionViewSet(CacheResponseMixin, viewsets.ReadOnlyModelViewSet):
     pagination_class = pagination.BestiarySetPagination
 
 
-class BuildingViewSet(CacheResponseMixin, viewsets.ReadOnlyModelViewSet):
+class BuildingViewSet(GameDataCacheResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = models.Building.objects.all().order_by('pk')
     serializer_class = serializers.BuildingSerializer
     pagination_class = pagination.BestiarySetPagination
 
 
-class DungeonViewSet(CacheResponseMixin, viewsets.ReadOnlyModelViewSet):
+class DungeonViewSet(GameDataCacheResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = models.Dungeon.objects.all().order_by('pk').prefetch_related('level_set')
     serializer_class = serializers.DungeonSerializer
     pagination_class = pagination.BestiarySetPagination
 
 
-class LevelViewSet(CacheResponseMixin, viewsets.ReadOnlyModelViewSet):
+class LevelViewSet(GameDataCacheResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = models.Level.objects.all().order_by('pk')
     serializer_class = serializers.LevelSerializer
     pagination_class = pagination.BestiarySetPagination
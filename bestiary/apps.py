@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class BestiaryConfig(AppConfig):
+    name = 'bestiary'
+
+    def ready(self):
+        import bestiary.signals #noqa
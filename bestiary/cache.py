@@ -0,0 +1,135 @@
+import time
+
+from django.core.cache import caches
+from django.dispatch import Signal
+from rest_framework_extensions.cache.decorators import CacheResponse
+from rest_framework_extensions.cache.mixins import BaseCacheResponseMixin
+from rest_framework_extensions.key_constructor import bits
+from rest_framework_extensions.key_constructor.constructors import (
+    DefaultObjectKeyConstructor,
+    DefaultListKeyConstructor,
+)
+
+# Bestiary data only changes when game data is parsed, so it is cached without expiry under keys that include a game
+# data version. parse_game_data bumps the version, which orphans every cached entry at once.
+#
+# Reads of cached game data and bestiary API responses go through two tiers: the in-process LRU cache ('local') in
+# front of the shared cache ('default'). Monsters, items and levels looked up by com2us ID are kept in process by
+# bestiary.registry instead. The version itself is kept in the local cache for a short time, so other processes pick
+# up a bump within VERSION_TIMEOUT.
+#
+# Versions start from the current time in milliseconds, so a version key lost by the shared cache is never recreated
+# with a version some process has already seen.
+
+VERSION_KEY = 'bestiary-game-data-version'
+VERSION_TIMEOUT = 60
+
+# Sent with the new version after this process bumps it
+game_data_changed = Signal(providing_args=['version'])
+
+
+def _local():
+    return caches['local']
+
+
+def _shared():
+    return caches['default']
+
+
+def _new_version():
+    return int(time.time() * 1000)
+
+
+def game_data_version():
+    version = _local().get(VERSION_KEY)
+    if version is None:
+        version = _shared().get_or_set(VERSION_KEY, _new_version, timeout=None) or _new_version()
+        _local().set(VERSION_KEY, version, VERSION_TIMEOUT)
+
+    return version
+
+
+def bump_game_data_version():
+    """
+    Invalidate all cached bestiary data, e.g. after parsing new game data.
+    """
+    try:
+        version = _shared().incr(VERSION_KEY)
+    except ValueError:
+        # Not set or evicted
+        version = _new_version()
+        _shared().set(VERSION_KEY, version, timeout=None)
+
+    _local().set(VERSION_KEY, version, VERSION_TIMEOUT)
+    game_data_changed.send(sender=None, version=version)
+    return version
+
+
+def get_game_data(key, default):
+    """
+    Return the cached bestiary data stored under key, calling default() to create and cache it when missing.
+    """
+    versioned_key = f'bestiary-{game_data_version()}-{key}'
+
+    value = _local().get(versioned_key)
+    if value is None:
+        value = _shared().get(versioned_key)
+        if value is None:
+            value = default()
+            _shared().set(versioned_key, value, timeout=None)
+        _local().set(versioned_key, value, timeout=None)
+
+    return value
+
+
+class _GameDataTiers:
+    # Cache interface of drf-extensions over both tiers
+    def get(self, key):
+        value = _local().get(key)
+        if value is None:
+            value = _shared().get(key)
+            if value is not None:
+                _local().set(key, value, timeout=None)
+        return value
+
+    def set(self, key, value, timeout):
+        _shared().set(key, value, timeout)
+        _local().set(key, value, timeout)
+
+
+class GameDataCacheResponse(CacheResponse):
+    """
+    cache_response of drf-extensions reading responses from both tiers.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = _GameDataTiers()
+
+
+class GameDataCacheResponseMixin(BaseCacheResponseMixin):
+    @GameDataCacheResponse(key_func='list_cache_key_func')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @GameDataCacheResponse(key_func='object_cache_key_func')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+class GameDataVersionKeyBit(bits.KeyBitBase):
+    def get_data(self, **kwargs):
+        return game_data_version()
+
+
+class ObjectKeyConstructor(DefaultObjectKeyConstructor):
+    game_data_version = GameDataVersionKeyBit()
+
+
+class ListKeyConstructor(DefaultListKeyConstructor):
+    game_data_version = GameDataVersionKeyBit()
+
+
+# Key functions of the GameDataCacheResponseMixin API views, see REST_FRAMEWORK_EXTENSIONS
+object_cache_key_func = ObjectKeyConstructor()
+list_cache_key_func = ListKeyConstructor()
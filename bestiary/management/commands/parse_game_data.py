@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 
 from bestiary import parse
+from bestiary.cache import bump_game_data_version
 
 
 class Command(BaseCommand):
@@ -44,4 +45,7 @@ class Command(BaseCommand):
         self.stdout.write('Parsing craft materials...')
         parse.craft_materials()
 
+        self.stdout.write('Invalidating cached bestiary data...')
+        bump_game_data_version()
+
         self.stdout.write(self.style.SUCCESS('Done!'))
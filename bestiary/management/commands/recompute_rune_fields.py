@@ -0,0 +1,47 @@
+from time import perf_counter
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from bestiary.rune_efficiency import recompute_rune_fields
+
+RUNE_MODELS = {
+    'instances': ['herders.RuneInstance'],
+    # data_log.RuneDrop is abstract, each log type has its own rune table
+    'drops': [
+        'data_log.DungeonRuneDrop',
+        'data_log.RiftDungeonRuneDrop',
+        'data_log.WishLogRuneDrop',
+        'data_log.MagicBoxCraftRuneDrop',
+        'data_log.WorldBossLogRuneDrop',
+        'data_log.ShopRefreshRuneDrop',
+        'data_log.CraftRuneLog',
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = 'Recompute efficiency, quality and filter fields of stored runes, e.g. after rune stat values change'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help=f'Any of {", ".join(RUNE_MODELS)}. Defaults to all.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        for name in options['models'] or RUNE_MODELS.keys():
+            if name not in RUNE_MODELS:
+                raise CommandError(f'Unknown rune model {name}')
+
+            for label in RUNE_MODELS[name]:
+                model = apps.get_model(label)
+                self.stdout.write(f'Recomputing {label}...')
+
+                start = perf_counter()
+                count = recompute_rune_fields(model.objects.all(), chunk_size=options['chunk_size'])
+                elapsed = perf_counter() - start
+
+                self.stdout.write(f'Updated {count} runes in {elapsed:.1f}s')
+
+            if name == 'instances':
+                # Saved in bulk without the signals that keep summoner statistics up to date
+                apps.get_model('herders.SummonerStatistics').objects.update(stale=True)
@@ -0,0 +1,115 @@
+import threading
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .cache import game_data_changed, game_data_version
+from .models import GameItem, Level, Monster
+
+# Process-wide lookup tables for the bestiary objects referenced by com2us IDs in uploaded game data and logs. The
+# tables are loaded once and reloaded when the game data version changes (see bestiary/cache.py), when this process
+# bumps it or when the caches are reconfigured, e.g. by tests. The objects are shared by every thread in the process
+# and must be treated as read-only.
+
+_registry = None
+_lock = threading.Lock()
+
+
+def _int(value):
+    # Invalid IDs are not in the tables and are passed on to the query, which raises the usual exceptions for them
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@receiver(game_data_changed)
+def reset_registry(**kwargs):
+    global _registry
+    with _lock:
+        _registry = None
+
+
+@receiver(setting_changed)
+def _reset_on_caches_changed(setting, **kwargs):
+    # The game data version of the previous caches says nothing about the tables loaded with it
+    if setting == 'CACHES':
+        reset_registry()
+
+
+def get_registry():
+    global _registry
+    version = game_data_version()
+
+    if _registry is None or _registry.version != version:
+        with _lock:
+            if _registry is None or _registry.version != version:
+                _registry = BestiaryRegistry(version)
+
+    return _registry
+
+
+class BestiaryRegistry:
+    """
+    Monsters, game items and levels indexed by com2us ID.
+
+    Lookups of objects created after the registry was loaded fall back to a query, so they behave the same as the
+    equivalent objects.get() and raise DoesNotExist for unknown IDs.
+    """
+
+    def __init__(self, version):
+        self.version = version
+
+        # Keep the first object in default ordering for duplicated IDs, same as filter(com2us_id=...).first()
+        self.monsters = {}
+        for monster in Monster.objects.filter(com2us_id__isnull=False):
+            self.monsters.setdefault(monster.com2us_id, monster)
+
+        self.items = {}
+        self.items_by_name = {}
+        for item in GameItem.objects.all():
+            self.items.setdefault((item.category, item.com2us_id), item)
+            self.items_by_name.setdefault((item.category, item.name), item)
+
+        self.levels = {}
+        for level in Level.objects.select_related('dungeon'):
+            key = (level.dungeon.category, level.dungeon.com2us_id, level.floor)
+            self.levels.setdefault(key, []).append(level)
+
+    def get_monster(self, com2us_id):
+        monster = self.monsters.get(_int(com2us_id))
+        if monster is None:
+            monster = Monster.objects.get(com2us_id=com2us_id)
+        return monster
+
+    def get_item(self, category, com2us_id):
+        item = self.items.get((_int(category), _int(com2us_id)))
+        if item is None:
+            item = GameItem.objects.get(category=category, com2us_id=com2us_id)
+        return item
+
+    def get_item_by_name(self, category, name):
+        item = self.items_by_name.get((_int(category), name))
+        if item is None:
+            item = GameItem.objects.get(category=category, name=name)
+        return item
+
+    def get_level(self, dungeon_category, dungeon_com2us_id, floor, difficulty=None):
+        """
+        Level of the given dungeon and floor, and also of the given difficulty if specified.
+        """
+        levels = [
+            level for level in self.levels.get((_int(dungeon_category), _int(dungeon_com2us_id), _int(floor)), [])
+            if difficulty is None or level.difficulty == difficulty
+        ]
+        if len(levels) == 1:
+            return levels[0]
+
+        lookup = {
+            'dungeon__category': dungeon_category,
+            'dungeon__com2us_id': dungeon_com2us_id,
+            'floor': floor,
+        }
+        if difficulty is not None:
+            lookup['difficulty'] = difficulty
+        return Level.objects.select_related('dungeon').get(**lookup)
@@ -0,0 +1,217 @@
+import numpy as np
+
+from .models import Rune
+
+# Batch version of Rune.update_fields(). Runes are loaded into columnar arrays so efficiency, max efficiency, quality,
+# filter flags and stat caps of many runes are computed with array operations. Results match update_fields() exactly,
+# including the order of floating point operations. Runes with data update_fields() does not expect (missing values,
+# unknown stats, out of range stars/level) are left to update_fields() itself.
+
+MAX_SUBSTATS = 4
+
+FIELDS = [
+    'has_hp', 'has_atk', 'has_def', 'has_crit_rate', 'has_crit_dmg', 'has_speed', 'has_resist', 'has_accuracy',
+    'quality', 'substat_upgrades_remaining', 'efficiency', 'max_efficiency', 'has_grind', 'has_gem',
+    'main_stat_value', 'innate_stat_value', 'substat_values',
+]
+
+FLAG_STATS = {
+    'has_hp': [Rune.STAT_HP, Rune.STAT_HP_PCT],
+    'has_atk': [Rune.STAT_ATK, Rune.STAT_ATK_PCT],
+    'has_def': [Rune.STAT_DEF, Rune.STAT_DEF_PCT],
+    'has_crit_rate': [Rune.STAT_CRIT_RATE_PCT],
+    'has_crit_dmg': [Rune.STAT_CRIT_DMG_PCT],
+    'has_speed': [Rune.STAT_SPD],
+    'has_resist': [Rune.STAT_RESIST_PCT],
+    'has_accuracy': [Rune.STAT_ACCURACY_PCT],
+}
+
+
+class _Tables:
+    # Lookup arrays indexed by [stat, stars(, level)], rebuilt per call so balance changes to the Rune constants apply
+    def __init__(self):
+        num_stats = max(max(Rune.MAIN_STAT_VALUES), max(Rune.SUBSTAT_INCREMENTS), *Rune.INNATE_STAT_TITLES) + 1
+
+        self.main_values = np.zeros((num_stats, 7, 16), dtype=np.int64)
+        for stat, stars_values in Rune.MAIN_STAT_VALUES.items():
+            for stars, values in stars_values.items():
+                self.main_values[stat, stars, :len(values)] = values
+
+        self.increments = np.zeros((num_stats, 7), dtype=np.int64)
+        for stat, stars_values in Rune.SUBSTAT_INCREMENTS.items():
+            for stars, value in stars_values.items():
+                self.increments[stat, stars] = value
+
+        self.upgrade_stats = np.array(list(Rune.UPGRADE_VALUES.keys()), dtype=np.int64)
+        self.upgrade_values = np.zeros((num_stats, 7), dtype=np.float64)
+        for stat, stars_values in Rune.UPGRADE_VALUES.items():
+            for stars, value in stars_values.items():
+                self.upgrade_values[stat, stars] = value
+
+        self.num_stats = num_stats
+
+
+def _is_supported(rune):
+    return (
+        rune.main_stat in Rune.MAIN_STAT_VALUES
+        and rune.stars in range(1, 7)
+        and rune.level in range(0, 16)
+        and (rune.innate_stat is None or (
+            rune.innate_stat in Rune.SUBSTAT_INCREMENTS and rune.innate_stat_value is not None
+        ))
+        and len(rune.substats) <= MAX_SUBSTATS
+        and len(rune.substat_values) <= MAX_SUBSTATS
+        and len(rune.substats_grind_value) <= MAX_SUBSTATS
+        and len(rune.substat_values) >= len(rune.substats)
+        and all(stat in Rune.SUBSTAT_INCREMENTS for stat in rune.substats)
+        and all(value is not None for value in rune.substat_values)
+        and all(value is not None for value in rune.substats_grind_value)
+    )
+
+
+def _padded(lists, dtype):
+    arr = np.zeros((len(lists), MAX_SUBSTATS), dtype=dtype)
+    for idx, values in enumerate(lists):
+        arr[idx, :len(values)] = values
+    return arr
+
+
+def update_rune_fields(runes):
+    """
+    Set the fields computed by Rune.update_fields() on many rune objects at once. Objects are not saved.
+    """
+    supported = []
+    for rune in runes:
+        if _is_supported(rune):
+            supported.append(rune)
+        else:
+            rune.update_fields()
+
+    if not supported:
+        return
+
+    tables = _Tables()
+    rows = np.arange(len(supported))
+
+    main_stat = np.array([r.main_stat for r in supported], dtype=np.int64)
+    stars = np.array([r.stars for r in supported], dtype=np.int64)
+    level = np.array([r.level for r in supported], dtype=np.int64)
+    main_value = np.array([r.main_stat_value or 0 for r in supported], dtype=np.int64)
+    has_innate = np.array([r.innate_stat is not None for r in supported])
+    innate_stat = np.array([r.innate_stat or 0 for r in supported], dtype=np.int64)
+    innate_value = np.array([r.innate_stat_value or 0 for r in supported], dtype=np.int64)
+
+    substats = _padded([r.substats for r in supported], np.int64)
+    substat_values = _padded([r.substat_values for r in supported], np.int64)
+    grind_values = _padded([r.substats_grind_value for r in supported], np.int64)
+    num_substats = np.array([len(r.substats) for r in supported], dtype=np.int64)
+    # Efficiency zips substats with values and grinds, which stops at the shortest list
+    num_zipped = np.array([
+        min(len(r.substats), len(r.substat_values), len(r.substats_grind_value)) for r in supported
+    ], dtype=np.int64)
+    slot_idx = np.arange(MAX_SUBSTATS)
+    substat_mask = slot_idx < num_substats[:, None]
+    zipped_mask = slot_idx < num_zipped[:, None]
+
+    # Filter flags
+    in_substats = np.zeros((len(supported), tables.num_stats), dtype=bool)
+    for slot in range(MAX_SUBSTATS):
+        mask = substat_mask[:, slot]
+        in_substats[rows[mask], substats[mask, slot]] = True
+
+    present = in_substats.copy()
+    present[rows, main_stat] = True
+    present[rows[has_innate], innate_stat[has_innate]] = True
+
+    flags = {field: present[:, stats].any(axis=1) for field, stats in FLAG_STATS.items()}
+
+    quality = num_substats
+    upgrades_received = np.minimum(level, 12) // 3
+    upgrades_remaining = 4 - upgrades_received
+    has_grind = (grind_values != 0).sum(axis=1)
+    has_gem = np.array([any(r.substats_enchanted) for r in supported])
+
+    # Efficiency, summed in the same order as Rune.get_efficiency()
+    efficiency = tables.main_values[main_stat, stars, 15] / tables.main_values[main_stat, 6, 15]
+    innate_divisor = (tables.increments[innate_stat, 6] * 5).astype(np.float64)
+    efficiency = efficiency + np.where(has_innate, innate_value / np.where(has_innate, innate_divisor, 1.0), 0.0)
+    for slot in range(MAX_SUBSTATS):
+        mask = zipped_mask[:, slot]
+        divisor = (tables.increments[substats[:, slot], 6] * 5).astype(np.float64)
+        term = (substat_values[:, slot] + grind_values[:, slot]) / np.where(mask, divisor, 1.0)
+        efficiency = efficiency + np.where(mask, term, 0.0)
+    efficiency = efficiency / 2.8 * 100
+
+    # Max efficiency, as Rune.get_max_efficiency()
+    new_stats = np.minimum(4 - num_substats, upgrades_remaining)
+    old_stats = upgrades_remaining - new_stats
+
+    substat_upgrades = np.where(substat_mask, tables.upgrade_values[substats, stars[:, None]], 0.0)
+    best_stat = np.maximum(substat_upgrades.max(axis=1), 0)
+    max_efficiency = efficiency + np.where(old_stats > 0, best_stat * old_stats * 0.2 / 2.8 * 100, 0.0)
+
+    available = tables.upgrade_values[tables.upgrade_stats[None, :], stars[:, None]]
+    # Stats already on the rune sort last and are never summed, as there are always enough other stats
+    available = np.where(in_substats[:, tables.upgrade_stats], 0.0, available)
+    top_sums = np.cumsum(-np.sort(-available, axis=1), axis=1)
+    new_sum = top_sums[rows, np.maximum(new_stats - 1, 0)]
+    max_efficiency = max_efficiency + np.where(new_stats > 0, new_sum * 0.2 / 2.8 * 100, 0.0)
+
+    # Stat caps
+    main_cap = tables.main_values[main_stat, stars, level]
+    main_value = np.where(main_value != 0, np.minimum(main_cap, main_value), main_cap)
+    innate_cap = tables.increments[innate_stat, stars]
+    capped_innate = (innate_stat != 0) & (innate_value != 0) & (innate_value > innate_cap)
+    substat_caps = tables.increments[substats, stars[:, None]] * (upgrades_received[:, None] + 1)
+    capped_substats = substat_mask & (substat_values > substat_caps)
+    substat_values = np.where(capped_substats, substat_caps, substat_values)
+
+    results = {
+        **{field: values.tolist() for field, values in flags.items()},
+        'quality': quality.tolist(),
+        'substat_upgrades_remaining': upgrades_remaining.tolist(),
+        'efficiency': efficiency.tolist(),
+        'max_efficiency': max_efficiency.tolist(),
+        'has_grind': has_grind.tolist(),
+        'has_gem': has_gem.tolist(),
+        'main_stat_value': main_value.tolist(),
+    }
+    innate_caps = innate_cap.tolist()
+    capped_innate = capped_innate.tolist()
+    capped_substat_values = substat_values.tolist()
+    capped_rows = capped_substats.any(axis=1).tolist()
+
+    for idx, rune in enumerate(supported):
+        for field, values in results.items():
+            setattr(rune, field, values[idx])
+
+        if capped_innate[idx]:
+            rune.innate_stat_value = innate_caps[idx]
+
+        if capped_rows[idx]:
+            rune.substat_values[:len(rune.substats)] = capped_substat_values[idx][:len(rune.substats)]
+
+
+def recompute_rune_fields(queryset, chunk_size=2000, batch_size=500):
+    """
+    Recompute update_fields() values for every rune in the queryset and save them, in primary key ordered chunks.
+
+    :return: Number of runes updated
+    """
+    count = 0
+    last_pk = None
+    queryset = queryset.order_by('pk')
+
+    while True:
+        chunk_qs = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        runes = list(chunk_qs[:chunk_size])
+        if not runes:
+            break
+
+        update_rune_fields(runes)
+        queryset.model.objects.bulk_update(runes, FIELDS, batch_size=batch_size)
+
+        count += len(runes)
+        last_pk = runes[-1].pk
+
+    return count
@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import bump_game_data_version
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_game_data(sender, **kwargs):
+    # Edits outside of parse_game_data, e.g. in the admin or placeholders created while parsing logs
+    if sender._meta.app_label == 'bestiary':
+        _bump_on_commit()
+
+
+def _bump_on_commit():
+    # Bumped once the changes are visible to other processes, and once per transaction however many rows it writes.
+    # Callbacks of rolled back transactions and savepoints are discarded, so the pending check resets with them.
+    connection = transaction.get_connection()
+    if not any(func is bump_game_data_version for _, func in connection.run_on_commit):
+        transaction.on_commit(bump_game_data_version)
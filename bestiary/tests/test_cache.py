@@ -0,0 +1,60 @@
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from bestiary import cache
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'shared'},
+    'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'local'},
+})
+class GameDataCacheTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['local'].clear()
+        self.calls = 0
+
+    def _load(self):
+        self.calls += 1
+        return ['data']
+
+    def test_cached_in_both_tiers(self):
+        self.assertEqual(cache.get_game_data('test', self._load), ['data'])
+        self.assertEqual(cache.get_game_data('test', self._load), ['data'])
+        self.assertEqual(self.calls, 1)
+
+        # Another process starts with an empty local cache
+        caches['local'].clear()
+        self.assertEqual(cache.get_game_data('test', self._load), ['data'])
+        self.assertEqual(self.calls, 1)
+
+    def test_bump_version_invalidates(self):
+        cache.get_game_data('test', self._load)
+        version = cache.game_data_version()
+
+        self.assertEqual(cache.bump_game_data_version(), version + 1)
+        cache.get_game_data('test', self._load)
+        self.assertEqual(self.calls, 2)
+
+    def test_bump_version_after_eviction(self):
+        cache.get_game_data('test', self._load)
+        caches['default'].clear()
+
+        cache.bump_game_data_version()
+        cache.get_game_data('test', self._load)
+        self.assertEqual(self.calls, 2)
+
+    def test_responses_cached_in_both_tiers(self):
+        tiers = cache.GameDataCacheResponse().cache
+        tiers.set('response', 'content', 60)
+
+        # Served by the local tier without reaching the shared cache
+        caches['default'].clear()
+        self.assertEqual(tiers.get('response'), 'content')
+
+        # Another process fills its local tier from the shared cache
+        caches['default'].set('response', 'shared content')
+        caches['local'].clear()
+        self.assertEqual(tiers.get('response'), 'shared content')
+        caches['default'].clear()
+        self.assertEqual(tiers.get('response'), 'shared content')
@@ -0,0 +1,99 @@
+from django.core.cache import caches
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from bestiary.cache import bump_game_data_version, game_data_version
+from bestiary.models import Dungeon, GameItem, Level, Monster
+from bestiary.registry import BestiaryRegistry, get_registry
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'shared'},
+    'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'local'},
+}
+
+
+@override_settings(CACHES=CACHES)
+class RegistryTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['local'].clear()
+
+        self.item = GameItem.objects.create(category=GameItem.CATEGORY_CURRENCY, com2us_id=1, name='Crystal')
+        dungeon = Dungeon.objects.create(category=Dungeon.CATEGORY_SCENARIO, com2us_id=1, name='Garen Forest')
+        self.normal = Level.objects.create(dungeon=dungeon, floor=1, difficulty=Level.DIFFICULTY_NORMAL)
+        self.hard = Level.objects.create(dungeon=dungeon, floor=1, difficulty=Level.DIFFICULTY_HARD)
+
+    def test_lookups_without_queries(self):
+        registry = get_registry()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(registry.get_item(GameItem.CATEGORY_CURRENCY, '1'), self.item)
+            self.assertEqual(registry.get_item_by_name(GameItem.CATEGORY_CURRENCY, 'Crystal'), self.item)
+            level = registry.get_level(Dungeon.CATEGORY_SCENARIO, 1, 1, difficulty=Level.DIFFICULTY_HARD)
+            self.assertEqual(level, self.hard)
+            self.assertEqual(str(level), str(self.hard))
+
+    def test_reset_on_bump(self):
+        registry = get_registry()
+        bump_game_data_version()
+
+        self.assertIsNot(get_registry(), registry)
+
+    def test_reset_on_caches_changed(self):
+        # Rows of the rolled back setUp of an earlier test must not be served from a registry of the same version
+        registry = get_registry()
+
+        with override_settings(CACHES=CACHES):
+            self.assertIsNot(get_registry(), registry)
+
+    def test_missing_objects_queried(self):
+        registry = BestiaryRegistry(version=0)
+        item = GameItem.objects.create(category=GameItem.CATEGORY_CURRENCY, com2us_id=2, name='Social Point')
+
+        self.assertEqual(registry.get_item(GameItem.CATEGORY_CURRENCY, 2), item)
+        with self.assertRaises(GameItem.DoesNotExist):
+            registry.get_item(GameItem.CATEGORY_CURRENCY, 3)
+        with self.assertRaises(Monster.DoesNotExist):
+            registry.get_monster(None)
+
+        # Ambiguous without a difficulty, same as Level.objects.get()
+        with self.assertRaises(Level.MultipleObjectsReturned):
+            registry.get_level(Dungeon.CATEGORY_SCENARIO, 1, 1)
+
+
+@override_settings(CACHES=CACHES)
+class GameDataVersionTests(TransactionTestCase):
+    # The version is bumped on commit, which TestCase never does
+    def setUp(self):
+        caches['default'].clear()
+        caches['local'].clear()
+
+    def test_reused_until_game_data_changes(self):
+        registry = get_registry()
+        self.assertIs(get_registry(), registry)
+
+        item = GameItem.objects.create(category=GameItem.CATEGORY_CURRENCY, com2us_id=2, name='Social Point')
+        self.assertIsNot(get_registry(), registry)
+        self.assertEqual(get_registry().get_item(GameItem.CATEGORY_CURRENCY, 2), item)
+
+    def test_bumped_once_per_transaction(self):
+        version = game_data_version()
+
+        with transaction.atomic():
+            GameItem.objects.create(category=GameItem.CATEGORY_CURRENCY, com2us_id=1, name='Crystal')
+            GameItem.objects.create(category=GameItem.CATEGORY_CURRENCY, com2us_id=2, name='Social Point')
+            self.assertEqual(game_data_version(), version)
+
+        self.assertEqual(game_data_version(), version + 1)
+
+    def test_not_bumped_on_rollback(self):
+        version = game_data_version()
+
+        try:
+            with transaction.atomic():
+                GameItem.objects.create(category=GameItem.CATEGORY_CURRENCY, com2us_id=1, name='Crystal')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        self.assertEqual(game_data_version(), version)
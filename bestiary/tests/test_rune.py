@@ -1,7 +1,11 @@
+from copy import deepcopy
+from io import StringIO
+
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
 from django.test import TestCase
 
-from bestiary import models
+from bestiary import models, rune_efficiency
 
 
 class Rune(models.Rune):
@@ -935,3 +939,69 @@ class Efficiency(TestCase):
             (63 / 63 + 1 * (30 + 3) / 6 * 0.2 + 4 * 1 * 0.2) / 2.8 * 100,
             rune.efficiency
         )
+
+
+class BatchUpdateFields(TestCase):
+    RUNES = [
+        {},
+        {'level': 15, 'main_stat_value': 5000},
+        {
+            'stars': 5,
+            'level': 12,
+            'main_stat': Rune.STAT_SPD,
+            'innate_stat': Rune.STAT_ACCURACY_PCT,
+            'innate_stat_value': 40,
+            'substats': [Rune.STAT_CRIT_RATE_PCT, Rune.STAT_ATK_PCT, Rune.STAT_HP],
+            'substat_values': [20, 100, 300],
+            'substats_enchanted': [False, True, False],
+            'substats_grind_value': [0, 4, 120],
+        },
+        {
+            'stars': 4,
+            'level': 6,
+            'substats': [Rune.STAT_SPD, Rune.STAT_DEF],
+            'substat_values': [8, 10],
+            'substats_enchanted': [False, False],
+            'substats_grind_value': [0],
+        },
+    ]
+
+    def test_matches_update_fields(self):
+        expected = [Rune(type=Rune.TYPE_ENERGY, slot=2, **self._defaults(kwargs)) for kwargs in self.RUNES]
+        actual = [Rune(type=Rune.TYPE_ENERGY, slot=2, **self._defaults(kwargs)) for kwargs in self.RUNES]
+
+        for rune in expected:
+            rune.update_fields()
+        rune_efficiency.update_rune_fields(actual)
+
+        for expected_rune, actual_rune in zip(expected, actual):
+            for field in rune_efficiency.FIELDS:
+                self.assertEqual(getattr(expected_rune, field), getattr(actual_rune, field), field)
+
+    @staticmethod
+    def _defaults(kwargs):
+        defaults = {
+            'stars': 6,
+            'level': 0,
+            'main_stat': Rune.STAT_HP_PCT,
+            'main_stat_value': None,
+            'innate_stat': None,
+            'innate_stat_value': None,
+            'substats': [],
+            'substat_values': [],
+            'substats_enchanted': [],
+            'substats_grind_value': [],
+        }
+        # update_fields() caps substat values in place, so each rune gets its own lists
+        defaults.update(deepcopy(kwargs))
+        return defaults
+
+
+class RecomputeRuneFieldsCommand(TestCase):
+    def test_all_models(self):
+        out = StringIO()
+        call_command('recompute_rune_fields', stdout=out)
+
+        self.assertIn('Recomputing herders.RuneInstance', out.getvalue())
+        self.assertIn('Recomputing data_log.DungeonRuneDrop', out.getvalue())
+        self.assertIn('Recomputing data_log.CraftRuneLog', out.getvalue())
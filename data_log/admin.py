@@ -11,6 +11,13 @@ class FullLogAdmin(admin.ModelAdmin):
     readonly_fields = ('summoner', )
 
 
+@admin.register(models.PendingLog)
+class PendingLogAdmin(admin.ModelAdmin):
+    list_display = ('received_on', 'command', 'summoner', 'attempts')
+    list_filter = ('attempts', )
+    readonly_fields = ('summoner', 'attempts', 'error')
+
+
 # Common drop inlines
 class ItemDropInline(admin.TabularInline):
     readonly_fields = ('item', )
@@ -275,6 +282,29 @@ class LevelReportAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('level', 'level__dungeon')
 
 
+@admin.register(models.LevelReportAggregate)
+class LevelReportAggregateAdmin(admin.ModelAdmin):
+    readonly_fields = ('updated_on', 'level', 'last_log_id',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('level', 'level__dungeon')
+
+
+@admin.register(models.LevelLogRollup)
+class LevelLogRollupAdmin(admin.ModelAdmin):
+    readonly_fields = ('level', 'day',)
+    list_display = ('level', 'content_type', 'day', 'log_count',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('level', 'level__dungeon')
+
+
+@admin.register(models.LevelRollupWatermark)
+class LevelRollupWatermarkAdmin(admin.ModelAdmin):
+    readonly_fields = ('updated_on', 'last_log_id',)
+    list_display = ('content_type', 'last_log_id', 'updated_on',)
+
+
 @admin.register(models.SummonReport)
 class SummonReportAdmin(admin.ModelAdmin):
     readonly_fields = ('generated_on', 'item',)
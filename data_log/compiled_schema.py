@@ -0,0 +1,250 @@
+from jsonschema import Draft4Validator
+
+# Compiles the subset of Draft 4 JSON schema used by the log and sync schemas into nested Python closures.
+# Schemas are walked once when compiled, so checking a payload is a plain sequence of isinstance/key checks instead
+# of a keyword dispatch per node. Error reporting is left to Draft4Validator and only runs on invalid data.
+
+
+class UnsupportedSchema(Exception):
+    pass
+
+
+# Draft 4 validation keywords the compiler does not implement. Any other unrecognised key is ignored, as in jsonschema.
+UNSUPPORTED_KEYWORDS = {
+    'multipleOf', 'exclusiveMaximum', 'exclusiveMinimum', 'maxLength', 'minLength', 'pattern', 'additionalItems',
+    'uniqueItems', 'maxProperties', 'minProperties', 'patternProperties', 'dependencies', 'allOf', 'anyOf', 'not',
+}
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_integer(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+TYPE_CHECKS = {
+    'object': lambda value: isinstance(value, dict),
+    'array': lambda value: isinstance(value, list),
+    'string': lambda value: isinstance(value, str),
+    'number': _is_number,
+    'integer': _is_integer,
+    'boolean': lambda value: isinstance(value, bool),
+    'null': lambda value: value is None,
+}
+
+
+def _always_valid(value):
+    return True
+
+
+class _SchemaCompiler:
+    def __init__(self, root):
+        self.root = root
+        self.refs = {}
+
+    def resolve(self, ref):
+        if not ref.startswith('#/'):
+            raise UnsupportedSchema(f'Only local references are supported, got {ref}')
+
+        if ref not in self.refs:
+            # Placeholder allows recursive references. Filled in once the target is compiled.
+            target = None
+            self.refs[ref] = lambda value: target(value)
+
+            node = self.root
+            for part in ref[2:].split('/'):
+                node = node[part]
+            target = self.compile(node)
+
+        return self.refs[ref]
+
+    def compile(self, schema):
+        if '$ref' in schema:
+            return self.resolve(schema['$ref'])
+
+        unsupported = UNSUPPORTED_KEYWORDS.intersection(schema.keys())
+        if unsupported:
+            raise UnsupportedSchema(f'Unsupported keywords {unsupported}')
+
+        checks = []
+
+        if 'type' in schema:
+            checks.append(self._type(schema['type']))
+        if 'enum' in schema:
+            checks.append(self._enum(schema['enum']))
+        if 'minimum' in schema or 'maximum' in schema:
+            checks.append(self._range(schema.get('minimum'), schema.get('maximum')))
+        if 'minItems' in schema or 'maxItems' in schema:
+            checks.append(self._length(schema.get('minItems'), schema.get('maxItems')))
+        if 'required' in schema:
+            checks.append(self._required(schema['required']))
+        if 'properties' in schema or 'additionalProperties' in schema:
+            checks.append(self._properties(schema.get('properties', {}), schema.get('additionalProperties', True)))
+        if 'items' in schema:
+            checks.append(self._items(schema['items']))
+        if 'oneOf' in schema:
+            checks.append(self._one_of(schema['oneOf']))
+
+        if not checks:
+            return _always_valid
+        if len(checks) == 1:
+            return checks[0]
+
+        def check(value):
+            for fn in checks:
+                if not fn(value):
+                    return False
+            return True
+
+        return check
+
+    @staticmethod
+    def _type(types):
+        if isinstance(types, str):
+            return TYPE_CHECKS[types]
+
+        type_checks = [TYPE_CHECKS[t] for t in types]
+        return lambda value: any(fn(value) for fn in type_checks)
+
+    @staticmethod
+    def _enum(choices):
+        return lambda value: value in choices
+
+    @staticmethod
+    def _range(minimum, maximum):
+        def check(value):
+            if not _is_number(value):
+                return True
+            if minimum is not None and value < minimum:
+                return False
+            if maximum is not None and value > maximum:
+                return False
+            return True
+
+        return check
+
+    @staticmethod
+    def _length(min_items, max_items):
+        def check(value):
+            if not isinstance(value, list):
+                return True
+            if min_items is not None and len(value) < min_items:
+                return False
+            if max_items is not None and len(value) > max_items:
+                return False
+            return True
+
+        return check
+
+    @staticmethod
+    def _required(keys):
+        keys = tuple(keys)
+
+        def check(value):
+            if not isinstance(value, dict):
+                return True
+            for key in keys:
+                if key not in value:
+                    return False
+            return True
+
+        return check
+
+    def _properties(self, properties, additional):
+        property_checks = [
+            (key, fn) for key, fn in ((key, self.compile(sub)) for key, sub in properties.items())
+            if fn is not _always_valid
+        ]
+
+        if additional is False:
+            allowed = set(properties.keys())
+            additional_check = None
+        elif isinstance(additional, dict):
+            allowed = set(properties.keys())
+            additional_check = self.compile(additional)
+        else:
+            allowed = None
+            additional_check = None
+
+        def check(value):
+            if not isinstance(value, dict):
+                return True
+            for key, fn in property_checks:
+                if key in value and not fn(value[key]):
+                    return False
+            if allowed is not None:
+                for key, item in value.items():
+                    if key not in allowed and (additional_check is None or not additional_check(item)):
+                        return False
+            return True
+
+        return check
+
+    def _items(self, items):
+        if isinstance(items, list):
+            item_checks = [self.compile(sub) for sub in items]
+
+            def check_tuple(value):
+                if not isinstance(value, list):
+                    return True
+                for fn, item in zip(item_checks, value):
+                    if not fn(item):
+                        return False
+                return True
+
+            return check_tuple
+
+        item_check = self.compile(items)
+        if item_check is _always_valid:
+            return _always_valid
+
+        def check(value):
+            if not isinstance(value, list):
+                return True
+            for item in value:
+                if not item_check(item):
+                    return False
+            return True
+
+        return check
+
+    def _one_of(self, schemas):
+        sub_checks = [self.compile(sub) for sub in schemas]
+        return lambda value: sum(1 for fn in sub_checks if fn(value)) == 1
+
+
+class CompiledValidator:
+    """
+    Drop-in replacement for the parts of Draft4Validator used in this project. Schemas using keywords the compiler
+    does not support fall back to Draft4Validator for is_valid().
+    """
+    def __init__(self, schema):
+        self.schema = schema
+        self.validator = Draft4Validator(schema)
+
+        try:
+            self._check = _SchemaCompiler(schema).compile(schema)
+        except UnsupportedSchema:
+            self._check = self.validator.is_valid
+
+    def is_valid(self, instance):
+        return self._check(instance)
+
+    def iter_errors(self, instance):
+        if self._check(instance):
+            return iter(())
+        return self.validator.iter_errors(instance)
+
+
+_validators = {}
+
+
+def compile_validator(schema):
+    # Schemas are shared between log and sync commands, so only compile each schema once
+    key = id(schema)
+    if key not in _validators:
+        _validators[key] = CompiledValidator(schema)
+
+    return _validators[key]
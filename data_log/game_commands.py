@@ -1,15 +1,16 @@
 import json
 
-from jsonschema import Draft4Validator
+from django.core.mail import mail_admins
 
 from bestiary.parse.dungeons import dispatch_dungeon_wave_parse
 from . import models
 from . import schemas
+from .compiled_schema import compile_validator
 
 
 class GameApiCommand:
     def __init__(self, schema, parse_fns):
-        self.validator = Draft4Validator(schema)
+        self.validator = compile_validator(schema)
         self.accepted_commands = {
             key: schema['properties'][key]['properties'].keys() for key in schema['required']
         }
@@ -19,10 +20,11 @@ class GameApiCommand:
 
     def parse(self, *args, **kwargs):
         errors = []
-        for fn in self.parsers:
-            error = fn(*args, **kwargs)
-            if error:
-                errors.append(error)
+        with models.drop_batch():
+            for fn in self.parsers:
+                error = fn(*args, **kwargs)
+                if error:
+                    errors.append(error)
         return errors
 
     def validate(self, log_data):
@@ -113,6 +115,27 @@ accepted_api_params = {
 accepted_api_params['__version'] = 10
 
 
+def parse_log_data(summoner, log_data):
+    """
+    Validate and parse a log with its active command.
+
+    :return: False if the log failed validation, True once parsed
+    """
+    command = active_log_commands[log_data['request']['command']]
+
+    if not command.validate(log_data):
+        models.FullLog.parse(summoner, log_data)
+        return False
+
+    try:
+        command.parse(summoner, log_data)
+    except Exception as e:
+        mail_admins('Log server error', f'Request body:\n\n{log_data}')
+        raise e
+
+    return True
+
+
 # Utility functions
 def import_swex_full_log(path, search_commands):
     req = None
@@ -0,0 +1,73 @@
+import json
+import os
+from collections import defaultdict
+from timeit import timeit
+
+from django.core.management.base import BaseCommand
+from jsonschema import Draft4Validator
+
+from data_log.compiled_schema import compile_validator
+from data_log.game_commands import active_log_commands
+from herders.profile_schema import HubUserLoginSchema
+from herders.sync_commands import active_log_commands as active_sync_commands
+
+DEFAULT_PATHS = ['data_log/tests/game_api_data', 'herders/tests/game_api_data']
+
+
+class Command(BaseCommand):
+    help = 'Compare per-command schema validation time of Draft4Validator and compiled validators on recorded payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS, help='Payload files or directories')
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def _payload_files(self, paths):
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, files in os.walk(path):
+                    for filename in sorted(files):
+                        if filename.endswith('.json'):
+                            yield os.path.join(root, filename)
+            else:
+                yield path
+
+    def _schemas(self, payload):
+        # Yields (label, schema, instance) for every schema the payload is validated against
+        if 'wizard_info' in payload:
+            # Full profile export
+            yield 'HubUserLogin (profile)', HubUserLoginSchema, payload
+            return
+
+        data = payload.get('data', payload)
+        command = data.get('request', {}).get('command')
+
+        if command in active_log_commands:
+            yield f'{command} (log)', active_log_commands[command].validator.schema, data
+        if command in active_sync_commands:
+            yield f'{command} (sync)', active_sync_commands[command].validator.schema, data
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        results = defaultdict(lambda: [0, 0.0, 0.0])
+
+        for filename in self._payload_files(options['paths']):
+            with open(filename, 'r') as f:
+                payload = json.load(f)
+
+            for label, schema, instance in self._schemas(payload):
+                draft4 = Draft4Validator(schema)
+                compiled = compile_validator(schema)
+
+                if draft4.is_valid(instance) != compiled.is_valid(instance):
+                    self.stdout.write(self.style.ERROR(f'Validation result mismatch for {filename} ({label})'))
+
+                results[label][0] += 1
+                results[label][1] += timeit(lambda: draft4.is_valid(instance), number=iterations) / iterations
+                results[label][2] += timeit(lambda: compiled.is_valid(instance), number=iterations) / iterations
+
+        self.stdout.write(f'{"Command":<50}{"Payloads":>10}{"Draft4 (us)":>15}{"Compiled (us)":>15}{"Speedup":>10}')
+        for label, (count, draft4_time, compiled_time) in sorted(results.items(), key=lambda x: -x[1][1]):
+            self.stdout.write(
+                f'{label:<50}{count:>10}{draft4_time / count * 1e6:>15.1f}{compiled_time / count * 1e6:>15.1f}'
+                f'{draft4_time / compiled_time:>9.1f}x'
+            )
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.24 on 2026-10-18 12:00
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('bestiary', '0031_auto_20210412_0525'),
+        ('data_log', '0026_auto_20210212_1114'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LevelReportAggregate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('watermark', models.DateTimeField(blank=True, help_text='Timestamp of the newest log folded into buckets', null=True)),
+                ('buckets', django.contrib.postgres.fields.jsonb.JSONField(default=dict)),
+                ('updated_on', models.DateTimeField(auto_now=True)),
+                ('content_type', models.ForeignKey(help_text='The logging model aggregated', on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType')),
+                ('level', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='report_aggregates', to='bestiary.Level')),
+            ],
+            options={
+                'unique_together': {('content_type', 'level')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.24 on 2026-10-18 12:30
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('herders', '0029_summoner_dark_mode'),
+        ('data_log', '0027_levelreportaggregate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingLog',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('command', models.CharField(max_length=150)),
+                ('log_data', django.contrib.postgres.fields.jsonb.JSONField()),
+                ('received_on', models.DateTimeField(auto_now_add=True)),
+                ('summoner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='herders.Summoner')),
+            ],
+            options={
+                'ordering': ('pk',),
+            },
+        ),
+    ]
@@ -0,0 +1,251 @@
+# Generated by Django 2.2.24 on 2026-10-18 14:05
+
+import re
+from datetime import datetime
+
+import pytz
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Log tables become range partitioned by month of timestamp, see data_log.partitions. The existing table is kept as
+# the partition of everything before the start of next month, so no logs are copied.
+LOG_TABLES = [
+    'data_log_fulllog',
+    'data_log_shoprefreshlog',
+    'data_log_wishlog',
+    'data_log_craftrunelog',
+    'data_log_magicboxcraft',
+    'data_log_summonlog',
+    'data_log_dungeonlog',
+    'data_log_riftdungeonlog',
+    'data_log_riftraidlog',
+    'data_log_worldbosslog',
+]
+MONTHS_AHEAD = 2
+
+
+def _add_months(dt, months):
+    month = dt.month - 1 + months
+    return dt.replace(year=dt.year + month // 12, month=month % 12 + 1)
+
+
+def partition_log_tables(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql' or connection.pg_version < 110000:
+        # Partitioned indexes and foreign keys need PostgreSQL 11
+        return
+
+    quote = schema_editor.quote_name
+    cutoff = _add_months(datetime.now(pytz.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0), 1)
+
+    with connection.cursor() as cursor:
+        for table in LOG_TABLES:
+            history = f'{table}_history'
+            default = f'{table}_default'
+
+            cursor.execute(f'LOCK TABLE {quote(table)} IN ACCESS EXCLUSIVE MODE')
+            cursor.execute(f'ALTER TABLE {quote(table)} RENAME TO {quote(history)}')
+            cursor.execute(
+                'SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid '
+                'WHERE x.indrelid = %s::regclass AND NOT x.indisunique',
+                [history],
+            )
+            indexes = cursor.fetchall()
+            cursor.execute(
+                "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass "
+                "AND contype = 'f'",
+                [history],
+            )
+            foreign_keys = cursor.fetchall()
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [history])
+            sequence = cursor.fetchone()[0]
+
+            cursor.execute(
+                f'CREATE TABLE {quote(table)} '
+                f'(LIKE {quote(history)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE) '
+                f'PARTITION BY RANGE ("timestamp")'
+            )
+            cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {quote(table)}.id')
+
+            cursor.execute(f'CREATE TABLE {quote(default)} PARTITION OF {quote(table)} DEFAULT')
+            cursor.execute(f'ALTER TABLE {quote(default)} ADD PRIMARY KEY (id)')
+            start = cutoff
+            for _ in range(MONTHS_AHEAD):
+                end = _add_months(start, 1)
+                partition = f'{table}_p{start:%Y_%m}'
+                cursor.execute(
+                    f'CREATE TABLE {quote(partition)} PARTITION OF {quote(table)} FOR VALUES FROM (%s) TO (%s)',
+                    [start.isoformat(), end.isoformat()],
+                )
+                cursor.execute(f'ALTER TABLE {quote(partition)} ADD PRIMARY KEY (id)')
+                start = end
+
+            # Logs without a timestamp or dated after the cutoff do not fit in the history partition
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM {quote(history)} WHERE "timestamp" IS NULL OR "timestamp" >= %s '
+                f'RETURNING *) INSERT INTO {quote(table)} SELECT * FROM moved',
+                [cutoff],
+            )
+
+            # A valid constraint implying the partition bound spares ATTACH from scanning history again for it
+            check = quote(f'{history}_bound')
+            cursor.execute(
+                f'ALTER TABLE {quote(history)} ADD CONSTRAINT {check} '
+                f'CHECK ("timestamp" IS NOT NULL AND "timestamp" < %s) NOT VALID',
+                [cutoff.isoformat()],
+            )
+            cursor.execute(f'ALTER TABLE {quote(history)} VALIDATE CONSTRAINT {check}')
+            cursor.execute(
+                f'ALTER TABLE {quote(table)} ATTACH PARTITION {quote(history)} FOR VALUES FROM (MINVALUE) TO (%s)',
+                [cutoff.isoformat()],
+            )
+            cursor.execute(f'ALTER TABLE {quote(history)} DROP CONSTRAINT {check}')
+
+            # Indexes and foreign keys created on the partitioned table adopt the equivalent ones of history
+            for number, (name, definition) in enumerate(indexes):
+                cursor.execute(f'ALTER INDEX {quote(name)} RENAME TO {quote(f"{history}_{number}")}')
+                cursor.execute(re.sub(r' ON \S+ USING ', f' ON {quote(table)} USING ', definition, count=1))
+
+            for name, definition in foreign_keys:
+                cursor.execute(f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_log', '0028_pendinglog'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dungeonartifactdrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='artifacts', to='data_log.DungeonLog'),
+        ),
+        migrations.AlterField(
+            model_name='dungeonitemdrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='data_log.DungeonLog'),
+        ),
+        migrations.AlterField(
+            model_name='dungeonmonsterdrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='monsters', to='data_log.DungeonLog'),
+        ),
+        migrations.AlterField(
+            model_name='dungeonmonsterpiecedrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='monster_pieces', to='data_log.DungeonLog'),
+        ),
+        migrations.AlterField(
+            model_name='dungeonrunecraftdrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='rune_crafts', to='data_log.DungeonLog'),
+        ),
+        migrations.AlterField(
+            model_name='dungeonrunedrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='runes', to='data_log.DungeonLog'),
+        ),
+        migrations.AlterField(
+            model_name='dungeonsecretdungeondrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='secret_dungeons', to='data_log.DungeonLog'),
+        ),
+        migrations.AlterField(
+            model_name='magicboxcraftitemdrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='data_log.MagicBoxCraft'),
+        ),
+        migrations.AlterField(
+            model_name='magicboxcraftrunecraftdrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='rune_crafts', to='data_log.MagicBoxCraft'),
+        ),
+        migrations.AlterField(
+            model_name='magicboxcraftrunedrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='runes', to='data_log.MagicBoxCraft'),
+        ),
+        migrations.AlterField(
+            model_name='riftdungeonitemdrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='data_log.RiftDungeonLog'),
+        ),
+        migrations.AlterField(
+            model_name='riftdungeonmonsterdrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='monsters', to='data_log.RiftDungeonLog'),
+        ),
+        migrations.AlterField(
+            model_name='riftdungeonrunecraftdrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='rune_crafts', to='data_log.RiftDungeonLog'),
+        ),
+        migrations.AlterField(
+            model_name='riftdungeonrunedrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='runes', to='data_log.RiftDungeonLog'),
+        ),
+        migrations.AlterField(
+            model_name='riftraiditemdrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='data_log.RiftRaidLog'),
+        ),
+        migrations.AlterField(
+            model_name='riftraidmonsterdrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='monsters', to='data_log.RiftRaidLog'),
+        ),
+        migrations.AlterField(
+            model_name='riftraidrunecraftdrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='rune_crafts', to='data_log.RiftRaidLog'),
+        ),
+        migrations.AlterField(
+            model_name='shoprefreshitemdrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='data_log.ShopRefreshLog'),
+        ),
+        migrations.AlterField(
+            model_name='shoprefreshmonsterdrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='monsters', to='data_log.ShopRefreshLog'),
+        ),
+        migrations.AlterField(
+            model_name='shoprefreshrunedrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='runes', to='data_log.ShopRefreshLog'),
+        ),
+        migrations.AlterField(
+            model_name='wishlogitemdrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='data_log.WishLog'),
+        ),
+        migrations.AlterField(
+            model_name='wishlogmonsterdrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='monsters', to='data_log.WishLog'),
+        ),
+        migrations.AlterField(
+            model_name='wishlogrunedrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='runes', to='data_log.WishLog'),
+        ),
+        migrations.AlterField(
+            model_name='worldbosslogitemdrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='data_log.WorldBossLog'),
+        ),
+        migrations.AlterField(
+            model_name='worldbosslogmonsterdrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='monsters', to='data_log.WorldBossLog'),
+        ),
+        migrations.AlterField(
+            model_name='worldbosslogrunedrop',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='runes', to='data_log.WorldBossLog'),
+        ),
+        migrations.RunPython(partition_log_tables, migrations.RunPython.noop),
+    ]
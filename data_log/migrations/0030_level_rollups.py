@@ -0,0 +1,52 @@
+# Generated by Django 2.2.24 on 2026-10-18 16:00
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('bestiary', '0031_auto_20210412_0525'),
+        ('data_log', '0029_partition_logs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LevelLogRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('log_count', models.IntegerField()),
+                ('first_timestamp', models.DateTimeField()),
+                ('last_timestamp', models.DateTimeField()),
+                ('clear_time', django.contrib.postgres.fields.jsonb.JSONField(default=dict)),
+                ('content_type', models.ForeignKey(help_text='The logging model rolled up', on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType')),
+                ('level', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='log_rollups', to='bestiary.Level')),
+            ],
+            options={
+                'unique_together': {('content_type', 'level', 'day')},
+            },
+        ),
+        migrations.CreateModel(
+            name='LevelDropRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('drop_type', models.CharField(max_length=40)),
+                ('dimension', models.CharField(max_length=40)),
+                ('key', models.CharField(max_length=60)),
+                ('count', models.IntegerField()),
+                ('quantity_sum', models.BigIntegerField()),
+                ('quantity_min', models.IntegerField()),
+                ('quantity_max', models.IntegerField()),
+                ('content_type', models.ForeignKey(help_text='The logging model rolled up', on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType')),
+                ('level', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='drop_rollups', to='bestiary.Level')),
+            ],
+            options={
+                'unique_together': {('content_type', 'level', 'day', 'drop_type', 'dimension', 'key')},
+            },
+        ),
+    ]
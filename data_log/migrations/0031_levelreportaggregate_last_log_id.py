@@ -0,0 +1,22 @@
+# Generated by Django 2.2.24 on 2026-10-19 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_log', '0030_level_rollups'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='levelreportaggregate',
+            name='watermark',
+        ),
+        migrations.AddField(
+            model_name='levelreportaggregate',
+            name='last_log_id',
+            field=models.BigIntegerField(blank=True, help_text='ID of the newest log folded into buckets', null=True),
+        ),
+    ]
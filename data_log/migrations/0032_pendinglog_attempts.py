@@ -0,0 +1,23 @@
+# Generated by Django 2.2.24 on 2026-10-19 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_log', '0031_levelreportaggregate_last_log_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pendinglog',
+            name='attempts',
+            field=models.IntegerField(default=0, help_text='Number of failed parse attempts'),
+        ),
+        migrations.AddField(
+            model_name='pendinglog',
+            name='error',
+            field=models.TextField(blank=True, help_text='Traceback of the last failed parse attempt'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.24 on 2026-10-19 11:00
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def clear_rollups(apps, schema_editor):
+    # Rolled up without wizards or a log ID watermark, the first update_rollups() run rebuilds them from every log
+    apps.get_model('data_log', 'LevelDropRollup').objects.all().delete()
+    apps.get_model('data_log', 'LevelLogRollup').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('data_log', '0032_pendinglog_attempts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LevelRollupWatermark',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_log_id', models.BigIntegerField(blank=True, help_text='ID of the newest log rolled up', null=True)),
+                ('updated_on', models.DateTimeField(auto_now=True)),
+                ('content_type', models.OneToOneField(help_text='The logging model rolled up', on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='levellogrollup',
+            name='wizards',
+            field=django.contrib.postgres.fields.jsonb.JSONField(default=list, help_text='IDs of the wizards who logged on the day'),
+        ),
+        migrations.RunPython(clear_rollups, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,6 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 
 import pytz
@@ -6,12 +9,15 @@ from django.core.mail import mail_admins
 from django.db import models
 
 from bestiary.models import Monster, Dungeon, Level, GameItem, Rune, RuneCraft, Artifact, ArtifactCraft
+from bestiary.registry import get_registry
 from herders.models import Summoner
 
 
 # Abstract models for encapsulating common data like drops and log entry metadata
 class LogEntry(models.Model):
     # Abstract model with basic fields required for logging anything
+    # Log tables are partitioned by month of timestamp, see data_log.partitions. Their IDs cannot be referenced by
+    # database foreign keys, so the log of a drop is a foreign key without a database constraint.
 
     TIMEZONE_SERVER_MAP = {
         'America/Los_Angeles': Summoner.SERVER_GLOBAL,
@@ -81,13 +87,13 @@ class ItemDrop(models.Model):
         if key and val is not None:
             # Dungeon drop parsing
             if key == 'mana':
-                item = GameItem.objects.get(category=GameItem.CATEGORY_CURRENCY, name='Mana')
+                item = get_registry().get_item_by_name(GameItem.CATEGORY_CURRENCY, 'Mana')
                 quantity = val
             elif key == 'energy':
-                item = GameItem.objects.get(category=GameItem.CATEGORY_CURRENCY, name='Energy')
+                item = get_registry().get_item_by_name(GameItem.CATEGORY_CURRENCY, 'Energy')
                 quantity = val
             elif key == 'crystal':
-                item = GameItem.objects.get(category=GameItem.CATEGORY_CURRENCY, name='Crystal')
+                item = get_registry().get_item_by_name(GameItem.CATEGORY_CURRENCY, 'Crystal')
                 quantity = val
             else:
                 raise ValueError(f"Can't parse item type {key} with {cls.__name__}")
@@ -101,7 +107,7 @@ class ItemDrop(models.Model):
             if master_type not in cls.PARSE_ITEM_TYPES:
                 raise ValueError(f"Can't parse item type {master_type} with {cls.__name__}")
 
-            item = GameItem.objects.get(category=master_type, com2us_id=master_id)
+            item = get_registry().get_item(master_type, master_id)
         else:
             raise ValueError('Must specify either (key, val) kwargs or (item_master_type, item_master_id, quantity) kwargs')
 
@@ -144,7 +150,7 @@ class MonsterDrop(models.Model):
         grade = monster_info.get('class') or monster_info.get('unit_class')
         level = monster_info.get('unit_level') or 1
         return cls(
-                monster=Monster.objects.get(com2us_id=com2us_id),
+                monster=get_registry().get_monster(com2us_id),
                 grade=grade,
                 level=level,
             )
@@ -297,6 +303,60 @@ class ArtifactDrop(Artifact):
         )
 
 
+# Batched drop persistence
+_drop_batch = threading.local()
+
+
+def _prepare_drop(drop):
+    # bulk_create() skips save(), so set the derived fields save() would have
+    if isinstance(drop, Rune):
+        drop.update_fields()
+    elif isinstance(drop, Artifact):
+        drop._update_values()
+
+
+def _bulk_create_drops(drops):
+    by_model = defaultdict(list)
+    for drop in drops:
+        by_model[type(drop)].append(drop)
+
+    for model, objs in by_model.items():
+        model.objects.bulk_create(objs)
+
+
+def save_drops(log, drops):
+    """
+    Save parsed drop objects for a log with one INSERT per drop model. Inside drop_batch() the INSERTs are
+    deferred until the batch exits so drops from several logs share them.
+    """
+    drops = [drop for drop in drops if drop is not None]
+
+    for drop in drops:
+        drop.log = log
+        _prepare_drop(drop)
+
+    pending = getattr(_drop_batch, 'pending', None)
+    if pending is not None:
+        pending.extend(drops)
+    else:
+        _bulk_create_drops(drops)
+
+
+@contextmanager
+def drop_batch():
+    if getattr(_drop_batch, 'pending', None) is not None:
+        # Nested batches are written by the outermost one
+        yield
+        return
+
+    _drop_batch.pending = []
+    try:
+        yield
+        _bulk_create_drops(_drop_batch.pending)
+    finally:
+        _drop_batch.pending = None
+
+
 # Data gathering model to store game API data for development and debugging purposes
 class FullLog(LogEntry):
     command = models.TextField(max_length=150, db_index=True)
@@ -313,6 +373,24 @@ class FullLog(LogEntry):
         log_entry.save()
 
 
+# Log ingestion
+# Staging table for uploaded logs waiting to be parsed by a worker. Logs which failed to parse are kept with the error
+# until LOG_QUEUE_MAX_ATTEMPTS is reached, then left for inspection.
+class PendingLog(models.Model):
+    command = models.CharField(max_length=150)
+    summoner = models.ForeignKey(Summoner, on_delete=models.SET_NULL, blank=True, null=True)
+    log_data = JSONField()
+    received_on = models.DateTimeField(auto_now_add=True)
+    attempts = models.IntegerField(default=0, help_text='Number of failed parse attempts')
+    error = models.TextField(blank=True, help_text='Traceback of the last failed parse attempt')
+
+    class Meta:
+        ordering = ('pk', )
+
+    def __str__(self):
+        return f'{self.command} - {self.received_on}'
+
+
 # Magic Shop
 class ShopRefreshLogManager(models.Manager):
     def get_queryset(self):
@@ -373,11 +451,11 @@ class ShopRefreshDrop(models.Model):
 
 
 class ShopRefreshItemDrop(ShopRefreshDrop, ItemDrop):
-    log = models.ForeignKey(ShopRefreshLog, on_delete=models.CASCADE, related_name=ItemDrop.RELATED_NAME)
+    log = models.ForeignKey(ShopRefreshLog, on_delete=models.CASCADE, db_constraint=False, related_name=ItemDrop.RELATED_NAME)
 
 
 class ShopRefreshRuneDrop(ShopRefreshDrop, RuneDrop):
-    log = models.ForeignKey(ShopRefreshLog, on_delete=models.CASCADE, related_name=RuneDrop.RELATED_NAME)
+    log = models.ForeignKey(ShopRefreshLog, on_delete=models.CASCADE, db_constraint=False, related_name=RuneDrop.RELATED_NAME)
 
     @classmethod
     def parse(cls, **kwargs):
@@ -387,7 +465,7 @@ class ShopRefreshRuneDrop(ShopRefreshDrop, RuneDrop):
 
 
 class ShopRefreshMonsterDrop(ShopRefreshDrop, MonsterDrop):
-    log = models.ForeignKey(ShopRefreshLog, on_delete=models.CASCADE, related_name=MonsterDrop.RELATED_NAME)
+    log = models.ForeignKey(ShopRefreshLog, on_delete=models.CASCADE, db_constraint=False, related_name=MonsterDrop.RELATED_NAME)
 
 
 # Wishes
@@ -433,15 +511,15 @@ class WishLog(LogEntry):
 
 
 class WishLogItemDrop(ItemDrop):
-    log = models.ForeignKey(WishLog, on_delete=models.CASCADE, related_name=ItemDrop.RELATED_NAME)
+    log = models.ForeignKey(WishLog, on_delete=models.CASCADE, db_constraint=False, related_name=ItemDrop.RELATED_NAME)
 
 
 class WishLogMonsterDrop(MonsterDrop):
-    log = models.ForeignKey(WishLog, on_delete=models.CASCADE, related_name=MonsterDrop.RELATED_NAME)
+    log = models.ForeignKey(WishLog, on_delete=models.CASCADE, db_constraint=False, related_name=MonsterDrop.RELATED_NAME)
 
 
 class WishLogRuneDrop(RuneDrop):
-    log = models.ForeignKey(WishLog, on_delete=models.CASCADE, related_name=RuneDrop.RELATED_NAME)
+    log = models.ForeignKey(WishLog, on_delete=models.CASCADE, db_constraint=False, related_name=RuneDrop.RELATED_NAME)
 
 
 # Rune Crafting
@@ -568,15 +646,15 @@ class MagicBoxCraft(LogEntry):
 
 
 class MagicBoxCraftItemDrop(ItemDrop):
-    log = models.ForeignKey(MagicBoxCraft, on_delete=models.CASCADE, related_name=ItemDrop.RELATED_NAME)
+    log = models.ForeignKey(MagicBoxCraft, on_delete=models.CASCADE, db_constraint=False, related_name=ItemDrop.RELATED_NAME)
 
 
 class MagicBoxCraftRuneDrop(RuneDrop):
-    log = models.ForeignKey(MagicBoxCraft, on_delete=models.CASCADE, related_name=RuneDrop.RELATED_NAME)
+    log = models.ForeignKey(MagicBoxCraft, on_delete=models.CASCADE, db_constraint=False, related_name=RuneDrop.RELATED_NAME)
 
 
 class MagicBoxCraftRuneCraftDrop(RuneCraftDrop):
-    log = models.ForeignKey(MagicBoxCraft, on_delete=models.CASCADE, related_name=RuneCraftDrop.RELATED_NAME)
+    log = models.ForeignKey(MagicBoxCraft, on_delete=models.CASCADE, db_constraint=False, related_name=RuneCraftDrop.RELATED_NAME)
 
 
 # Summons
@@ -637,10 +715,7 @@ class SummonLog(LogEntry, MonsterDrop):
             item_info = log_data['response']['item_list'][0]
 
             try:
-                self.item = GameItem.objects.get(
-                    category=item_info['item_master_type'],
-                    com2us_id=item_info['item_master_id'],
-                )
+                self.item = get_registry().get_item(item_info['item_master_type'], item_info['item_master_id'])
             except GameItem.DoesNotExist:
                 self.item = GameItem.objects.create(
                     category=item_info['item_master_type'],
@@ -652,16 +727,10 @@ class SummonLog(LogEntry, MonsterDrop):
             mode = log_data['request']['mode']
             if mode == 3:
                 # Crystal summon
-                self.item = GameItem.objects.get(
-                    category=GameItem.CATEGORY_CURRENCY,
-                    com2us_id=1,
-                )
+                self.item = get_registry().get_item(GameItem.CATEGORY_CURRENCY, 1)
             elif mode == 5:
                 # Social summon
-                self.item = GameItem.objects.get(
-                    category=GameItem.CATEGORY_CURRENCY,
-                    com2us_id=2,
-                )
+                self.item = get_registry().get_item(GameItem.CATEGORY_CURRENCY, 2)
 
 
 # Dungeons
@@ -692,11 +761,11 @@ class DungeonLog(LogEntry):
         log_entry.parse_common_log_data(log_data)
         log_entry.battle_key = log_data['response'].get('battle_key')
 
-        log_entry.level = Level.objects.get(
-            dungeon__category=Dungeon.CATEGORY_SCENARIO,
-            dungeon__com2us_id=log_data['request']['region_id'],
+        log_entry.level = get_registry().get_level(
+            Dungeon.CATEGORY_SCENARIO,
+            log_data['request']['region_id'],
+            log_data['request']['stage_no'],
             difficulty=log_data['request']['difficulty'],
-            floor=log_data['request']['stage_no'],
         )
 
         # Remainder of information comes from BattleScenarioResult
@@ -731,11 +800,7 @@ class DungeonLog(LogEntry):
         log_entry = cls(summoner=summoner)
         log_entry.parse_common_log_data(log_data)
         try:
-            log_entry.level = Level.objects.get(
-                dungeon__category=Dungeon.CATEGORY_CAIROS,
-                dungeon__com2us_id=dungeon_id,
-                floor=floor,
-            )
+            log_entry.level = get_registry().get_level(Dungeon.CATEGORY_CAIROS, dungeon_id, floor)
         except Level.DoesNotExist:
             # Create a placeholder level for later updating
             try:
@@ -774,11 +839,7 @@ class DungeonLog(LogEntry):
         log_entry = cls(summoner=summoner)
         log_entry.parse_common_log_data(log_data)
         try:
-            log_entry.level = Level.objects.get(
-                dungeon__category=Dungeon.CATEGORY_DIMENSIONAL_HOLE,
-                dungeon__com2us_id=dungeon_id,
-                floor=floor,
-            )
+            log_entry.level = get_registry().get_level(Dungeon.CATEGORY_DIMENSIONAL_HOLE, dungeon_id, floor)
         except Level.DoesNotExist:
             # Create a placeholder level for later updating
             try:
@@ -850,11 +911,7 @@ class DungeonLog(LogEntry):
             else:
                 ValueError(f"don't know how to parse {key} reward in {self.__class__.__name__}")
 
-        # Save parsed rewards
-        for reward in reward_objs:
-            if reward is not None:
-                reward.log = self
-                reward.save()
+        save_drops(self, reward_objs)
 
     def parse_changed_item_list(self, changed_item_list):
         if not changed_item_list:
@@ -904,35 +961,31 @@ class DungeonLog(LogEntry):
             else:
                 raise ValueError(f"don't know how to parse changed item type {item_type} in {self.__class__.__name__}")
 
-        # Save parsed rewards
-        for reward in changed_items_object:
-            if reward is not None:
-                reward.log = self
-                reward.save()
+        save_drops(self, changed_items_object)
 
 
 class DungeonItemDrop(ItemDrop):
-    log = models.ForeignKey(DungeonLog, on_delete=models.CASCADE, related_name=ItemDrop.RELATED_NAME)
+    log = models.ForeignKey(DungeonLog, on_delete=models.CASCADE, db_constraint=False, related_name=ItemDrop.RELATED_NAME)
 
 
 class DungeonMonsterDrop(MonsterDrop):
-    log = models.ForeignKey(DungeonLog, on_delete=models.CASCADE, related_name=MonsterDrop.RELATED_NAME)
+    log = models.ForeignKey(DungeonLog, on_delete=models.CASCADE, db_constraint=False, related_name=MonsterDrop.RELATED_NAME)
 
 
 class DungeonMonsterPieceDrop(MonsterPieceDrop):
-    log = models.ForeignKey(DungeonLog, on_delete=models.CASCADE, related_name=MonsterPieceDrop.RELATED_NAME)
+    log = models.ForeignKey(DungeonLog, on_delete=models.CASCADE, db_constraint=False, related_name=MonsterPieceDrop.RELATED_NAME)
 
 
 class DungeonRuneDrop(RuneDrop):
-    log = models.ForeignKey(DungeonLog, on_delete=models.CASCADE, related_name=RuneDrop.RELATED_NAME)
+    log = models.ForeignKey(DungeonLog, on_delete=models.CASCADE, db_constraint=False, related_name=RuneDrop.RELATED_NAME)
 
 
 class DungeonRuneCraftDrop(RuneCraftDrop):
-    log = models.ForeignKey(DungeonLog, on_delete=models.CASCADE, related_name=RuneCraftDrop.RELATED_NAME)
+    log = models.ForeignKey(DungeonLog, on_delete=models.CASCADE, db_constraint=False, related_name=RuneCraftDrop.RELATED_NAME)
 
 
 class DungeonArtifactDrop(ArtifactDrop):
-    log = models.ForeignKey(DungeonLog, on_delete=models.CASCADE, related_name=ArtifactDrop.RELATED_NAME)
+    log = models.ForeignKey(DungeonLog, on_delete=models.CASCADE, db_constraint=False, related_name=ArtifactDrop.RELATED_NAME)
 
 
 class DungeonSecretDungeonDropManager(models.Manager):
@@ -946,18 +999,14 @@ class DungeonSecretDungeonDrop(models.Model):
     RELATED_NAME = 'secret_dungeons'
     objects = DungeonSecretDungeonDropManager()
 
-    log = models.ForeignKey(DungeonLog, on_delete=models.CASCADE, related_name=RELATED_NAME)
+    log = models.ForeignKey(DungeonLog, on_delete=models.CASCADE, db_constraint=False, related_name=RELATED_NAME)
     level = models.ForeignKey(Level, on_delete=models.PROTECT)
 
     @classmethod
     def parse(cls, instance_info):
         try:
             return cls(
-                level=Level.objects.get(
-                    dungeon__category=Dungeon.CATEGORY_SECRET,
-                    dungeon__com2us_id=instance_info['instance_id'],
-                    floor=1,
-                )
+                level=get_registry().get_level(Dungeon.CATEGORY_SECRET, instance_info['instance_id'], 1)
             )
         except Level.DoesNotExist:
             # Unknown or event dungeon. Do not log.
@@ -1022,10 +1071,10 @@ class RiftDungeonLog(LogEntry):
         log_entry = cls(summoner=summoner)
         log_entry.parse_common_log_data(log_data)
 
-        log_entry.level = Level.objects.get(
-            dungeon__category=Dungeon.CATEGORY_RIFT_OF_WORLDS_BEASTS,
-            dungeon__com2us_id=log_data['request']['dungeon_id'],
-            floor=1,
+        log_entry.level = get_registry().get_level(
+            Dungeon.CATEGORY_RIFT_OF_WORLDS_BEASTS,
+            log_data['request']['dungeon_id'],
+            1,
         )
         log_entry.grade = log_data['response']['rift_dungeon_box_id']
         log_entry.total_damage = log_data['response']['total_damage']
@@ -1053,19 +1102,19 @@ class RiftDungeonLog(LogEntry):
 
 
 class RiftDungeonItemDrop(ItemDrop):
-    log = models.ForeignKey(RiftDungeonLog, on_delete=models.CASCADE, related_name=ItemDrop.RELATED_NAME)
+    log = models.ForeignKey(RiftDungeonLog, on_delete=models.CASCADE, db_constraint=False, related_name=ItemDrop.RELATED_NAME)
 
 
 class RiftDungeonMonsterDrop(MonsterDrop):
-    log = models.ForeignKey(RiftDungeonLog, on_delete=models.CASCADE, related_name=MonsterDrop.RELATED_NAME)
+    log = models.ForeignKey(RiftDungeonLog, on_delete=models.CASCADE, db_constraint=False, related_name=MonsterDrop.RELATED_NAME)
 
 
 class RiftDungeonRuneDrop(RuneDrop):
-    log = models.ForeignKey(RiftDungeonLog, on_delete=models.CASCADE, related_name=RuneDrop.RELATED_NAME)
+    log = models.ForeignKey(RiftDungeonLog, on_delete=models.CASCADE, db_constraint=False, related_name=RuneDrop.RELATED_NAME)
 
 
 class RiftDungeonRuneCraftDrop(RuneCraftDrop):
-    log = models.ForeignKey(RiftDungeonLog, on_delete=models.CASCADE, related_name=RuneCraftDrop.RELATED_NAME)
+    log = models.ForeignKey(RiftDungeonLog, on_delete=models.CASCADE, db_constraint=False, related_name=RuneCraftDrop.RELATED_NAME)
 
 
 # Rift of Worlds Raid
@@ -1094,10 +1143,10 @@ class RiftRaidLog(LogEntry):
         log_entry = cls(summoner=summoner)
         log_entry.parse_common_log_data(log_data)
         log_entry.battle_key = log_data['request']['battle_key']
-        log_entry.level = Level.objects.get(
-            dungeon__category=Dungeon.CATEGORY_RIFT_OF_WORLDS_RAID,
-            dungeon__com2us_id=log_data['response']['battle_info']['raid_id'],
-            floor=log_data['response']['battle_info']['stage_id'],
+        log_entry.level = get_registry().get_level(
+            Dungeon.CATEGORY_RIFT_OF_WORLDS_RAID,
+            log_data['response']['battle_info']['raid_id'],
+            log_data['response']['battle_info']['stage_id'],
         )
         log_entry.save()
 
@@ -1167,15 +1216,15 @@ class RiftRaidDrop(models.Model):
 
 
 class RiftRaidItemDrop(RiftRaidDrop, ItemDrop):
-    log = models.ForeignKey(RiftRaidLog, on_delete=models.CASCADE, related_name=ItemDrop.RELATED_NAME)
+    log = models.ForeignKey(RiftRaidLog, on_delete=models.CASCADE, db_constraint=False, related_name=ItemDrop.RELATED_NAME)
 
 
 class RiftRaidMonsterDrop(RiftRaidDrop, MonsterDrop):
-    log = models.ForeignKey(RiftRaidLog, on_delete=models.CASCADE, related_name=MonsterDrop.RELATED_NAME)
+    log = models.ForeignKey(RiftRaidLog, on_delete=models.CASCADE, db_constraint=False, related_name=MonsterDrop.RELATED_NAME)
 
 
 class RiftRaidRuneCraftDrop(RiftRaidDrop, RuneCraftDrop):
-    log = models.ForeignKey(RiftRaidLog, on_delete=models.CASCADE, related_name=RuneCraftDrop.RELATED_NAME)
+    log = models.ForeignKey(RiftRaidLog, on_delete=models.CASCADE, db_constraint=False, related_name=RuneCraftDrop.RELATED_NAME)
 
 
 # World Boss
@@ -1285,12 +1334,12 @@ class WorldBossLog(LogEntry):
 
 
 class WorldBossLogItemDrop(ItemDrop):
-    log = models.ForeignKey(WorldBossLog, on_delete=models.CASCADE, related_name=ItemDrop.RELATED_NAME)
+    log = models.ForeignKey(WorldBossLog, on_delete=models.CASCADE, db_constraint=False, related_name=ItemDrop.RELATED_NAME)
 
 
 class WorldBossLogMonsterDrop(MonsterDrop):
-    log = models.ForeignKey(WorldBossLog, on_delete=models.CASCADE, related_name=MonsterDrop.RELATED_NAME)
+    log = models.ForeignKey(WorldBossLog, on_delete=models.CASCADE, db_constraint=False, related_name=MonsterDrop.RELATED_NAME)
 
 
 class WorldBossLogRuneDrop(RuneDrop):
-    log = models.ForeignKey(WorldBossLog, on_delete=models.CASCADE, related_name=RuneDrop.RELATED_NAME)
+    log = models.ForeignKey(WorldBossLog, on_delete=models.CASCADE, db_constraint=False, related_name=RuneDrop.RELATED_NAME)
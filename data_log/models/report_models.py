@@ -35,6 +35,85 @@ class LevelReport(Report):
         return f"{self.level} {self.generated_on}"
 
 
+class LevelReportAggregate(models.Model):
+    # Running per-day aggregates of level logs used to build LevelReports incrementally
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE,
+        help_text="The logging model aggregated"
+    )
+    level = models.ForeignKey(Level, on_delete=models.PROTECT, related_name='report_aggregates')
+    last_log_id = models.BigIntegerField(blank=True, null=True, help_text='ID of the newest log folded into buckets')
+    buckets = JSONField(default=dict)
+    updated_on = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = [['content_type', 'level']]
+
+    def __str__(self):
+        return f"{self.level} {self.content_type} - {self.last_log_id}"
+
+
+class LevelLogRollup(models.Model):
+    # Daily totals of successful level logs, see data_log.reports.rollup
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE,
+        help_text="The logging model rolled up"
+    )
+    level = models.ForeignKey(Level, on_delete=models.PROTECT, related_name='log_rollups')
+    day = models.DateField()
+    log_count = models.IntegerField()
+    first_timestamp = models.DateTimeField()
+    last_timestamp = models.DateTimeField()
+    clear_time = JSONField(default=dict)
+    wizards = JSONField(default=list, help_text='IDs of the wizards who logged on the day')
+
+    class Meta:
+        unique_together = [['content_type', 'level', 'day']]
+
+    def __str__(self):
+        return f"{self.level} {self.content_type} - {self.day}"
+
+
+class LevelRollupWatermark(models.Model):
+    # Progress of the rollups of one logging model
+    content_type = models.OneToOneField(
+        ContentType,
+        on_delete=models.CASCADE,
+        help_text="The logging model rolled up"
+    )
+    last_log_id = models.BigIntegerField(blank=True, null=True, help_text='ID of the newest log rolled up')
+    updated_on = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.content_type} - {self.last_log_id}"
+
+
+class LevelDropRollup(models.Model):
+    # Daily count and quantity stats of one drop dimension key of a level, e.g. runes by slot 2
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE,
+        help_text="The logging model rolled up"
+    )
+    level = models.ForeignKey(Level, on_delete=models.PROTECT, related_name='drop_rollups')
+    day = models.DateField()
+    drop_type = models.CharField(max_length=40)
+    dimension = models.CharField(max_length=40)
+    key = models.CharField(max_length=60)
+    count = models.IntegerField()
+    quantity_sum = models.BigIntegerField()
+    quantity_min = models.IntegerField()
+    quantity_max = models.IntegerField()
+
+    class Meta:
+        unique_together = [['content_type', 'level', 'day', 'drop_type', 'dimension', 'key']]
+
+    def __str__(self):
+        return f"{self.level} {self.content_type} - {self.day} {self.drop_type} {self.dimension} {self.key}"
+
+
 class SummonReport(Report):
     item = models.ForeignKey(GameItem, on_delete=models.PROTECT)
 
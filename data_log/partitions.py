@@ -0,0 +1,226 @@
+import re
+from datetime import datetime, timedelta
+
+import pytz
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import FullLog, ShopRefreshLog, WishLog, CraftRuneLog, MagicBoxCraft, SummonLog, DungeonLog, \
+    RiftDungeonLog, RiftRaidLog, WorldBossLog
+
+# Log tables are range partitioned by month of timestamp (migration 0029). Each table has:
+# - <table>_history with everything logged before partitioning, up to the start of the following month
+# - <table>_pYYYY_MM for each month after that, created ahead of time by maintain_partitions()
+# - <table>_default with logs without a timestamp or too far in the future for the existing partitions
+#
+# Retention has three tiers. Partitions stay attached and are read by reports until archive_after days past their
+# last day. They are then detached into ARCHIVE_SCHEMA, together with the drops of their logs, as
+# <table>_<YYYYMMDD> named after the day the partition ended. Archived tables are dropped drop_after days past the
+# same day.
+
+PARTITIONED_MODELS = [
+    FullLog,
+    ShopRefreshLog,
+    WishLog,
+    CraftRuneLog,
+    MagicBoxCraft,
+    SummonLog,
+    DungeonLog,
+    RiftDungeonLog,
+    RiftRaidLog,
+    WorldBossLog,
+]
+ARCHIVE_SCHEMA = 'data_log_archive'
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def month_start(dt):
+    return dt.astimezone(pytz.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(dt, months):
+    month = dt.month - 1 + months
+    return dt.replace(year=dt.year + month // 12, month=month % 12 + 1)
+
+
+def retention(model):
+    return {**settings.LOG_RETENTION['default'], **settings.LOG_RETENTION.get(model.__name__, {})}
+
+
+def is_partitioned(model):
+    if connection.vendor != 'postgresql':
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)',
+            [model._meta.db_table],
+        )
+        return cursor.fetchone() is not None
+
+
+def _parse_bound(value):
+    return None if value in ('MINVALUE', 'MAXVALUE') else parse_datetime(value.strip("'"))
+
+
+def partitions(model):
+    """
+    Attached partitions of a log table as (name, start, end), excluding the default partition. start and end are None
+    for unbounded ranges.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(%s)',
+            [model._meta.db_table],
+        )
+        rows = cursor.fetchall()
+
+    result = []
+    for name, bound in rows:
+        match = re.match(r"FOR VALUES FROM \((.+)\) TO \((.+)\)", bound)
+        if match:
+            result.append((name, _parse_bound(match.group(1)), _parse_bound(match.group(2))))
+
+    return sorted(result, key=lambda p: p[2] or datetime.max.replace(tzinfo=pytz.utc))
+
+
+def create_partition(model, start):
+    """
+    Create the partition of a log table for the month starting at start, moving in its logs from the default partition.
+    """
+    table = model._meta.db_table
+    name = f'{table}_p{start:%Y_%m}'
+    end = add_months(start, 1)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE {_quote(name)} '
+            f'(LIKE {_quote(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE)'
+        )
+        cursor.execute(f'ALTER TABLE {_quote(name)} ADD PRIMARY KEY (id)')
+        # The default partition must not keep any log of the new range when it is attached
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {_quote(table + "_default")} '
+            f'WHERE "timestamp" >= %s AND "timestamp" < %s RETURNING *) '
+            f'INSERT INTO {_quote(name)} SELECT * FROM moved',
+            [start, end],
+        )
+        cursor.execute(
+            f'ALTER TABLE {_quote(table)} ATTACH PARTITION {_quote(name)} FOR VALUES FROM (%s) TO (%s)',
+            [start.isoformat(), end.isoformat()],
+        )
+
+    return name
+
+
+def _drop_tables(model):
+    # Tables of the drops referencing the logs of model, with the column of the log ID
+    return [
+        (rel.related_model._meta.db_table, rel.field.column)
+        for rel in model._meta.related_objects
+        if rel.one_to_many and rel.field.name == 'log'
+    ]
+
+
+def archive_partition(model, name, end):
+    """
+    Detach a partition of a log table and move it into the archive schema along with the drops of its logs.
+    """
+    table = model._meta.db_table
+    suffix = f'{end:%Y%m%d}'
+    archived = f'{table}_{suffix}'
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'CREATE SCHEMA IF NOT EXISTS {_quote(ARCHIVE_SCHEMA)}')
+        cursor.execute(f'ALTER TABLE {_quote(table)} DETACH PARTITION {_quote(name)}')
+        cursor.execute(f'ALTER TABLE {_quote(name)} RENAME TO {_quote(archived)}')
+        cursor.execute(f'ALTER TABLE {_quote(archived)} SET SCHEMA {_quote(ARCHIVE_SCHEMA)}')
+        archived_logs = f'SELECT id FROM {_quote(ARCHIVE_SCHEMA)}.{_quote(archived)}'
+
+        for drop_table, log_column in _drop_tables(model):
+            cursor.execute(
+                f'CREATE TABLE {_quote(ARCHIVE_SCHEMA)}.{_quote(f"{drop_table}_{suffix}")} AS '
+                f'SELECT * FROM {_quote(drop_table)} WHERE {_quote(log_column)} IN ({archived_logs})'
+            )
+            cursor.execute(f'DELETE FROM {_quote(drop_table)} WHERE {_quote(log_column)} IN ({archived_logs})')
+
+    return archived
+
+
+def archived_partitions(model):
+    """
+    Archived tables of a log table as (name, end).
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT tablename FROM pg_tables WHERE schemaname = %s',
+            [ARCHIVE_SCHEMA],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    result = []
+    for name in names:
+        match = re.fullmatch(re.escape(table) + r'_(\d{8})', name)
+        if match:
+            result.append((name, datetime.strptime(match.group(1), '%Y%m%d').replace(tzinfo=pytz.utc)))
+
+    return sorted(result, key=lambda p: p[1])
+
+
+def drop_archived_partition(model, end):
+    """
+    Drop an archived log table and the archived drops of its logs.
+    """
+    suffix = f'{end:%Y%m%d}'
+    tables = [model._meta.db_table] + [drop_table for drop_table, _ in _drop_tables(model)]
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        for table in tables:
+            cursor.execute(f'DROP TABLE IF EXISTS {_quote(ARCHIVE_SCHEMA)}.{_quote(f"{table}_{suffix}")}')
+
+
+def maintain_partitions(now=None):
+    """
+    Create the partitions of the coming months and archive or drop old partitions according to LOG_RETENTION.
+    """
+    now = now or timezone.now()
+    result = {
+        'created': [],
+        'archived': [],
+        'dropped': [],
+    }
+
+    for model in PARTITIONED_MODELS:
+        if not is_partitioned(model):
+            continue
+
+        existing = partitions(model)
+        start = month_start(now)
+        for _ in range(settings.LOG_PARTITION_MONTHS_AHEAD + 1):
+            covered = any((low is None or low <= start) and (high is None or start < high) for _, low, high in existing)
+            if not covered:
+                result['created'].append(create_partition(model, start))
+            start = add_months(start, 1)
+
+        policy = retention(model)
+        if policy['archive_after'] is not None:
+            archive_before = now - timedelta(days=policy['archive_after'])
+            for name, _, end in existing:
+                if end is not None and end <= archive_before:
+                    result['archived'].append(archive_partition(model, name, end))
+
+        if policy['drop_after'] is not None:
+            drop_before = now - timedelta(days=policy['drop_after'])
+            for name, end in archived_partitions(model):
+                if end <= drop_before:
+                    drop_archived_partition(model, end)
+                    result['dropped'].append(name)
+
+    return result
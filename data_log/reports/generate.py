@@ -1,13 +1,16 @@
 from collections import Counter
 from datetime import timedelta
+
+import numpy as np
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import Count, Min, Max, Avg, Sum, Func, F, Func, Q, CharField, FloatField, Value, StdDev
-from django.db.models.functions import Cast, Concat, Extract
+from django.db.models import Count, Min, Max, Avg, Sum, Func, F, Func, Q, CharField, FloatField, Value, Case, When, \
+    BooleanField
+from django.db.models.functions import Cast, Concat
 from django_pivot.histogram import histogram
 
 from bestiary.models import Monster, Rune, Level, GameItem, Dungeon, Artifact
 from data_log import models
-from data_log.util import slice_records, floor_to_nearest, ceil_to_nearest, replace_value_with_choice, \
+from data_log.util import slice_records, summarize_records, floor_to_nearest, ceil_to_nearest, replace_value_with_choice, \
     transform_to_dict, round_timedelta
 
 # Any drops that occur less than this percentage of time are filtered out
@@ -239,7 +242,8 @@ def get_report_summary(drops, total_log_count, **kwargs):
 
 
 def get_item_report(qs, total_log_count, **kwargs):
-    if qs.count() == 0:
+    # total_log_count is the number of drops in qs, same for the other drop type reports
+    if not total_log_count:
         return None
 
     min_count = kwargs.get('min_count', max(
@@ -266,7 +270,7 @@ def get_item_report(qs, total_log_count, **kwargs):
 
 
 def get_monster_report(qs, total_log_count, **kwargs):
-    if qs.count() == 0:
+    if not total_log_count:
         return None
 
     min_count = kwargs.get('min_count', max(
@@ -275,7 +279,7 @@ def get_monster_report(qs, total_log_count, **kwargs):
     return {
         'monsters': {  # By unique monster
             'type': 'occurrences',
-            'total': qs.count(),
+            'total': total_log_count,
             'data': transform_to_dict(
                 list(
                     qs.values(
@@ -294,7 +298,7 @@ def get_monster_report(qs, total_log_count, **kwargs):
         },
         'family': {  # By family
             'type': 'occurrences',
-            'total': qs.count(),
+            'total': total_log_count,
             'data': transform_to_dict(
                 list(
                     qs.values(
@@ -311,7 +315,7 @@ def get_monster_report(qs, total_log_count, **kwargs):
         },
         'nat_stars': {  # By nat stars
             'type': 'occurrences',
-            'total': qs.count(),
+            'total': total_log_count,
             'data': transform_to_dict(
                 list(
                     qs.values(
@@ -327,7 +331,7 @@ def get_monster_report(qs, total_log_count, **kwargs):
         },
         'element': {  # By element
             'type': 'occurrences',
-            'total': qs.count(),
+            'total': total_log_count,
             'data': transform_to_dict(
                 replace_value_with_choice(
                     list(
@@ -346,7 +350,7 @@ def get_monster_report(qs, total_log_count, **kwargs):
         },
         'awakened': {  # By awakened/unawakened
             'type': 'occurrences',
-            'total': qs.count(),
+            'total': total_log_count,
             'data': transform_to_dict(
                 list(
                     qs.values(
@@ -365,7 +369,7 @@ def get_monster_report(qs, total_log_count, **kwargs):
 
 
 def get_rune_report(qs, total_log_count, **kwargs):
-    if qs.count() == 0:
+    if not total_log_count:
         return None
 
     min_count = kwargs.get('min_count', max(
@@ -382,11 +386,12 @@ def get_rune_report(qs, total_log_count, **kwargs):
     min_value, max_value = qs.aggregate(Min('value'), Max('value')).values()
     min_value = int(floor_to_nearest(min_value, 1000))
     max_value = int(ceil_to_nearest(max_value, 1000))
+    slot_counts = dict(qs.values_list('slot').annotate(count=Count('pk')).order_by())
 
     return {
         'stars': {
             'type': 'occurrences',
-            'total': qs.count(),
+            'total': total_log_count,
             'data': transform_to_dict(
                 list(
                     qs.values(
@@ -399,7 +404,7 @@ def get_rune_report(qs, total_log_count, **kwargs):
         },
         'type': {
             'type': 'occurrences',
-            'total': qs.count(),
+            'total': total_log_count,
             'data': transform_to_dict(
                 replace_value_with_choice(
                     list(qs.values('type').annotate(count=Count('pk')).filter(
@@ -410,7 +415,7 @@ def get_rune_report(qs, total_log_count, **kwargs):
         },
         'quality': {
             'type': 'occurrences',
-            'total': qs.count(),
+            'total': total_log_count,
             'data': transform_to_dict(
                 replace_value_with_choice(
                     list(qs.values('quality').annotate(count=Count('pk')).filter(
@@ -421,12 +426,12 @@ def get_rune_report(qs, total_log_count, **kwargs):
         },
         'slot': {
             'type': 'occurrences',
-            'total': qs.count(),
+            'total': total_log_count,
             'data': transform_to_dict(list(qs.values('slot').annotate(count=Count('pk')).filter(count__gt=min_count).order_by('-count'))),
         },
         'main_stat': {
             'type': 'occurrences',
-            'total': qs.count(),
+            'total': total_log_count,
             'data': transform_to_dict(
                 replace_value_with_choice(
                     list(qs.values('main_stat').annotate(count=Count('main_stat')).filter(
@@ -437,7 +442,7 @@ def get_rune_report(qs, total_log_count, **kwargs):
         },
         'slot_2_main_stat': {
             'type': 'occurrences',
-            'total': qs.filter(slot=2).count(),
+            'total': slot_counts.get(2, 0),
             'data': transform_to_dict(
                 replace_value_with_choice(
                     list(qs.filter(slot=2).values('main_stat').annotate(count=Count(
@@ -448,7 +453,7 @@ def get_rune_report(qs, total_log_count, **kwargs):
         },
         'slot_4_main_stat': {
             'type': 'occurrences',
-            'total': qs.filter(slot=4).count(),
+            'total': slot_counts.get(4, 0),
             'data': transform_to_dict(
                 replace_value_with_choice(
                     list(qs.filter(slot=4).values('main_stat').annotate(count=Count('main_stat')).filter(
@@ -459,7 +464,7 @@ def get_rune_report(qs, total_log_count, **kwargs):
         },
         'slot_6_main_stat': {
             'type': 'occurrences',
-            'total': qs.filter(slot=6).count(),
+            'total': slot_counts.get(6, 0),
             'data': transform_to_dict(
                 replace_value_with_choice(
                     list(qs.filter(slot=6).values('main_stat').annotate(count=Count('main_stat')).filter(
@@ -470,7 +475,7 @@ def get_rune_report(qs, total_log_count, **kwargs):
         },
         'innate_stat': {
             'type': 'occurrences',
-            'total': qs.count(),
+            'total': total_log_count,
             'data': transform_to_dict(
                 replace_value_with_choice(
                     list(qs.values('innate_stat').annotate(count=Count('pk')).filter(
@@ -505,7 +510,7 @@ def get_rune_report(qs, total_log_count, **kwargs):
         },
         'legend_stars': {
             'type': 'occurrences',
-            'total': qs.count(),
+            'total': total_log_count,
             'data': transform_to_dict(
                 list(
                     qs.filter(
@@ -522,7 +527,7 @@ def get_rune_report(qs, total_log_count, **kwargs):
 
 
 def get_artifact_report(qs, total_log_count, **kwargs):
-    if qs.count() == 0:
+    if not total_log_count:
         return None
 
     min_count = kwargs.get('min_count', max(
@@ -533,11 +538,12 @@ def get_artifact_report(qs, total_log_count, **kwargs):
         flat_effects=Func(F('effects'), function='unnest')
     ).values_list('flat_effects', flat=True)
     effect_counts = Counter(all_effects)
+    slot_counts = dict(qs.values_list('slot').annotate(count=Count('pk')).order_by())
 
     return {
         'element': {
             'type': 'occurrences',
-            'total': qs.filter(slot=Artifact.SLOT_ELEMENTAL).count(),
+            'total': slot_counts.get(Artifact.SLOT_ELEMENTAL, 0),
             'data': transform_to_dict(
                 replace_value_with_choice(
                     list(qs.filter(slot=Artifact.SLOT_ELEMENTAL).values('element').annotate(count=Count('pk')).filter(count__gt=min_count).order_by(
@@ -548,7 +554,7 @@ def get_artifact_report(qs, total_log_count, **kwargs):
         },
         'archetype': {
             'type': 'occurrences',
-            'total': qs.filter(slot=Artifact.SLOT_ARCHETYPE).count(),
+            'total': slot_counts.get(Artifact.SLOT_ARCHETYPE, 0),
             'data': transform_to_dict(
                 replace_value_with_choice(
                     list(qs.filter(slot=Artifact.SLOT_ARCHETYPE).values('archetype').annotate(count=Count('pk')).filter(count__gt=min_count).order_by(
@@ -559,7 +565,7 @@ def get_artifact_report(qs, total_log_count, **kwargs):
         },
         'quality': {
             'type': 'occurrences',
-            'total': qs.count(),
+            'total': total_log_count,
             'data': transform_to_dict(
                 replace_value_with_choice(
                     list(qs.values('quality').annotate(count=Count('pk')).filter(count__gt=min_count).order_by(
@@ -570,7 +576,7 @@ def get_artifact_report(qs, total_log_count, **kwargs):
         },
         'main_stat': {
             'type': 'occurrences',
-            'total': qs.count(),
+            'total': total_log_count,
             'data': transform_to_dict(
                 replace_value_with_choice(
                     list(qs.values('main_stat').annotate(count=Count('main_stat')).filter(count__gt=min_count).order_by(
@@ -602,7 +608,9 @@ def get_artifact_report(qs, total_log_count, **kwargs):
 
 
 def _rune_craft_report_data(qs, total_log_count, **kwargs):
-    if qs.count() == 0:
+    # qs is one kind of craft out of total_log_count drops
+    craft_count = qs.count()
+    if craft_count == 0:
         return None
 
     min_count = kwargs.get('min_count', max(
@@ -611,7 +619,7 @@ def _rune_craft_report_data(qs, total_log_count, **kwargs):
     return {
         'type': {
             'type': 'occurrences',
-            'total': qs.count(),
+            'total': craft_count,
             'data': transform_to_dict(
                 replace_value_with_choice(
                     list(qs.values('type').annotate(count=Count('pk')).filter(
@@ -622,7 +630,7 @@ def _rune_craft_report_data(qs, total_log_count, **kwargs):
         },
         'rune': {
             'type': 'occurrences',
-            'total': qs.count(),
+            'total': craft_count,
             'data': transform_to_dict(
                 replace_value_with_choice(
                     list(qs.values('rune').annotate(count=Count('pk')).filter(
@@ -633,7 +641,7 @@ def _rune_craft_report_data(qs, total_log_count, **kwargs):
         },
         'quality': {
             'type': 'occurrences',
-            'total': qs.count(),
+            'total': craft_count,
             'data': transform_to_dict(
                 replace_value_with_choice(
                     list(qs.values('quality').annotate(count=Count('pk')).filter(
@@ -644,7 +652,7 @@ def _rune_craft_report_data(qs, total_log_count, **kwargs):
         },
         'stat': {
             'type': 'occurrences',
-            'total': qs.count(),
+            'total': craft_count,
             'data': transform_to_dict(
                 replace_value_with_choice(
                     list(qs.values('stat').annotate(count=Count('stat')).filter(
@@ -686,55 +694,86 @@ def get_drop_querysets(qs):
     return drop_querysets
 
 
-def drop_report(qs, **kwargs):
+def clear_time_report(qs):
+    """
+    Clear time stats and histogram of the logs in qs, computed from a single fetch of their clear times.
+    """
+    rows = qs.filter(clear_time__isnull=False).annotate(
+        # Stats are computed on successful runs only, except for rift beasts which cannot fail
+        successful=Case(
+            When(Q(success=True) | Q(level__dungeon__category=Dungeon.CATEGORY_RIFT_OF_WORLDS_BEASTS), then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        )
+    ).values_list('clear_time', 'success', 'successful').order_by()
+
+    if not rows:
+        return None
+
+    clear_times, success, successful = zip(*rows)
+    micros = np.array(clear_times, dtype='timedelta64[us]').astype(np.int64)
+    successful = np.array(successful, dtype=bool)
+
+    if not successful.any():
+        return None
+
+    successful_seconds = micros[successful] / 1e6
+    min_clear = timedelta(microseconds=int(micros[successful].min()))
+    max_clear = timedelta(microseconds=int(micros[successful].max()))
+    avg_clear = timedelta(seconds=successful_seconds.mean())
+    std_dev = successful_seconds.std()
+
+    # Use +/- 3 std deviations of clear time avg as bounds for time range in case of extreme outliers skewing chart scale
+    min_time = round_timedelta(
+        max(min_clear, avg_clear - timedelta(seconds=std_dev * 3)),
+        CLEAR_TIME_BIN_WIDTH,
+        direction='down',
+    )
+    max_time = round_timedelta(
+        min(max_clear, avg_clear + timedelta(seconds=std_dev * 3)),
+        CLEAR_TIME_BIN_WIDTH,
+        direction='up',
+    )
+    bins = [min_time + CLEAR_TIME_BIN_WIDTH * x for x in range(0, int((max_time - min_time) / CLEAR_TIME_BIN_WIDTH))]
+
+    # Histogram covers every run sliced on success, in the shape of django_pivot.histogram. Each clear time falls in
+    # the last bin starting at or before it, clear times before the first bin are left out.
+    bin_index = np.searchsorted(np.array([b.total_seconds() for b in bins]), micros / 1e6, side='right') - 1
+    in_bins = bin_index >= 0
+    success = [str(s) for s in success]
+    success_array = np.array(success)
+    slice_counts = {
+        s: np.bincount(bin_index[in_bins & (success_array == s)], minlength=len(bins))
+        for s in sorted(set(success))
+    }
+
+    return {
+        'min': str(min_clear),
+        'max': str(max_clear),
+        'avg': str(avg_clear),
+        'chart': {
+            'type': 'histogram',
+            'width': 5,
+            'data': [
+                {'bin': str(b), **{s: int(counts[idx]) for s, counts in slice_counts.items()}}
+                for idx, b in enumerate(bins)
+            ],
+        }
+    }
+
+
+def drop_report(qs, log_count=None, **kwargs):
     report_data = {}
 
     # Get querysets for each possible drop type
     drops = get_drop_querysets(qs)
-    report_data['summary'] = get_report_summary(drops, qs.count(), **kwargs)
+    report_data['summary'] = get_report_summary(drops, qs.count() if log_count is None else log_count, **kwargs)
 
     # Clear time statistics, if supported by the qs model
     if hasattr(qs.model, 'clear_time'):
-        successful_runs = qs.filter(
-            Q(success=True) | Q(
-                level__dungeon__category=Dungeon.CATEGORY_RIFT_OF_WORLDS_BEASTS)
-        )
-
-        if successful_runs.count():
-            clear_time_aggs = successful_runs.aggregate(
-                std_dev=StdDev(Extract(F('clear_time'), lookup_name='epoch')),
-                avg=Avg('clear_time'),
-                min=Min('clear_time'),
-                max=Max('clear_time'),
-            )
-
-            # Use +/- 3 std deviations of clear time avg as bounds for time range in case of extreme outliers skewing chart scale
-            min_time = round_timedelta(
-                max(clear_time_aggs['min'], clear_time_aggs['avg'] -
-                    timedelta(seconds=clear_time_aggs['std_dev'] * 3)),
-                CLEAR_TIME_BIN_WIDTH,
-                direction='down',
-            )
-            max_time = round_timedelta(
-                min(clear_time_aggs['max'], clear_time_aggs['avg'] +
-                    timedelta(seconds=clear_time_aggs['std_dev'] * 3)),
-                CLEAR_TIME_BIN_WIDTH,
-                direction='up',
-            )
-            bins = [min_time + CLEAR_TIME_BIN_WIDTH *
-                    x for x in range(0, int((max_time - min_time) / CLEAR_TIME_BIN_WIDTH))]
-
-            # Histogram generates on entire qs, not just successful runs.
-            report_data['clear_time'] = {
-                'min': str(clear_time_aggs['min']),
-                'max': str(clear_time_aggs['max']),
-                'avg': str(clear_time_aggs['avg']),
-                'chart': {
-                    'type': 'histogram',
-                    'width': 5,
-                    'data': histogram(qs, 'clear_time', bins, slice_on='success'),
-                }
-            }
+        clear_time = clear_time_report(qs)
+        if clear_time:
+            report_data['clear_time'] = clear_time
 
     # Individual drop details
     for key, qs in drops.items():
@@ -748,81 +787,84 @@ def grade_summary_report(qs, grade_choices):
     report_data = []
 
     drops = get_drop_querysets(qs)
+    grade_counts = dict(qs.values_list('grade').annotate(count=Count('pk')).order_by())
+
+    # Whole grade x drop matrix in one grouped query per drop table, pivoted below
+    item_results = {}
+    monster_results = {}
+    rune_results = {}
+
+    if 'items' in drops:
+        for row in drops['items'].values('item', grade=F('log__grade')).annotate(
+            count=Count('pk'),
+            min=Min('quantity'),
+            max=Max('quantity'),
+            avg=Avg('quantity'),
+            total=Sum('quantity'),
+        ).order_by():
+            item_results[(row['grade'], row['item'])] = row
+
+    if 'monsters' in drops:
+        for row in drops['monsters'].values('monster', grade=F('log__grade')).annotate(count=Count('pk')).order_by():
+            monster_results[(row['grade'], row['monster'])] = row['count']
+
+    if 'runes' in drops:
+        for row in drops['runes'].values('stars', grade=F('log__grade')).annotate(count=Count('pk')).order_by():
+            rune_results[(row['grade'], row['stars'])] = row['count']
 
     # List of all drops. Currently only care about monsters and items
-    all_items = GameItem.objects.filter(pk__in=drops['items'].values_list(
-        'item', flat=True)) if 'items' in drops else []
-    all_monsters = Monster.objects.filter(pk__in=drops['monsters'].values_list(
-        'monster', flat=True)) if 'monsters' in drops else []
-    all_runes = drops['runes'] if 'runes' in drops else []
+    all_items = GameItem.objects.filter(
+        pk__in={item_id for _, item_id in item_results.keys()}) if 'items' in drops else []
+    all_monsters = Monster.objects.filter(
+        pk__in={monster_id for _, monster_id in monster_results.keys()}) if 'monsters' in drops else []
+    all_rune_stars = sorted({stars for _, stars in rune_results.keys()}, reverse=True)
 
     for grade_id, grade_name in grade_choices:
-        grade_qs = qs.filter(grade=grade_id)
-        grade_run_count = grade_qs.count() if grade_qs.count() else 1
+        grade_log_count = grade_counts.get(grade_id, 0)
+        grade_run_count = grade_log_count if grade_log_count else 1
 
         grade_report = {
             'grade': grade_name,
-            'log_count': grade_qs.count(),
+            'log_count': grade_log_count,
             'drops': [],
         }
         for item in all_items:
-            result = drops['items'].filter(
-                log__in=grade_qs,
-                item=item,
-            ).aggregate(
-                count=Count('pk'),
-                min=Min('quantity'),
-                max=Max('quantity'),
-                avg=Avg('quantity'),
-                drop_chance=Cast(Count('pk'), FloatField()) /
-                grade_run_count * 100,
-                qty_per_100=Cast(Sum('quantity'), FloatField()
-                                 ) / grade_run_count * 100,
-            )
+            result = item_results.get((grade_id, item.pk))
 
             grade_report['drops'].append({
                 'type': 'item',
                 'name': item.name,
                 'icon': item.icon,
-                **result,
+                'count': result['count'] if result else 0,
+                'min': result['min'] if result else None,
+                'max': result['max'] if result else None,
+                'avg': result['avg'] if result else None,
+                'drop_chance': float(result['count'] if result else 0) / grade_run_count * 100,
+                'qty_per_100': float(result['total']) / grade_run_count * 100 if result else None,
             })
 
         for monster in all_monsters:
-            result = drops['monsters'].filter(
-                log__in=grade_qs,
-                monster=monster
-            ).aggregate(
-                count=Count('pk'),
-                drop_chance=Cast(Count('pk'), FloatField()) /
-                grade_run_count * 100,
-                qty_per_100=Cast(
-                    Func(Count('pk'), 0, function='nullif'), FloatField()) / grade_run_count * 100,
-            )
+            count = monster_results.get((grade_id, monster.pk), 0)
 
             grade_report['drops'].append({
                 'type': 'monster',
                 'name': monster.name,
                 'icon': monster.image_filename,
                 'stars': monster.natural_stars,
-                **result,
+                'count': count,
+                'drop_chance': float(count) / grade_run_count * 100,
+                'qty_per_100': float(count) / grade_run_count * 100 if count else None,
             })
 
-        for stars in sorted(all_runes.values_list('stars', flat=True).distinct(), reverse=True):
-            result = drops['runes'].filter(
-                log__in=grade_qs,
-                stars=stars,
-            ).aggregate(
-                count=Count('pk'),
-                drop_chance=Cast(Count('pk'), FloatField()) /
-                grade_run_count * 100,
-                qty_per_100=Cast(
-                    Func(Count('pk'), 0, function='nullif'), FloatField()) / grade_run_count * 100,
-            )
+        for stars in all_rune_stars:
+            count = rune_results.get((grade_id, stars), 0)
 
             grade_report['drops'].append({
                 'type': 'rune',
                 'name': f'{stars}⭐ Rune',
-                **result,
+                'count': count,
+                'drop_chance': float(count) / grade_run_count * 100,
+                'qty_per_100': float(count) / grade_run_count * 100 if count else None,
             })
 
         report_data.append(grade_report)
@@ -830,82 +872,96 @@ def grade_summary_report(qs, grade_choices):
     return report_data
 
 
-def _generate_level_reports(model, **kwargs):
+def _report_fields(records, content_type, report, **extra):
+    # Field values for a Report subclass row from a RecordSlice. Kept free of model instances so they can be passed
+    # between tasks.
+    return {
+        'content_type_id': content_type.pk,
+        'start_timestamp': records.start_timestamp,
+        'end_timestamp': records.end_timestamp,
+        'log_count': records.count,
+        'unique_contributors': records.unique_contributors,
+        'report': report,
+        **extra,
+    }
+
+
+def level_report_fields(model, level_id, **kwargs):
     content_type = ContentType.objects.get_for_model(model)
+    records = slice_records(model.objects.filter(
+        level_id=level_id, success=True), minimum_count=2500, report_timespan=timedelta(weeks=2))
+
+    if records:
+        report = drop_report(records.records, log_count=records.count, **kwargs)
+        return _report_fields(records, content_type, report, level_id=level_id)
+
+
+def _generate_level_reports(model, **kwargs):
     levels = model.objects.values_list(
         'level', flat=True).distinct().order_by()
 
     for level in Level.objects.filter(pk__in=levels):
-        records = slice_records(model.objects.filter(
-            level=level, success=True), minimum_count=2500, report_timespan=timedelta(weeks=2))
-
-        if records.count() > 0:
-            report_data = drop_report(records, **kwargs)
-
-            models.LevelReport.objects.create(
-                level=level,
-                content_type=content_type,
-                # first() and last() do not work on sliced qs
-                start_timestamp=records[records.count() - 1].timestamp,
-                end_timestamp=records[0].timestamp,
-                log_count=records.count(),
-                unique_contributors=records.aggregate(Count('wizard_id', distinct=True))[
-                    'wizard_id__count'],
-                report=report_data,
-            )
+        fields = level_report_fields(model, level.pk, **kwargs)
+
+        if fields:
+            models.LevelReport.objects.create(**fields)
 
 
 def generate_dungeon_log_reports(**kwargs):
     _generate_level_reports(models.DungeonLog, **kwargs)
 
 
+RIFT_RAID_REPORT_KWARGS = {
+    'include_currency': True,
+    'exclude_social_points': True,
+}
+
+
 def generate_rift_raid_reports():
-    _generate_level_reports(
-        models.RiftRaidLog, include_currency=True, exclude_social_points=True)
+    _generate_level_reports(models.RiftRaidLog, **RIFT_RAID_REPORT_KWARGS)
 
 
-def _generate_by_grade_reports(model):
+def by_grade_report_fields(model, level_id):
     content_type = ContentType.objects.get_for_model(model)
+    all_records = model.objects.none()
+    report_data = {
+        'reports': []
+    }
+
+    # Generate a report by grade
+    for grade, grade_desc in model.GRADE_CHOICES:
+        records = slice_records(model.objects.filter(
+            level_id=level_id, grade=grade), minimum_count=2500, report_timespan=timedelta(weeks=2))
+
+        if records:
+            grade_report = drop_report(records.records, log_count=records.count)
+        else:
+            grade_report = None
+
+        report_data['reports'].append({
+            'grade': grade_desc,
+            'report': grade_report
+        })
+        all_records |= records.records
+
+    all_records = summarize_records(all_records)
+    if all_records:
+        # Generate a report with all results for a complete list of all things that drop here
+        report_data['summary'] = grade_summary_report(
+            all_records.records, model.GRADE_CHOICES)
+
+        return _report_fields(all_records, content_type, report_data, level_id=level_id)
+
+
+def _generate_by_grade_reports(model):
     levels = model.objects.values_list(
         'level', flat=True).distinct().order_by()
 
     for level in Level.objects.filter(pk__in=levels):
-        all_records = model.objects.none()
-        report_data = {
-            'reports': []
-        }
+        fields = by_grade_report_fields(model, level.pk)
 
-        # Generate a report by grade
-        for grade, grade_desc in model.GRADE_CHOICES:
-            records = slice_records(model.objects.filter(
-                level=level, grade=grade), minimum_count=2500, report_timespan=timedelta(weeks=2))
-
-            if records.count() > 0:
-                grade_report = drop_report(records)
-            else:
-                grade_report = None
-
-            report_data['reports'].append({
-                'grade': grade_desc,
-                'report': grade_report
-            })
-            all_records |= records
-
-        if all_records.count() > 0:
-            # Generate a report with all results for a complete list of all things that drop here
-            report_data['summary'] = grade_summary_report(
-                all_records, model.GRADE_CHOICES)
-
-            models.LevelReport.objects.create(
-                level=level,
-                content_type=content_type,
-                start_timestamp=all_records.last().timestamp,
-                end_timestamp=all_records.first().timestamp,
-                log_count=all_records.count(),
-                unique_contributors=all_records.aggregate(Count('wizard_id', distinct=True))[
-                    'wizard_id__count'],
-                report=report_data,
-            )
+        if fields:
+            models.LevelReport.objects.create(**fields)
 
 
 def generate_rift_dungeon_reports():
@@ -916,96 +972,103 @@ def generate_world_boss_dungeon_reports():
     _generate_by_grade_reports(models.WorldBossLog)
 
 
-def generate_shop_refresh_reports():
+def shop_refresh_report_fields():
     records = slice_records(models.ShopRefreshLog.objects.all(
     ), minimum_count=2500, report_timespan=timedelta(weeks=2))
-    report = drop_report(records, min_count=0)
-
-    content_type = ContentType.objects.get_for_model(models.ShopRefreshLog)
-    if records.count() > 0:
-        models.MagicShopRefreshReport.objects.create(
-            content_type=content_type,
-            # first() and last() do not work on sliced qs
-            start_timestamp=records[records.count() - 1].timestamp,
-            end_timestamp=records[0].timestamp,
-            log_count=records.count(),
-            unique_contributors=records.aggregate(Count('wizard_id', distinct=True))[
-                'wizard_id__count'],
-            report=report,
-        )
 
+    if records:
+        content_type = ContentType.objects.get_for_model(models.ShopRefreshLog)
+        report = drop_report(records.records, log_count=records.count, min_count=0)
+        return _report_fields(records, content_type, report)
 
-def generate_magic_box_crafting_reports():
-    records = slice_records(models.MagicBoxCraft.objects.all(
+
+def generate_shop_refresh_reports():
+    fields = shop_refresh_report_fields()
+
+    if fields:
+        models.MagicShopRefreshReport.objects.create(**fields)
+
+
+def _magic_box_records():
+    return slice_records(models.MagicBoxCraft.objects.all(
     ), minimum_count=2500, report_timespan=timedelta(weeks=2))
-    content_type = ContentType.objects.get_for_model(models.MagicBoxCraft)
+
+
+def magic_box_crafting_report_fields(box_id, records=None):
+    # records is the slice of all crafts, computed here unless the caller shares it between boxes
+    if records is None:
+        records = _magic_box_records()
+    box_records = records.filter(box_type=box_id)
+
+    if box_records:
+        content_type = ContentType.objects.get_for_model(models.MagicBoxCraft)
+        report = drop_report(box_records.records, log_count=box_records.count, min_count=0, include_currency=True)
+        return _report_fields(box_records, content_type, report, box_type=box_id)
+
+
+def generate_magic_box_crafting_reports():
+    records = _magic_box_records()
 
     for box_id, _ in models.MagicBoxCraft.BOX_CHOICES:
-        qs = records.filter(box_type=box_id)
-        report = drop_report(qs, min_count=0, include_currency=True)
-
-        if qs.count() > 0:
-            models.MagicBoxCraftingReport.objects.create(
-                content_type=content_type,
-                # first() and last() do not work on sliced qs
-                start_timestamp=qs[qs.count() - 1].timestamp,
-                end_timestamp=qs[0].timestamp,
-                log_count=qs.count(),
-                unique_contributors=qs.aggregate(Count('wizard_id', distinct=True))[
-                    'wizard_id__count'],
-                report=report,
-                box_type=box_id,
-            )
+        fields = magic_box_crafting_report_fields(box_id, records)
 
+        if fields:
+            models.MagicBoxCraftingReport.objects.create(**fields)
 
-def generate_wish_reports():
+
+def wish_report_fields():
     records = slice_records(models.WishLog.objects.all(
     ), minimum_count=2500, report_timespan=timedelta(weeks=2))
-    report = drop_report(records, min_count=0, include_currency=True)
-
-    content_type = ContentType.objects.get_for_model(models.WishLog)
-    if records.count() > 0:
-        models.WishReport.objects.create(
-            content_type=content_type,
-            # first() and last() do not work on sliced qs
-            start_timestamp=records[records.count() - 1].timestamp,
-            end_timestamp=records[0].timestamp,
-            log_count=records.count(),
-            unique_contributors=records.aggregate(Count('wizard_id', distinct=True))[
-                'wizard_id__count'],
-            report=report,
-        )
 
+    if records:
+        content_type = ContentType.objects.get_for_model(models.WishLog)
+        report = drop_report(records.records, log_count=records.count, min_count=0, include_currency=True)
+        return _report_fields(records, content_type, report)
 
-def generate_summon_reports():
-    records = slice_records(models.SummonLog.objects.all(
+
+def generate_wish_reports():
+    fields = wish_report_fields()
+
+    if fields:
+        models.WishReport.objects.create(**fields)
+
+
+def _summon_records():
+    return slice_records(models.SummonLog.objects.all(
     ), minimum_count=2500, report_timespan=timedelta(weeks=2))
-    content_type = ContentType.objects.get_for_model(models.SummonLog)
+
+
+def summon_item_groups(records=None):
+    """
+    :param records: slice of summon logs, computed here if not given
+    :return: dict of {report item id: [summon item ids]}
+    """
+    if records is None:
+        records = _summon_records()
 
     items = GameItem.objects.filter(pk__in=set(
-        records.values_list('item', flat=True)), category__isnull=False)
+        records.records.values_list('item', flat=True)), category__isnull=False)
     item_group_pairs = {item: item for item in items}
 
+    grouped_items = {
+        (item.category, item.com2us_id): item for item in GameItem.objects.filter(
+            Q(category=GameItem.CATEGORY_CURRENCY, com2us_id__in=[1, 2])
+            | Q(category=GameItem.CATEGORY_SUMMON_SCROLL, com2us_id__in=[1, 2, 3, 7, 9, 10])
+        )
+    }
+
     # unknown scrolls, hearts
-    hearts = GameItem.objects.get(
-        category=GameItem.CATEGORY_CURRENCY, com2us_id=2)
-    us = GameItem.objects.get(
-        category=GameItem.CATEGORY_SUMMON_SCROLL, com2us_id=1)
+    hearts = grouped_items[(GameItem.CATEGORY_CURRENCY, 2)]
+    us = grouped_items[(GameItem.CATEGORY_SUMMON_SCROLL, 1)]
     # crystals, ms
-    crystals = GameItem.objects.get(
-        category=GameItem.CATEGORY_CURRENCY, com2us_id=1)
-    ms = GameItem.objects.get(
-        category=GameItem.CATEGORY_SUMMON_SCROLL, com2us_id=2)
+    crystals = grouped_items[(GameItem.CATEGORY_CURRENCY, 1)]
+    ms = grouped_items[(GameItem.CATEGORY_SUMMON_SCROLL, 2)]
     # ld & pieces
-    ld = GameItem.objects.get(
-        category=GameItem.CATEGORY_SUMMON_SCROLL, com2us_id=3)
-    ld_pieces = GameItem.objects.get(
-        category=GameItem.CATEGORY_SUMMON_SCROLL, com2us_id=10)
+    ld = grouped_items[(GameItem.CATEGORY_SUMMON_SCROLL, 3)]
+    ld_pieces = grouped_items[(GameItem.CATEGORY_SUMMON_SCROLL, 10)]
     # ls & pieces
-    ls = GameItem.objects.get(
-        category=GameItem.CATEGORY_SUMMON_SCROLL, com2us_id=7)
-    ls_pieces = GameItem.objects.get(
-        category=GameItem.CATEGORY_SUMMON_SCROLL, com2us_id=9)
+    ls = grouped_items[(GameItem.CATEGORY_SUMMON_SCROLL, 7)]
+    ls_pieces = grouped_items[(GameItem.CATEGORY_SUMMON_SCROLL, 9)]
 
     item_group_pairs[hearts] = us
     item_group_pairs[crystals] = ms
@@ -1014,47 +1077,57 @@ def generate_summon_reports():
 
     item_groups = {}
     for item in set(item_group_pairs.values()):
-        item_groups[item] = [k for k, v in item_group_pairs.items()
-                             if v == item]
-
-    for item_g, items in item_groups.items():
-        if not items:
-            continue
-        qs = records.filter(item__in=items)
-        report = get_monster_report(qs, qs.count(), min_count=0)
-
-        if qs.count() > 0:
-            models.SummonReport.objects.create(
-                content_type=content_type,
-                # first() and last() do not work on sliced qs
-                start_timestamp=qs[qs.count() - 1].timestamp,
-                end_timestamp=qs[0].timestamp,
-                log_count=qs.count(),
-                unique_contributors=qs.aggregate(Count('wizard_id', distinct=True))[
-                    'wizard_id__count'],
-                report=report,
-                item=item_g,
-            )
+        item_groups[item.pk] = [k.pk for k, v in item_group_pairs.items()
+                                if v == item]
 
+    return item_groups
 
-def generate_rune_crafting_reports():
-    records = slice_records(models.CraftRuneLog.objects.all(
+
+def summon_report_fields(item_group_id, item_ids, records=None):
+    if not item_ids:
+        return None
+
+    if records is None:
+        records = _summon_records()
+    item_records = records.filter(item__in=item_ids)
+
+    if item_records:
+        content_type = ContentType.objects.get_for_model(models.SummonLog)
+        report = get_monster_report(item_records.records, item_records.count, min_count=0)
+        return _report_fields(item_records, content_type, report, item_id=item_group_id)
+
+
+def generate_summon_reports():
+    records = _summon_records()
+
+    for item_group_id, item_ids in summon_item_groups(records).items():
+        fields = summon_report_fields(item_group_id, item_ids, records)
+
+        if fields:
+            models.SummonReport.objects.create(**fields)
+
+
+def _rune_crafting_records():
+    return slice_records(models.CraftRuneLog.objects.all(
     ), minimum_count=2500, report_timespan=timedelta(weeks=2))
-    content_type = ContentType.objects.get_for_model(models.CraftRuneLog)
+
+
+def rune_crafting_report_fields(craft_id, records=None):
+    if records is None:
+        records = _rune_crafting_records()
+    craft_records = records.filter(craft_level=craft_id)
+
+    if craft_records:
+        content_type = ContentType.objects.get_for_model(models.CraftRuneLog)
+        report = get_rune_report(craft_records.records, craft_records.count, min_count=0)
+        return _report_fields(craft_records, content_type, report, craft_level=craft_id)
+
+
+def generate_rune_crafting_reports():
+    records = _rune_crafting_records()
 
     for craft_id, _ in models.CraftRuneLog.CRAFT_CHOICES:
-        qs = records.filter(craft_level=craft_id)
-        report = get_rune_report(qs, qs.count(), min_count=0)
-
-        if qs.count() > 0:
-            models.RuneCraftingReport.objects.create(
-                content_type=content_type,
-                # first() and last() do not work on sliced qs
-                start_timestamp=qs[qs.count() - 1].timestamp,
-                end_timestamp=qs[0].timestamp,
-                log_count=qs.count(),
-                unique_contributors=qs.aggregate(Count('wizard_id', distinct=True))[
-                    'wizard_id__count'],
-                report=report,
-                craft_level=craft_id,
-            )
+        fields = rune_crafting_report_fields(craft_id, records)
+
+        if fields:
+            models.RuneCraftingReport.objects.create(**fields)
@@ -0,0 +1,958 @@
+from bisect import bisect_right
+from datetime import timedelta
+from math import floor, sqrt
+
+import pytz
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from bestiary.models import Monster, Rune, Level, GameItem, Artifact
+from data_log import models
+from data_log.util import slice_records, floor_to_nearest, ceil_to_nearest, replace_value_with_choice, \
+    transform_to_dict, round_timedelta
+from .generate import MINIMUM_THRESHOLD, CLEAR_TIME_BIN_WIDTH, DROP_TYPES, RIFT_RAID_REPORT_KWARGS
+
+# Level reports are built from per-day buckets of running aggregates. Each run folds in only the logs newer than the
+# stored watermark and drops buckets which have aged out of the report window, so cost is proportional to new logs.
+#
+# Logs are picked up by ID rather than timestamp, which comes from the game and can be older than logs already folded
+# when a log is uploaded late.
+#
+# Bucket layout (keyed by UTC date in ISO format):
+# {
+#     'log_count': <int>,
+#     'first': <iso timestamp>,
+#     'last': <iso timestamp>,
+#     'wizards': [<wizard id of each contributor>],
+#     'clear_time': {'count', 'sum', 'sum_sq', 'min', 'max', 'bins': {<bin start seconds>: {'True': <int>, 'False': <int>}}},
+#     'drops': {<drop type>: {<dimension>: {<key>: [count, quantity sum, quantity min, quantity max]}}},
+# }
+
+REPORT_TIMESPAN = timedelta(weeks=2)
+MINIMUM_COUNT = 2500
+EFFICIENCY_BIN_WIDTH = 5
+VALUE_BIN_WIDTH = 500
+
+
+def _bin(value, width):
+    return int(floor(value / width) * width)
+
+
+def _parse_key(key):
+    if key == 'None':
+        return None
+    try:
+        return int(key)
+    except ValueError:
+        return key
+
+
+def _split_key(key):
+    return [_parse_key(k) for k in key.split(':')]
+
+
+# Drop dimension extractors. Each yields (dimension, key, quantity) for a single drop row.
+def _item_dimensions(row):
+    yield 'item', row['item_id'], row['quantity']
+
+
+def _monster_dimensions(row):
+    yield 'monster', f"{row['monster_id']}:{row['grade']}", 1
+
+
+def _monster_piece_dimensions(row):
+    yield 'monster', row['monster_id'], row['quantity']
+
+
+def _rune_dimensions(row):
+    yield 'type', row['type'], 1
+    yield 'slot', row['slot'], 1
+    yield 'quality', row['quality'], 1
+    yield 'stars', row['stars'], 1
+    yield 'slot_main_stat', f"{row['slot']}:{row['main_stat']}", 1
+    yield 'innate_stat', row['innate_stat'], 1
+
+    for substat in row['substats']:
+        yield 'substats', substat, 1
+
+    if row['quality'] == Rune.QUALITY_LEGEND:
+        yield 'legend_stars', row['stars'], 1
+
+    if row['max_efficiency'] is not None:
+        yield 'max_efficiency', f"{_bin(row['max_efficiency'], EFFICIENCY_BIN_WIDTH)}:{row['quality']}", 1
+
+    if row['value'] is not None:
+        # Quantity is the sell value itself so min/max of the dimension give the histogram range
+        yield 'value', f"{_bin(row['value'], VALUE_BIN_WIDTH)}:{row['quality']}", row['value']
+
+
+def _rune_craft_dimensions(row):
+    yield 'craft', f"{row['type']}:{row['rune']}:{row['quality']}:{row['stat']}", 1
+
+
+def _artifact_dimensions(row):
+    if row['slot'] == Artifact.SLOT_ELEMENTAL:
+        yield 'element', row['element'], 1
+    elif row['slot'] == Artifact.SLOT_ARCHETYPE:
+        yield 'archetype', row['archetype'], 1
+
+    yield 'quality', row['quality'], 1
+    yield 'main_stat', row['main_stat'], 1
+
+    for effect in row['effects']:
+        yield 'effects', effect, 1
+
+    if row['max_efficiency'] is not None:
+        yield 'max_efficiency', f"{_bin(row['max_efficiency'], EFFICIENCY_BIN_WIDTH)}:{row['quality']}", 1
+
+
+def _secret_dungeon_dimensions(row):
+    yield 'level', row['level_id'], 1
+
+
+DROP_DIMENSIONS = {
+    models.ItemDrop.RELATED_NAME: (('item_id', 'quantity'), _item_dimensions),
+    models.MonsterDrop.RELATED_NAME: (('monster_id', 'grade'), _monster_dimensions),
+    models.MonsterPieceDrop.RELATED_NAME: (('monster_id', 'quantity'), _monster_piece_dimensions),
+    models.RuneDrop.RELATED_NAME: (
+        ('type', 'slot', 'quality', 'stars', 'main_stat', 'innate_stat', 'substats', 'max_efficiency', 'value'),
+        _rune_dimensions,
+    ),
+    models.RuneCraftDrop.RELATED_NAME: (('type', 'rune', 'quality', 'stat'), _rune_craft_dimensions),
+    models.ArtifactDrop.RELATED_NAME: (
+        ('slot', 'element', 'archetype', 'quality', 'main_stat', 'effects', 'max_efficiency'),
+        _artifact_dimensions,
+    ),
+    models.DungeonSecretDungeonDrop.RELATED_NAME: (('level_id',), _secret_dungeon_dimensions),
+}
+
+# Primary dimension of each drop type, used to count total drops of that type
+DROP_TOTAL_DIMENSIONS = {
+    models.ItemDrop.RELATED_NAME: 'item',
+    models.MonsterDrop.RELATED_NAME: 'monster',
+    models.MonsterPieceDrop.RELATED_NAME: 'monster',
+    models.RuneDrop.RELATED_NAME: 'type',
+    models.RuneCraftDrop.RELATED_NAME: 'craft',
+    models.ArtifactDrop.RELATED_NAME: 'quality',
+    models.DungeonSecretDungeonDrop.RELATED_NAME: 'level',
+}
+
+
+# Bucket bookkeeping
+def _new_bucket():
+    return {
+        'log_count': 0,
+        'first': None,
+        'last': None,
+        'wizards': [],
+        'clear_time': {
+            'count': 0,
+            'sum': 0.0,
+            'sum_sq': 0.0,
+            'min': None,
+            'max': None,
+            'bins': {},
+        },
+        'drops': {},
+    }
+
+
+def _add_stat(counter, key, quantity):
+    key = str(key)
+    stats = counter.get(key)
+
+    if stats is None:
+        counter[key] = [1, quantity, quantity, quantity]
+    else:
+        stats[0] += 1
+        stats[1] += quantity
+        stats[2] = min(stats[2], quantity)
+        stats[3] = max(stats[3], quantity)
+
+
+def _merge_stat(counter, key, other):
+    stats = counter.get(key)
+
+    if stats is None:
+        counter[key] = list(other)
+    else:
+        stats[0] += other[0]
+        stats[1] += other[1]
+        stats[2] = min(stats[2], other[2])
+        stats[3] = max(stats[3], other[3])
+
+
+def _min(a, b):
+    return b if a is None else a if b is None else min(a, b)
+
+
+def _max(a, b):
+    return b if a is None else a if b is None else max(a, b)
+
+
+def merge_bucket(target, source):
+    target['log_count'] += source['log_count']
+    target['first'] = _min(target['first'], source['first'])
+    target['last'] = _max(target['last'], source['last'])
+    target['wizards'] = sorted(set(target.get('wizards', [])).union(source.get('wizards', [])))
+
+    target_ct = target['clear_time']
+    source_ct = source['clear_time']
+    target_ct['count'] += source_ct['count']
+    target_ct['sum'] += source_ct['sum']
+    target_ct['sum_sq'] += source_ct['sum_sq']
+    target_ct['min'] = _min(target_ct['min'], source_ct['min'])
+    target_ct['max'] = _max(target_ct['max'], source_ct['max'])
+
+    for bin_start, slices in source_ct['bins'].items():
+        target_bin = target_ct['bins'].setdefault(bin_start, {})
+        for slice_name, count in slices.items():
+            target_bin[slice_name] = target_bin.get(slice_name, 0) + count
+
+    for drop_type, dimensions in source['drops'].items():
+        target_drop = target['drops'].setdefault(drop_type, {})
+        for dimension, counter in dimensions.items():
+            target_counter = target_drop.setdefault(dimension, {})
+            for key, stats in counter.items():
+                _merge_stat(target_counter, key, stats)
+
+    return target
+
+
+def merge_buckets(buckets):
+    merged = _new_bucket()
+
+    for bucket in buckets:
+        merge_bucket(merged, bucket)
+
+    return merged
+
+
+def _day_key(timestamp):
+    return timestamp.astimezone(pytz.utc).date().isoformat()
+
+
+def fold_logs(qs, group_by=None):
+    """
+    Aggregate the logs in `qs` and their drops into per-day buckets.
+
+    :param group_by: log field to also split buckets by, keying them by (field value, day)
+    :return: ({day: bucket}, ID of newest log folded or None)
+    """
+    buckets = {}
+    log_days = {}
+    wizards = {}
+    last_log_id = None
+    has_clear_time = hasattr(qs.model, 'clear_time')
+    log_fields = ('pk', 'timestamp', 'wizard_id', 'clear_time', 'success') if has_clear_time \
+        else ('pk', 'timestamp', 'wizard_id')
+    if group_by:
+        log_fields += (group_by,)
+
+    for log in qs.values(*log_fields).order_by().iterator():
+        day = _day_key(log['timestamp'])
+        if group_by:
+            day = (log[group_by], day)
+        log_days[log['pk']] = day
+        timestamp = log['timestamp'].isoformat()
+        last_log_id = _max(last_log_id, log['pk'])
+
+        bucket = buckets.get(day)
+        if bucket is None:
+            bucket = buckets[day] = _new_bucket()
+
+        bucket['log_count'] += 1
+        wizards.setdefault(day, set()).add(log['wizard_id'])
+        bucket['first'] = _min(bucket['first'], timestamp)
+        bucket['last'] = _max(bucket['last'], timestamp)
+
+        if has_clear_time and log['clear_time'] is not None:
+            seconds = log['clear_time'].total_seconds()
+            clear_time = bucket['clear_time']
+            clear_time['count'] += 1
+            clear_time['sum'] += seconds
+            clear_time['sum_sq'] += seconds ** 2
+            clear_time['min'] = _min(clear_time['min'], seconds)
+            clear_time['max'] = _max(clear_time['max'], seconds)
+            bin_counts = clear_time['bins'].setdefault(
+                str(_bin(seconds, CLEAR_TIME_BIN_WIDTH.total_seconds())), {}
+            )
+            success = str(log['success'])
+            bin_counts[success] = bin_counts.get(success, 0) + 1
+
+    for day, day_wizards in wizards.items():
+        buckets[day]['wizards'] = sorted(day_wizards)
+
+    if not log_days:
+        return buckets, last_log_id
+
+    for drop_type in DROP_TYPES.keys():
+        if not hasattr(qs.model, drop_type):
+            continue
+
+        fields, dimensions = DROP_DIMENSIONS[drop_type]
+        drop_model = getattr(qs.model, drop_type).field.model
+
+        for row in drop_model.objects.filter(log__in=qs).values('log_id', *fields).order_by().iterator():
+            bucket_drops = buckets[log_days[row['log_id']]]['drops'].setdefault(drop_type, {})
+            for dimension, key, quantity in dimensions(row):
+                _add_stat(bucket_drops.setdefault(dimension, {}), key, quantity)
+
+    return buckets, last_log_id
+
+
+def settled_log_id(qs):
+    """
+    ID up to which the logs in qs are complete. Logs created by a start command have no result until the matching result
+    command arrives, so logs from the oldest incomplete one on are left for a later run. Abandoned logs are removed by
+    the clean_incomplete_logs task.
+    """
+    incomplete = qs.filter(success__isnull=True).aggregate(Min('pk'))['pk__min']
+    if incomplete is not None:
+        return incomplete - 1
+
+    return qs.aggregate(Max('pk'))['pk__max']
+
+
+def expire_buckets(buckets, report_timespan=REPORT_TIMESPAN, minimum_count=MINIMUM_COUNT, now=None):
+    # Keep every bucket inside the report timespan, plus older buckets until minimum_count logs are covered
+    now = now or timezone.now()
+    cutoff = _day_key(now - report_timespan)
+    kept = {}
+    running_count = 0
+
+    for day in sorted(buckets.keys(), reverse=True):
+        if day >= cutoff or running_count < minimum_count:
+            kept[day] = buckets[day]
+            running_count += buckets[day]['log_count']
+
+    return kept
+
+
+# Report construction from merged aggregates
+def _total(drop_stats, dimension):
+    return sum(stats[0] for stats in drop_stats.get(dimension, {}).values())
+
+
+def _none_last(pair):
+    return pair[0] is None, pair[0] if pair[0] is not None else 0
+
+
+def _occurrences(counter, min_count=None, order_by_key=False):
+    # List of (parsed key, count) ordered like the ORM based reports
+    data = [
+        (_parse_key(key), stats[0]) for key, stats in counter.items()
+        if min_count is None or stats[0] > min_count
+    ]
+
+    if order_by_key:
+        return sorted(data, key=_none_last)
+
+    return sorted(data, key=lambda x: -x[1])
+
+
+def _histogram(bin_counts, edges, labels, slices):
+    """
+    Fold pre-binned counts into a histogram with the same shape as django_pivot.histogram
+
+    :param bin_counts: dict of {bin start: {slice label: count}}
+    :param edges: list of bin start values, ascending
+    :param labels: display label of each bin
+    :param slices: ordered list of slice labels present in the data
+    """
+    results = [{'bin': label, **{s: 0 for s in slices}} for label in labels]
+
+    if not edges:
+        return results
+
+    for bin_start, slice_counts in bin_counts.items():
+        if bin_start < edges[0]:
+            continue
+
+        idx = bisect_right(edges, bin_start) - 1
+        for slice_name, count in slice_counts.items():
+            results[idx][slice_name] += count
+
+    return results
+
+
+def _sliced_bins(counter, slice_choices):
+    # Split 'bin:slice' keyed counter into {bin: {slice display: count}} and the ordered slice displays present
+    bin_counts = {}
+    slice_values = set()
+    choices = dict(slice_choices)
+
+    for key, stats in counter.items():
+        bin_start, slice_value = _split_key(key)
+        slice_values.add(slice_value)
+        slice_name = choices.get(slice_value, slice_value)
+        slice_bin = bin_counts.setdefault(bin_start, {})
+        slice_bin[slice_name] = slice_bin.get(slice_name, 0) + stats[0]
+
+    slices = [choices.get(v, v) for v in sorted(slice_values, key=lambda x: (x is None, x if x is not None else 0))]
+    return bin_counts, slices
+
+
+def _clear_time_report(clear_time):
+    if not clear_time['count']:
+        return None
+
+    avg_seconds = clear_time['sum'] / clear_time['count']
+    std_dev = sqrt(max(clear_time['sum_sq'] / clear_time['count'] - avg_seconds ** 2, 0))
+    min_clear = timedelta(seconds=clear_time['min'])
+    max_clear = timedelta(seconds=clear_time['max'])
+    avg_clear = timedelta(seconds=avg_seconds)
+
+    # Use +/- 3 std deviations of clear time avg as bounds for time range in case of extreme outliers skewing chart scale
+    min_time = round_timedelta(
+        max(min_clear, avg_clear - timedelta(seconds=std_dev * 3)),
+        CLEAR_TIME_BIN_WIDTH,
+        direction='down',
+    )
+    max_time = round_timedelta(
+        min(max_clear, avg_clear + timedelta(seconds=std_dev * 3)),
+        CLEAR_TIME_BIN_WIDTH,
+        direction='up',
+    )
+    bins = [min_time + CLEAR_TIME_BIN_WIDTH * x for x in range(0, int((max_time - min_time) / CLEAR_TIME_BIN_WIDTH))]
+
+    bin_counts = {float(k): v for k, v in clear_time['bins'].items()}
+    slices = sorted({s for counts in bin_counts.values() for s in counts})
+
+    return {
+        'min': str(min_clear),
+        'max': str(max_clear),
+        'avg': str(avg_clear),
+        'chart': {
+            'type': 'histogram',
+            'width': 5,
+            'data': _histogram(bin_counts, [b.total_seconds() for b in bins], [str(b) for b in bins], slices),
+        }
+    }
+
+
+def _monster_info(monster):
+    return {
+        'name': monster.name,
+        'slug': monster.bestiary_slug,
+        'icon': monster.image_filename,
+        'element': monster.element,
+        'can_awaken': monster.can_awaken,
+        'is_awakened': monster.is_awakened,
+    }
+
+
+def _item_summary(drop_stats, total_log_count, min_count, **kwargs):
+    counter = drop_stats.get('item', {})
+    items = GameItem.objects.in_bulk([int(k) for k in counter.keys()])
+    rows = []
+
+    for key, (count, qty_sum, qty_min, qty_max) in counter.items():
+        item = items.get(int(key))
+        if item is None or count < min_count:
+            continue
+        if kwargs.get('exclude_social_points') and item.category == GameItem.CATEGORY_CURRENCY and item.name == 'Social Point':
+            continue
+        rows.append((item, count, qty_sum, qty_min, qty_max))
+
+    chart_data = [
+        {'name': item.name, 'count': count} for item, count, *_ in sorted(rows, key=lambda r: -r[1])
+        if kwargs.get('include_currency') or item.category != GameItem.CATEGORY_CURRENCY
+    ]
+    table_data = [
+        {
+            'name': item.name,
+            'icon': item.icon,
+            'count': count,
+            'min': qty_min,
+            'max': qty_max,
+            'avg': qty_sum / count,
+            'drop_chance': count / total_log_count * 100,
+            'qty_per_100': qty_sum / total_log_count * 100,
+        } for item, count, qty_sum, qty_min, qty_max in sorted(
+            rows, key=lambda r: (r[0].category is None, r[0].category or 0, -r[1])
+        )
+    ]
+
+    return chart_data, table_data
+
+
+def _monster_summary(drop_stats, total_log_count, min_count, **kwargs):
+    counter = drop_stats.get('monster', {})
+    keys = {key: _split_key(key) for key in counter.keys()}
+    monsters = Monster.objects.in_bulk({monster_id for monster_id, _ in keys.values()})
+
+    by_grade = {}
+    table_data = []
+    for key, stats in counter.items():
+        monster_id, grade = keys[key]
+        by_grade[grade] = by_grade.get(grade, 0) + stats[0]
+
+        if stats[0] >= min_count and monster_id in monsters:
+            table_data.append({
+                **_monster_info(monsters[monster_id]),
+                'stars': grade,
+                'count': stats[0],
+                'drop_chance': stats[0] / total_log_count * 100,
+                'qty_per_100': stats[0] / total_log_count * 100,
+            })
+
+    chart_data = [
+        {'name': f'{grade}⭐ Monster', 'count': count}
+        for grade, count in sorted(by_grade.items(), key=lambda x: -x[1]) if count >= min_count
+    ]
+
+    return chart_data, replace_value_with_choice(table_data, {'element': Monster.ELEMENT_CHOICES})
+
+
+def _counts_list(counter, name, min_count=0):
+    return [
+        {name: key, 'count': count} for key, count in _occurrences(counter, order_by_key=True) if count >= min_count
+    ]
+
+
+def _craft_counter(drop_stats, position, craft_types=None):
+    # Collapse the combined craft dimension into counts by a single attribute
+    counter = {}
+    for key, stats in drop_stats.get('craft', {}).items():
+        parts = key.split(':')
+        if craft_types is not None and _parse_key(parts[0]) not in craft_types:
+            continue
+        counter[parts[position]] = counter.get(parts[position], [0])
+        counter[parts[position]][0] += stats[0]
+    return counter
+
+
+def _rune_craft_summary(drop_stats, total_log_count, min_count, **kwargs):
+    chart_data = replace_value_with_choice(
+        [{'name': key, 'count': count} for key, count in _occurrences(_craft_counter(drop_stats, 0)) if count >= min_count],
+        {'name': models.RuneCraftDrop.CRAFT_CHOICES}
+    )
+    table_data = {
+        'sets': replace_value_with_choice(
+            _counts_list(_craft_counter(drop_stats, 1), 'rune', min_count),
+            {'rune': Rune.TYPE_CHOICES}
+        ),
+        'type': replace_value_with_choice(
+            _counts_list(_craft_counter(drop_stats, 0), 'type', min_count),
+            {'type': Rune.TYPE_CHOICES}
+        ),
+        'quality': replace_value_with_choice(
+            _counts_list(_craft_counter(drop_stats, 2), 'quality', min_count),
+            {'quality': Rune.QUALITY_CHOICES}
+        ),
+    }
+
+    return chart_data, table_data
+
+
+def _name_count_chart(drop_type, drop_stats):
+    # Chart is name, count only
+    item_name = ' '.join([s.capitalize() for s in drop_type.split('_')]).rstrip('s')
+    count = _total(drop_stats, DROP_TOTAL_DIMENSIONS[drop_type])
+    return [{'name': item_name, 'count': count}] if count > 0 else []
+
+
+def _monster_piece_summary(drop_stats, total_log_count, min_count, **kwargs):
+    counter = drop_stats.get('monster', {})
+    monsters = Monster.objects.in_bulk([int(k) for k in counter.keys()])
+
+    table_data = [
+        {
+            **_monster_info(monsters[int(key)]),
+            'stars': monsters[int(key)].natural_stars,
+            'count': count,
+            'min': qty_min,
+            'max': qty_max,
+            'avg': qty_sum / count,
+            'drop_chance': count / total_log_count * 100,
+            'qty_per_100': qty_sum / total_log_count * 100,
+        } for key, (count, qty_sum, qty_min, qty_max) in counter.items()
+        if count >= min_count and int(key) in monsters
+    ]
+
+    return (
+        _name_count_chart(models.MonsterPieceDrop.RELATED_NAME, drop_stats),
+        replace_value_with_choice(table_data, {'element': Monster.ELEMENT_CHOICES}),
+    )
+
+
+def _rune_summary(drop_stats, total_log_count, min_count, **kwargs):
+    return _name_count_chart(models.RuneDrop.RELATED_NAME, drop_stats), {
+        'sets': replace_value_with_choice(
+            _counts_list(drop_stats.get('type', {}), 'type', min_count),
+            {'type': Rune.TYPE_CHOICES}
+        ),
+        'slots': _counts_list(drop_stats.get('slot', {}), 'slot', min_count),
+        'quality': replace_value_with_choice(
+            _counts_list(drop_stats.get('quality', {}), 'quality', min_count),
+            {'quality': Rune.QUALITY_CHOICES}
+        ),
+    }
+
+
+def _artifact_summary(drop_stats, total_log_count, min_count, **kwargs):
+    return _name_count_chart(models.ArtifactDrop.RELATED_NAME, drop_stats), {
+        'element': _counts_list(drop_stats.get('element', {}), 'element', min_count),
+        'archetype': _counts_list(drop_stats.get('archetype', {}), 'archetype', min_count),
+        'quality': replace_value_with_choice(
+            _counts_list(drop_stats.get('quality', {}), 'quality', min_count),
+            {'quality': Artifact.QUALITY_CHOICES}
+        ),
+    }
+
+
+def _secret_dungeon_summary(drop_stats, total_log_count, min_count, **kwargs):
+    counter = drop_stats.get('level', {})
+    levels = Level.objects.select_related('dungeon__secretdungeon__monster').in_bulk([int(k) for k in counter.keys()])
+    table_data = []
+
+    for key, stats in counter.items():
+        level = levels.get(int(key))
+        if level is None or stats[0] < min_count:
+            continue
+
+        monster = level.dungeon.secretdungeon.monster
+        table_data.append({
+            **_monster_info(monster),
+            'stars': monster.natural_stars,
+            'count': stats[0],
+            'drop_chance': stats[0] / total_log_count * 100,
+            'qty_per_100': stats[0] / total_log_count * 100,
+        })
+
+    return (
+        _name_count_chart(models.DungeonSecretDungeonDrop.RELATED_NAME, drop_stats),
+        replace_value_with_choice(table_data, {'element': Monster.ELEMENT_CHOICES}),
+    )
+
+
+# Summary chart rows and table of each drop type
+SUMMARY_BUILDERS = {
+    models.ItemDrop.RELATED_NAME: _item_summary,
+    models.MonsterDrop.RELATED_NAME: _monster_summary,
+    models.MonsterPieceDrop.RELATED_NAME: _monster_piece_summary,
+    models.RuneDrop.RELATED_NAME: _rune_summary,
+    models.RuneCraftDrop.RELATED_NAME: _rune_craft_summary,
+    models.ArtifactDrop.RELATED_NAME: _artifact_summary,
+    models.DungeonSecretDungeonDrop.RELATED_NAME: _secret_dungeon_summary,
+}
+
+
+def get_report_summary(drops, total_log_count, **kwargs):
+    summary = {
+        'table': {},
+        'chart': [],
+    }
+
+    min_count = kwargs.pop('min_count', max(1, int(MINIMUM_THRESHOLD * total_log_count)))
+
+    for drop_type, drop_stats in drops.items():
+        chart_data, table_data = SUMMARY_BUILDERS[drop_type](drop_stats, total_log_count, min_count, **kwargs)
+        summary['chart'] += chart_data
+
+        if table_data:
+            summary['table'][drop_type] = table_data
+
+    return summary
+
+
+def _occurrence_chart(counter, total, choices=None, min_count=None, order_by_key=False, key_format=None):
+    data = _occurrences(counter, min_count=min_count, order_by_key=order_by_key)
+    if key_format:
+        data = [(key_format(k), v) for k, v in data]
+
+    rows = [{'key': k, 'count': v} for k, v in data]
+    if choices:
+        rows = replace_value_with_choice(rows, {'key': choices})
+
+    return {
+        'type': 'occurrences',
+        'total': total,
+        'data': transform_to_dict(rows, name_key='key'),
+    }
+
+
+def get_item_report(drop_stats, total_log_count, **kwargs):
+    counter = drop_stats.get('item', {})
+    if not counter:
+        return None
+
+    min_count = kwargs.get('min_count', max(1, int(MINIMUM_THRESHOLD * total_log_count)))
+    items = GameItem.objects.in_bulk([int(k) for k in counter.keys()])
+
+    return [
+        {
+            'item': int(key),
+            'name': items[int(key)].name,
+            'icon': items[int(key)].icon,
+            'count': count,
+            'min': qty_min,
+            'max': qty_max,
+            'avg': qty_sum / count,
+            'drop_chance': count / total_log_count * 100,
+            'qty_per_100': qty_sum / total_log_count * 100,
+        } for key, (count, qty_sum, qty_min, qty_max) in sorted(counter.items(), key=lambda x: -x[1][0])
+        if count > min_count and int(key) in items
+    ]
+
+
+def get_monster_report(drop_stats, total_log_count, **kwargs):
+    counter = drop_stats.get('monster', {})
+    if not counter:
+        return None
+
+    min_count = kwargs.get('min_count', max(1, int(MINIMUM_THRESHOLD * total_log_count)))
+    total = _total(drop_stats, 'monster')
+    monster_counts = {}
+    for key, stats in counter.items():
+        monster_id = _split_key(key)[0]
+        monster_counts[monster_id] = monster_counts.get(monster_id, 0) + stats[0]
+
+    monsters = Monster.objects.in_bulk(monster_counts.keys())
+    by_attribute = {
+        'monsters': {},
+        'family': {},
+        'nat_stars': {},
+        'element': {},
+        'awakened': {},
+    }
+
+    for monster_id, count in monster_counts.items():
+        monster = monsters.get(monster_id)
+        if monster is None:
+            continue
+
+        for attribute, key in (
+            ('monsters', f'{monster.element} {monster.name}'.title()),
+            ('family', (monster.family_id, monster.name)),
+            ('nat_stars', f'{monster.natural_stars}⭐'),
+            ('element', monster.element.title()),
+            ('awakened', 'Awakened' if monster.is_awakened else 'Unawakened'),
+        ):
+            by_attribute[attribute][key] = by_attribute[attribute].get(key, 0) + count
+
+    def _report(attribute, key_format=None):
+        data = sorted(
+            [(k, v) for k, v in by_attribute[attribute].items() if v > min_count],
+            key=lambda x: -x[1]
+        )
+        return {
+            'type': 'occurrences',
+            'total': total,
+            'data': {(key_format(k) if key_format else k): v for k, v in data},
+        }
+
+    return {
+        'monsters': _report('monsters'),
+        'family': _report('family', key_format=lambda k: k[1]),
+        'nat_stars': _report('nat_stars'),
+        'element': _report('element'),
+        'awakened': _report('awakened'),
+    }
+
+
+def _sliced_histogram(counter, edges, slice_choices):
+    bin_counts, slices = _sliced_bins(counter, slice_choices)
+    return _histogram(bin_counts, edges, [str(e) for e in edges], slices)
+
+
+def get_rune_report(drop_stats, total_log_count, model=Rune, **kwargs):
+    if not drop_stats.get('type'):
+        return None
+
+    min_count = kwargs.get('min_count', max(1, int(MINIMUM_THRESHOLD * total_log_count)))
+    total = _total(drop_stats, 'type')
+    substats = drop_stats.get('substats', {})
+
+    slot_main_stats = {}
+    main_stats = {}
+    for key, stats in drop_stats.get('slot_main_stat', {}).items():
+        slot, main_stat = key.split(':')
+        slot_main_stats.setdefault(slot, {})[main_stat] = stats
+        main_stats[main_stat] = main_stats.get(main_stat, [0])
+        main_stats[main_stat][0] += stats[0]
+
+    value_counter = drop_stats.get('value', {})
+    if value_counter:
+        min_value = int(floor_to_nearest(min(stats[2] for stats in value_counter.values()), 1000))
+        max_value = int(ceil_to_nearest(max(stats[3] for stats in value_counter.values()), 1000))
+        value_edges = list(range(min_value, max_value, VALUE_BIN_WIDTH))
+    else:
+        value_edges = []
+
+    def _slot_main_stat(slot):
+        counter = slot_main_stats.get(str(slot), {})
+        return _occurrence_chart(
+            counter, sum(s[0] for s in counter.values()), model.STAT_CHOICES, min_count, order_by_key=True
+        )
+
+    return {
+        'stars': _occurrence_chart(drop_stats.get('stars', {}), total, min_count=min_count, key_format=lambda k: f'{k}⭐'),
+        'type': _occurrence_chart(drop_stats.get('type', {}), total, model.TYPE_CHOICES, min_count),
+        'quality': _occurrence_chart(drop_stats.get('quality', {}), total, model.QUALITY_CHOICES, min_count),
+        'slot': _occurrence_chart(drop_stats.get('slot', {}), total, min_count=min_count),
+        'main_stat': _occurrence_chart(main_stats, total, model.STAT_CHOICES, min_count, order_by_key=True),
+        'slot_2_main_stat': _slot_main_stat(2),
+        'slot_4_main_stat': _slot_main_stat(4),
+        'slot_6_main_stat': _slot_main_stat(6),
+        'innate_stat': _occurrence_chart(drop_stats.get('innate_stat', {}), total, model.STAT_CHOICES, min_count, order_by_key=True),
+        'substats': _occurrence_chart(substats, _total(drop_stats, 'substats'), model.STAT_CHOICES, order_by_key=True),
+        'max_efficiency': {
+            'type': 'histogram',
+            'width': 5,
+            'data': _sliced_histogram(drop_stats.get('max_efficiency', {}), list(range(0, 100, 5)), model.QUALITY_CHOICES),
+        },
+        'value': {
+            'type': 'histogram',
+            'width': 500,
+            'data': _sliced_histogram(value_counter, value_edges, model.QUALITY_CHOICES),
+        },
+        'legend_stars': _occurrence_chart(drop_stats.get('legend_stars', {}), total, min_count=min_count, key_format=lambda k: f'{k}⭐'),
+    }
+
+
+def _rune_craft_report_data(drop_stats, craft_types, min_count):
+    type_counter = _craft_counter(drop_stats, 0, craft_types)
+    if not type_counter:
+        return None
+
+    total = sum(s[0] for s in type_counter.values())
+
+    return {
+        'type': _occurrence_chart(type_counter, total, models.RuneCraftDrop.CRAFT_CHOICES, min_count),
+        'rune': _occurrence_chart(_craft_counter(drop_stats, 1, craft_types), total, models.RuneCraftDrop.TYPE_CHOICES, min_count),
+        'quality': _occurrence_chart(_craft_counter(drop_stats, 2, craft_types), total, models.RuneCraftDrop.QUALITY_CHOICES, min_count),
+        'stat': _occurrence_chart(_craft_counter(drop_stats, 3, craft_types), total, models.RuneCraftDrop.STAT_CHOICES, min_count, order_by_key=True),
+    }
+
+
+def get_rune_craft_report(drop_stats, total_log_count, **kwargs):
+    min_count = kwargs.get('min_count', max(1, int(MINIMUM_THRESHOLD * total_log_count)))
+
+    return {
+        'grindstone': _rune_craft_report_data(drop_stats, models.RuneCraftDrop.CRAFT_GRINDSTONES, min_count),
+        'gem': _rune_craft_report_data(drop_stats, models.RuneCraftDrop.CRAFT_ENCHANT_GEMS, min_count),
+    }
+
+
+def get_artifact_report(drop_stats, total_log_count, **kwargs):
+    if not drop_stats.get('quality'):
+        return None
+
+    min_count = kwargs.get('min_count', max(1, int(MINIMUM_THRESHOLD * total_log_count)))
+    total = _total(drop_stats, 'quality')
+
+    return {
+        'element': _occurrence_chart(drop_stats.get('element', {}), _total(drop_stats, 'element'), Artifact.ELEMENT_CHOICES, min_count),
+        'archetype': _occurrence_chart(drop_stats.get('archetype', {}), _total(drop_stats, 'archetype'), Artifact.ARCHETYPE_CHOICES, min_count),
+        'quality': _occurrence_chart(drop_stats.get('quality', {}), total, Artifact.QUALITY_CHOICES, min_count),
+        'main_stat': _occurrence_chart(drop_stats.get('main_stat', {}), total, Artifact.STAT_CHOICES, min_count, order_by_key=True),
+        'effects': _occurrence_chart(drop_stats.get('effects', {}), _total(drop_stats, 'effects'), Artifact.EFFECT_CHOICES, order_by_key=True),
+        'max_efficiency': {
+            'type': 'histogram',
+            'width': 5,
+            'data': _sliced_histogram(drop_stats.get('max_efficiency', {}), list(range(0, 100, 5)), Artifact.QUALITY_CHOICES),
+        },
+    }
+
+
+AGGREGATE_DROP_TYPES = {
+    models.ItemDrop.RELATED_NAME: get_item_report,
+    models.MonsterDrop.RELATED_NAME: get_monster_report,
+    models.MonsterPieceDrop.RELATED_NAME: None,
+    models.RuneDrop.RELATED_NAME: get_rune_report,
+    models.RuneCraftDrop.RELATED_NAME: get_rune_craft_report,
+    models.ArtifactDrop.RELATED_NAME: get_artifact_report,
+    models.DungeonSecretDungeonDrop.RELATED_NAME: None,
+}
+
+
+def drop_report_from_aggregates(model, merged, **kwargs):
+    # Equivalent of generate.drop_report() computed from a merged bucket instead of the raw log tables
+    report_data = {}
+    total_log_count = merged['log_count']
+    drops = {
+        drop_type: merged['drops'].get(drop_type, {})
+        for drop_type in AGGREGATE_DROP_TYPES.keys() if hasattr(model, drop_type)
+    }
+
+    report_data['summary'] = get_report_summary(drops, total_log_count, **kwargs)
+
+    if hasattr(model, 'clear_time'):
+        clear_time = _clear_time_report(merged['clear_time'])
+        if clear_time:
+            report_data['clear_time'] = clear_time
+
+    # Detail reports are scaled by the number of drops of that type, same as drop_report()
+    for drop_type, drop_stats in drops.items():
+        if AGGREGATE_DROP_TYPES[drop_type]:
+            report_data[drop_type] = AGGREGATE_DROP_TYPES[drop_type](
+                drop_stats, _total(drop_stats, DROP_TOTAL_DIMENSIONS[drop_type]), **kwargs
+            )
+
+    return report_data
+
+
+def update_level_aggregate(model, level, content_type, report_timespan=REPORT_TIMESPAN, minimum_count=MINIMUM_COUNT):
+    aggregate, _ = models.LevelReportAggregate.objects.get_or_create(content_type=content_type, level=level)
+    qs = model.objects.filter(level=level)
+
+    if aggregate.last_log_id is None:
+        # First run - seed the buckets with the same window a full report would use
+        buckets = {}
+    else:
+        buckets = aggregate.buckets
+        qs = qs.filter(pk__gt=aggregate.last_log_id)
+
+    last_log_id = settled_log_id(qs)
+
+    if last_log_id is not None:
+        new_logs = qs.filter(success=True, pk__lte=last_log_id)
+        if aggregate.last_log_id is None:
+            new_logs = slice_records(new_logs, minimum_count=minimum_count, report_timespan=report_timespan).records
+
+        new_buckets, _ = fold_logs(new_logs)
+        for day, bucket in new_buckets.items():
+            if day in buckets:
+                merge_bucket(buckets[day], bucket)
+            else:
+                buckets[day] = bucket
+
+        aggregate.last_log_id = last_log_id
+
+    aggregate.buckets = expire_buckets(buckets, report_timespan, minimum_count)
+    aggregate.save()
+
+    return aggregate
+
+
+def generate_incremental_level_reports(model, **kwargs):
+    content_type = ContentType.objects.get_for_model(model)
+    levels = model.objects.values_list('level', flat=True).distinct().order_by()
+
+    for level in Level.objects.filter(pk__in=levels):
+        aggregate = update_level_aggregate(model, level, content_type)
+        merged = merge_buckets(aggregate.buckets.values())
+
+        if merged['log_count'] > 0:
+            start_timestamp = min(bucket['first'] for bucket in aggregate.buckets.values())
+
+            models.LevelReport.objects.create(
+                level=level,
+                content_type=content_type,
+                start_timestamp=start_timestamp,
+                end_timestamp=max(bucket['last'] for bucket in aggregate.buckets.values()),
+                log_count=merged['log_count'],
+                unique_contributors=len(merged['wizards']),
+                report=drop_report_from_aggregates(model, merged, **kwargs),
+            )
+
+
+def generate_dungeon_log_reports(**kwargs):
+    generate_incremental_level_reports(models.DungeonLog, **kwargs)
+
+
+def generate_rift_raid_reports():
+    generate_incremental_level_reports(models.RiftRaidLog, **RIFT_RAID_REPORT_KWARGS)
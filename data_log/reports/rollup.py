@@ -0,0 +1,240 @@
+import pytz
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Max, Min, Sum
+from django.utils.dateparse import parse_date, parse_datetime
+
+from bestiary.models import Level
+from data_log import models
+from .generate import RIFT_RAID_REPORT_KWARGS
+from .incremental import REPORT_TIMESPAN, MINIMUM_COUNT, fold_logs, merge_bucket, expire_buckets, \
+    drop_report_from_aggregates, settled_log_id, _new_bucket
+
+# Level reports can be built from daily rollups of the logs and their drops instead of the raw log tables:
+# - LevelLogRollup: log count, first/last timestamp, clear time stats and wizards of the successful logs of a level on
+#   a day
+# - LevelDropRollup: [count, quantity sum, min, max] of one drop dimension key of a level on a day, e.g. runes of slot 2
+#
+# These are the per-day buckets of the incremental reports stored as rows, so reports for any window of days sum a few
+# hundred rows per level. update_rollups() feeds them with the logs received since its last run, tracked by log ID in
+# LevelRollupWatermark. It runs before each rollup report generation and should also be scheduled with celery beat
+# through data_log.tasks.update_level_rollups.
+
+ROLLUP_MODELS = [models.DungeonLog, models.RiftRaidLog]
+
+# Range of log IDs rolled up in one transaction
+BATCH_SIZE = 10000
+
+
+def _log_bucket(log_rollup):
+    bucket = _new_bucket()
+    bucket['log_count'] = log_rollup.log_count
+    bucket['first'] = log_rollup.first_timestamp.astimezone(pytz.utc).isoformat()
+    bucket['last'] = log_rollup.last_timestamp.astimezone(pytz.utc).isoformat()
+    bucket['clear_time'] = log_rollup.clear_time or bucket['clear_time']
+    bucket['wizards'] = log_rollup.wizards
+    return bucket
+
+
+def _load_buckets(content_type, keys):
+    # Stored rollups of the (level ID, day) keys as buckets
+    days = {day for _, day in keys}
+    levels = {level_id for level_id, _ in keys}
+    filters = {
+        'content_type': content_type,
+        'level_id__in': levels,
+        'day__in': days,
+    }
+    buckets = {}
+
+    for log_rollup in models.LevelLogRollup.objects.filter(**filters):
+        key = (log_rollup.level_id, log_rollup.day.isoformat())
+        if key in keys:
+            buckets[key] = _log_bucket(log_rollup)
+
+    for drop in models.LevelDropRollup.objects.filter(**filters).iterator():
+        bucket = buckets.get((drop.level_id, drop.day.isoformat()))
+        if bucket is not None:
+            counter = bucket['drops'].setdefault(drop.drop_type, {}).setdefault(drop.dimension, {})
+            counter[drop.key] = [drop.count, drop.quantity_sum, drop.quantity_min, drop.quantity_max]
+
+    return buckets
+
+
+def _save_bucket(content_type, level_id, day, bucket):
+    filters = {
+        'content_type': content_type,
+        'level_id': level_id,
+        'day': parse_date(day),
+    }
+    models.LevelLogRollup.objects.update_or_create(**filters, defaults={
+        'log_count': bucket['log_count'],
+        'first_timestamp': parse_datetime(bucket['first']),
+        'last_timestamp': parse_datetime(bucket['last']),
+        'clear_time': bucket['clear_time'],
+        'wizards': bucket['wizards'],
+    })
+
+    models.LevelDropRollup.objects.filter(**filters).delete()
+    models.LevelDropRollup.objects.bulk_create([
+        models.LevelDropRollup(
+            **filters,
+            drop_type=drop_type,
+            dimension=dimension,
+            key=key,
+            count=count,
+            quantity_sum=qty_sum,
+            quantity_min=qty_min,
+            quantity_max=qty_max,
+        )
+        for drop_type, dimensions in bucket['drops'].items()
+        for dimension, counter in dimensions.items()
+        for key, (count, qty_sum, qty_min, qty_max) in counter.items()
+    ])
+
+
+def _roll_up(content_type, logs):
+    new_buckets, _ = fold_logs(logs, group_by='level_id')
+
+    if not new_buckets:
+        return 0
+
+    buckets = _load_buckets(content_type, set(new_buckets.keys()))
+
+    for (level_id, day), bucket in new_buckets.items():
+        if (level_id, day) in buckets:
+            bucket = merge_bucket(buckets[(level_id, day)], bucket)
+        _save_bucket(content_type, level_id, day, bucket)
+
+    return sum(bucket['log_count'] for bucket in new_buckets.values())
+
+
+def update_rollups(model):
+    """
+    Roll up the successful logs of model received since the last run, BATCH_SIZE log IDs at a time. The first run rolls
+    up every log. Logs from the oldest incomplete one on are left for a later run, see settled_log_id().
+
+    :return: number of logs rolled up
+    """
+    content_type = ContentType.objects.get_for_model(model)
+    watermark, _ = models.LevelRollupWatermark.objects.get_or_create(content_type=content_type)
+    qs = model.objects.all()
+
+    if watermark.last_log_id is not None:
+        qs = qs.filter(pk__gt=watermark.last_log_id)
+    last_log_id = settled_log_id(qs)
+    if last_log_id is None:
+        return 0
+    first_log_id = qs.aggregate(Min('pk'))['pk__min']
+
+    rolled_up = 0
+    while True:
+        # Separate transactions so a backfill keeps its progress if interrupted. The watermark is locked so concurrent
+        # runs do not roll up the same logs twice.
+        with transaction.atomic():
+            watermark = models.LevelRollupWatermark.objects.select_for_update().get(content_type=content_type)
+            start = watermark.last_log_id if watermark.last_log_id is not None else first_log_id - 1
+            if start >= last_log_id:
+                break
+
+            end = min(start + BATCH_SIZE, last_log_id)
+            rolled_up += _roll_up(content_type, model.objects.filter(success=True, pk__gt=start, pk__lte=end))
+            watermark.last_log_id = end
+            watermark.save()
+
+    return rolled_up
+
+
+def rollup_bucket(model, level_id, start_day=None, end_day=None):
+    """
+    Merged bucket of the rollups of a level from start_day to end_day, both inclusive and optional.
+    """
+    filters = {
+        'content_type': ContentType.objects.get_for_model(model),
+        'level_id': level_id,
+    }
+    if start_day is not None:
+        filters['day__gte'] = start_day
+    if end_day is not None:
+        filters['day__lte'] = end_day
+
+    merged = _new_bucket()
+    for log_rollup in models.LevelLogRollup.objects.filter(**filters):
+        merge_bucket(merged, _log_bucket(log_rollup))
+
+    drops = models.LevelDropRollup.objects.filter(**filters).values('drop_type', 'dimension', 'key').annotate(
+        total_count=Sum('count'),
+        total_quantity=Sum('quantity_sum'),
+        min_quantity=Min('quantity_min'),
+        max_quantity=Max('quantity_max'),
+    ).order_by()
+
+    for drop in drops:
+        counter = merged['drops'].setdefault(drop['drop_type'], {}).setdefault(drop['dimension'], {})
+        counter[drop['key']] = [drop['total_count'], drop['total_quantity'], drop['min_quantity'], drop['max_quantity']]
+
+    return merged
+
+
+def report_start_day(model, level_id, report_timespan=REPORT_TIMESPAN, minimum_count=MINIMUM_COUNT, now=None):
+    # First day of the window a full report would cover: the report timespan, extended until minimum_count logs
+    day_counts = models.LevelLogRollup.objects.filter(
+        content_type=ContentType.objects.get_for_model(model),
+        level_id=level_id,
+    ).values_list('day', 'log_count')
+    kept = expire_buckets(
+        {day.isoformat(): {'log_count': log_count} for day, log_count in day_counts},
+        report_timespan,
+        minimum_count,
+        now,
+    )
+
+    return parse_date(min(kept.keys())) if kept else None
+
+
+def level_report_fields(model, level_id, start_day=None, end_day=None, **kwargs):
+    """
+    Field values of a LevelReport built from rollups, same as generate.level_report_fields(). Without start_day and
+    end_day the report covers the same window as a full report.
+    """
+    if start_day is None and end_day is None:
+        start_day = report_start_day(model, level_id)
+        if start_day is None:
+            return None
+
+    merged = rollup_bucket(model, level_id, start_day, end_day)
+    if not merged['log_count']:
+        return None
+
+    content_type = ContentType.objects.get_for_model(model)
+
+    return {
+        'content_type_id': content_type.pk,
+        'start_timestamp': parse_datetime(merged['first']),
+        'end_timestamp': parse_datetime(merged['last']),
+        'log_count': merged['log_count'],
+        'unique_contributors': len(merged['wizards']),
+        'report': drop_report_from_aggregates(model, merged, **kwargs),
+        'level_id': level_id,
+    }
+
+
+def generate_rollup_level_reports(model, **kwargs):
+    update_rollups(model)
+    level_ids = models.LevelLogRollup.objects.filter(
+        content_type=ContentType.objects.get_for_model(model)
+    ).values_list('level', flat=True).distinct().order_by()
+
+    for level in Level.objects.filter(pk__in=level_ids):
+        fields = level_report_fields(model, level.pk, **kwargs)
+
+        if fields:
+            models.LevelReport.objects.create(**fields)
+
+
+def generate_dungeon_log_reports(**kwargs):
+    generate_rollup_level_reports(models.DungeonLog, **kwargs)
+
+
+def generate_rift_raid_reports():
+    generate_rollup_level_reports(models.RiftRaidLog, **RIFT_RAID_REPORT_KWARGS)
@@ -1,18 +1,46 @@
+import logging
+import traceback
 from datetime import timedelta
+from time import perf_counter
 
-from celery import shared_task
+from celery import shared_task, chord
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Q
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
-from .models import DungeonLog, RiftRaidLog, WorldBossLog
+from bestiary.models import Level
+from .game_commands import parse_log_data
+from .models import DungeonLog, RiftRaidLog, WorldBossLog, RiftDungeonLog, MagicBoxCraft, CraftRuneLog, LevelReport, \
+    MagicShopRefreshReport, MagicBoxCraftingReport, WishReport, SummonReport, RuneCraftingReport, PendingLog
 from .reports.generate import generate_dungeon_log_reports, generate_magic_box_crafting_reports, generate_rift_raid_reports, generate_rift_dungeon_reports, generate_shop_refresh_reports, generate_summon_reports, generate_wish_reports, \
-    generate_world_boss_dungeon_reports, generate_rune_crafting_reports
+    generate_world_boss_dungeon_reports, generate_rune_crafting_reports, level_report_fields, by_grade_report_fields, \
+    shop_refresh_report_fields, magic_box_crafting_report_fields, wish_report_fields, summon_item_groups, \
+    summon_report_fields, rune_crafting_report_fields, RIFT_RAID_REPORT_KWARGS
+from .reports import incremental, rollup
+from . import partitions
+
+logger = logging.getLogger(__name__)
+
+
+# Dungeon and rift raid report generators of each settings.LEVEL_REPORTS mode
+LEVEL_REPORT_GENERATORS = {
+    'full': (generate_dungeon_log_reports, generate_rift_raid_reports),
+    'incremental': (incremental.generate_dungeon_log_reports, incremental.generate_rift_raid_reports),
+    'rollup': (rollup.generate_dungeon_log_reports, rollup.generate_rift_raid_reports),
+}
 
 
 @shared_task
-def generate_all_reports():
-    generate_dungeon_log_reports()
-    generate_rift_raid_reports()
+def generate_all_reports(level_reports=None):
+    level_reports = level_reports or settings.LEVEL_REPORTS
+    if level_reports not in LEVEL_REPORT_GENERATORS:
+        raise ValueError(f'Unknown level report mode {level_reports}, expected {", ".join(LEVEL_REPORT_GENERATORS)}')
+
+    for generate in LEVEL_REPORT_GENERATORS[level_reports]:
+        generate()
     generate_rift_dungeon_reports()
     generate_world_boss_dungeon_reports()
     generate_shop_refresh_reports()
@@ -22,6 +50,144 @@ def generate_all_reports():
     generate_rune_crafting_reports()
 
 
+# Parallel report generation. Each unit of work computes the field values of one report and hands them back,
+# then publish_reports() writes every report in a single transaction once all units have finished.
+REPORT_UNITS = {
+    'level': (LevelReport, lambda model_name, level_id, kwargs: level_report_fields(
+        apps.get_model('data_log', model_name), level_id, **kwargs)),
+    'by_grade': (LevelReport, lambda model_name, level_id: by_grade_report_fields(
+        apps.get_model('data_log', model_name), level_id)),
+    'shop_refresh': (MagicShopRefreshReport, shop_refresh_report_fields),
+    'magic_box': (MagicBoxCraftingReport, magic_box_crafting_report_fields),
+    'wish': (WishReport, wish_report_fields),
+    'summon': (SummonReport, summon_report_fields),
+    'rune_crafting': (RuneCraftingReport, rune_crafting_report_fields),
+}
+
+
+def _level_ids(model):
+    return list(Level.objects.filter(
+        pk__in=model.objects.values_list('level', flat=True).distinct().order_by()
+    ).values_list('pk', flat=True))
+
+
+def report_units():
+    units = []
+
+    for level_id in _level_ids(DungeonLog):
+        units.append(('level', DungeonLog.__name__, level_id, {}))
+
+    for level_id in _level_ids(RiftRaidLog):
+        units.append(('level', RiftRaidLog.__name__, level_id, RIFT_RAID_REPORT_KWARGS))
+
+    for model in [RiftDungeonLog, WorldBossLog]:
+        for level_id in _level_ids(model):
+            units.append(('by_grade', model.__name__, level_id))
+
+    units.append(('shop_refresh',))
+    units += [('magic_box', box_id) for box_id, _ in MagicBoxCraft.BOX_CHOICES]
+    units.append(('wish',))
+    units += [('summon', item_id, item_ids) for item_id, item_ids in summon_item_groups().items()]
+    units += [('rune_crafting', craft_id) for craft_id, _ in CraftRuneLog.CRAFT_CHOICES]
+
+    return units
+
+
+@shared_task
+def generate_report(unit, *args):
+    start = perf_counter()
+    _, get_fields = REPORT_UNITS[unit]
+    fields = get_fields(*args)
+
+    return {
+        'unit': unit,
+        'args': args,
+        'fields': fields,
+        'elapsed': perf_counter() - start,
+    }
+
+
+@shared_task
+def publish_reports(results, started_on):
+    start = perf_counter()
+    created = 0
+
+    with transaction.atomic():
+        for result in results:
+            if result['fields']:
+                report_model, _ = REPORT_UNITS[result['unit']]
+                report_model.objects.create(**result['fields'])
+                created += 1
+
+    slowest = max(results, key=lambda r: r['elapsed'], default=None)
+
+    return {
+        'units': len(results),
+        'reports': created,
+        'generate_time': sum(r['elapsed'] for r in results),
+        'publish_time': perf_counter() - start,
+        'wall_time': (timezone.now() - parse_datetime(started_on)).total_seconds(),
+        'slowest': {
+            'unit': slowest['unit'],
+            'args': slowest['args'],
+            'elapsed': slowest['elapsed'],
+        } if slowest else None,
+    }
+
+
+@shared_task
+def generate_all_reports_parallel():
+    started_on = timezone.now().isoformat()
+
+    return chord(
+        generate_report.s(*unit) for unit in report_units()
+    )(publish_reports.s(started_on)).id
+
+
+@shared_task
+def process_log_queue(batch_size=None):
+    # Parse a batch of staged logs. Rows are locked with SKIP LOCKED so several workers can drain the queue at once.
+    batch_size = batch_size or settings.LOG_QUEUE_BATCH_SIZE
+    result = {
+        'parsed': 0,
+        'invalid': 0,
+        'failed': 0,
+    }
+
+    with transaction.atomic():
+        batch = list(
+            PendingLog.objects.select_for_update(skip_locked=True, of=('self', )).select_related('summoner').filter(
+                attempts__lt=settings.LOG_QUEUE_MAX_ATTEMPTS
+            )[:batch_size]
+        )
+        done = []
+
+        for pending in batch:
+            try:
+                # Savepoint per log so one bad log does not discard the rest of the batch
+                with transaction.atomic():
+                    if parse_log_data(pending.summoner, pending.log_data):
+                        result['parsed'] += 1
+                    else:
+                        result['invalid'] += 1
+                done.append(pending.pk)
+            except Exception:
+                # Kept for a retry, or for inspection once out of attempts
+                logger.exception(f'Failed to parse pending log {pending.pk}')
+                result['failed'] += 1
+                pending.attempts += 1
+                pending.error = traceback.format_exc()
+                pending.save(update_fields=['attempts', 'error'])
+
+        PendingLog.objects.filter(pk__in=done).delete()
+
+    if len(batch) == batch_size:
+        # Queue likely has more waiting
+        process_log_queue.delay(batch_size)
+
+    return result
+
+
 @shared_task
 def clean_incomplete_logs():
     # Delete all logs older than 1 day which have only had a start event captured, and no result event
@@ -33,3 +199,15 @@ def clean_incomplete_logs():
     }
 
     return result
+
+
+@shared_task
+def maintain_log_partitions():
+    # Create the log partitions of the coming months and retire old ones, see LOG_RETENTION
+    return partitions.maintain_partitions()
+
+
+@shared_task
+def update_level_rollups():
+    # Roll up the logs received since the last run into the daily level rollups read by rollup level reports
+    return {model.__name__: rollup.update_rollups(model) for model in rollup.ROLLUP_MODELS}
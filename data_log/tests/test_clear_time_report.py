@@ -0,0 +1,117 @@
+from datetime import timedelta
+
+from django.db.models import Count, Min, Max, Avg, F, Q, StdDev
+from django.db.models.functions import Extract
+from django_pivot.histogram import histogram
+
+from bestiary.models import Dungeon
+from data_log import models
+from data_log.reports import incremental
+from data_log.reports.generate import CLEAR_TIME_BIN_WIDTH, clear_time_report
+from data_log.util import round_timedelta
+from .test_log_views import BaseLogTest
+
+
+def _pivot_clear_time_report(qs):
+    # Original aggregate and django_pivot histogram implementation, kept as the reference for output parity
+    successful_runs = qs.filter(
+        Q(success=True) | Q(
+            level__dungeon__category=Dungeon.CATEGORY_RIFT_OF_WORLDS_BEASTS)
+    )
+
+    clear_time_aggs = successful_runs.aggregate(
+        count=Count('pk'),
+        std_dev=StdDev(Extract(F('clear_time'), lookup_name='epoch')),
+        avg=Avg('clear_time'),
+        min=Min('clear_time'),
+        max=Max('clear_time'),
+    )
+
+    if not clear_time_aggs['count']:
+        return None
+
+    # Use +/- 3 std deviations of clear time avg as bounds for time range in case of extreme outliers skewing chart scale
+    min_time = round_timedelta(
+        max(clear_time_aggs['min'], clear_time_aggs['avg'] -
+            timedelta(seconds=clear_time_aggs['std_dev'] * 3)),
+        CLEAR_TIME_BIN_WIDTH,
+        direction='down',
+    )
+    max_time = round_timedelta(
+        min(clear_time_aggs['max'], clear_time_aggs['avg'] +
+            timedelta(seconds=clear_time_aggs['std_dev'] * 3)),
+        CLEAR_TIME_BIN_WIDTH,
+        direction='up',
+    )
+    bins = [min_time + CLEAR_TIME_BIN_WIDTH *
+            x for x in range(0, int((max_time - min_time) / CLEAR_TIME_BIN_WIDTH))]
+
+    # Histogram generates on entire qs, not just successful runs.
+    return {
+        'min': str(clear_time_aggs['min']),
+        'max': str(clear_time_aggs['max']),
+        'avg': str(clear_time_aggs['avg']),
+        'chart': {
+            'type': 'histogram',
+            'width': 5,
+            'data': histogram(qs, 'clear_time', bins, slice_on='success'),
+        }
+    }
+
+
+class ClearTimeReportTests(BaseLogTest):
+    fixtures = ['test_game_items', 'test_levels', 'test_summon_monsters']
+
+    def _spread_logs(self):
+        # Successful runs over several bins with a slow outlier beyond 3 std deviations, and failed runs inside, before
+        # and after the bins. The successful clear times add up to a multiple of their count, so the average is exact.
+        successful = [50 + i % 21 for i in range(30)] + [600]
+        successful[0] += -sum(successful) % len(successful)
+        failed = [20, 55, 63, 900]
+
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        log = models.DungeonLog.objects.get()
+        for seconds, success in [(s, True) for s in successful] + [(s, False) for s in failed]:
+            log.pk = None
+            log.clear_time = timedelta(seconds=seconds)
+            log.success = success
+            log.save()
+
+        # Drop the sample log with its original clear time
+        return models.DungeonLog.objects.exclude(pk=models.DungeonLog.objects.earliest('pk').pk)
+
+    def test_matches_pivot_report(self):
+        qs = self._spread_logs()
+        expected = _pivot_clear_time_report(qs)
+
+        self.assertGreater(len(expected['chart']['data']), 3)
+        self.assertEqual(clear_time_report(qs), expected)
+
+    def test_matches_incremental_report(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        self._do_log('BattleDungeonResult_V2/giants_b10_harmony_drop.json')
+        qs = models.DungeonLog.objects.filter(success=True)
+
+        buckets, _ = incremental.fold_logs(qs)
+        expected = incremental._clear_time_report(incremental.merge_buckets(buckets.values())['clear_time'])
+
+        self.assertEqual(clear_time_report(qs), expected)
+
+    def test_single_query(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+
+        with self.assertNumQueries(1):
+            report = clear_time_report(models.DungeonLog.objects.all())
+
+        self.assertEqual(report['min'], report['max'])
+
+    def test_no_successful_runs(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_failed.json')
+
+        self.assertIsNone(clear_time_report(models.DungeonLog.objects.all()))
+
+    def test_no_successful_runs_matches_pivot_report(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_failed.json')
+        qs = models.DungeonLog.objects.all()
+
+        self.assertEqual(clear_time_report(qs), _pivot_clear_time_report(qs))
@@ -0,0 +1,69 @@
+import json
+import os
+
+from django.test import SimpleTestCase
+from jsonschema import Draft4Validator
+
+from data_log.compiled_schema import compile_validator
+from data_log.game_commands import active_log_commands
+from herders.profile_schema import HubUserLoginSchema
+
+
+class CompiledValidatorTests(SimpleTestCase):
+    schema = {
+        'definitions': {
+            'rune': {
+                'type': 'object',
+                'properties': {
+                    'slot_no': {'type': 'number', 'minimum': 1, 'maximum': 6},
+                    'pri_eff': {'type': 'array', 'items': {'type': 'number'}, 'minItems': 2, 'maxItems': 2},
+                },
+                'required': ['slot_no'],
+            },
+        },
+        'type': 'object',
+        'properties': {
+            'runes': {'type': 'array', 'items': {'$ref': '#/definitions/rune'}},
+            'reward': {'type': ['null', 'object']},
+            'mode': {'type': 'integer'},
+        },
+        'required': ['runes'],
+    }
+
+    def _assert_same_result(self, schema, instance):
+        self.assertEqual(compile_validator(schema).is_valid(instance), Draft4Validator(schema).is_valid(instance))
+
+    def test_valid(self):
+        instance = {'runes': [{'slot_no': 2, 'pri_eff': [1, 2]}], 'reward': None, 'mode': 1}
+        self.assertTrue(compile_validator(self.schema).is_valid(instance))
+
+    def test_invalid(self):
+        for instance in [
+            {},
+            {'runes': [{}]},
+            {'runes': [{'slot_no': 7}]},
+            {'runes': [{'slot_no': 1, 'pri_eff': [1]}]},
+            {'runes': [], 'reward': []},
+            {'runes': [], 'mode': 1.5},
+            {'runes': [], 'mode': True},
+        ]:
+            self.assertFalse(compile_validator(self.schema).is_valid(instance))
+            self._assert_same_result(self.schema, instance)
+
+    def test_errors_only_for_invalid(self):
+        validator = compile_validator(self.schema)
+        self.assertEqual(list(validator.iter_errors({'runes': []})), [])
+        self.assertNotEqual(list(validator.iter_errors({})), [])
+
+    def test_validator_cached(self):
+        self.assertIs(compile_validator(HubUserLoginSchema), compile_validator(HubUserLoginSchema))
+
+    def test_recorded_payloads(self):
+        for root, _, files in os.walk('data_log/tests/game_api_data'):
+            for filename in files:
+                with open(os.path.join(root, filename), 'r') as f:
+                    data = json.load(f)['data']
+
+                command = active_log_commands.get(data['request']['command'])
+                if command:
+                    self._assert_same_result(command.validator.schema, data)
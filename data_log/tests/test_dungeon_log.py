@@ -46,6 +46,13 @@ class CairosLogTests(BaseLogTest):
         log = models.DungeonLog.objects.first()
         self.assertEqual(log.runes.count(), 1)
 
+    def test_dungeon_rune_drop_derived_fields(self):
+        # Drops are bulk inserted so derived fields normally set in save() must still be populated
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        rune = models.DungeonLog.objects.first().runes.first()
+        self.assertIsNotNone(rune.quality)
+        self.assertIsNotNone(rune.max_efficiency)
+
     def test_dungeon_item_drop(self):
         self._do_log('BattleDungeonResult_V2/giants_b10_harmony_drop.json')
         log = models.DungeonLog.objects.first()
@@ -93,6 +100,7 @@ class CairosLogTests(BaseLogTest):
         self._do_log('BattleDungeonResult_V2/punisher_b5_artifact_drop.json')
         log = models.DungeonLog.objects.first()
         self.assertEqual(log.artifacts.count(), 1)
+        self.assertIsNotNone(log.artifacts.first().main_stat_value)
 
     def test_conversion_stone_drop(self):
         self._do_log('BattleDungeonResult_V2/punisher_b5_conversion_stone_drop.json')
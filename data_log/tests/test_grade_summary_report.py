@@ -0,0 +1,105 @@
+from django.db.models import Count, Min, Max, Avg, Sum, Func, FloatField
+from django.db.models.functions import Cast
+
+from bestiary.models import Monster, GameItem
+from data_log import models
+from data_log.reports.generate import get_drop_querysets, grade_summary_report
+from .test_log_views import BaseLogTest
+
+
+def _per_drop_grade_summary_report(qs, grade_choices):
+    # Original query-per-drop implementation, kept as the reference for output parity
+    report_data = []
+
+    drops = get_drop_querysets(qs)
+
+    all_items = GameItem.objects.filter(pk__in=drops['items'].values_list(
+        'item', flat=True)) if 'items' in drops else []
+    all_monsters = Monster.objects.filter(pk__in=drops['monsters'].values_list(
+        'monster', flat=True)) if 'monsters' in drops else []
+    all_runes = drops['runes'] if 'runes' in drops else []
+
+    for grade_id, grade_name in grade_choices:
+        grade_qs = qs.filter(grade=grade_id)
+        grade_run_count = grade_qs.count() if grade_qs.count() else 1
+
+        grade_report = {
+            'grade': grade_name,
+            'log_count': grade_qs.count(),
+            'drops': [],
+        }
+        for item in all_items:
+            result = drops['items'].filter(log__in=grade_qs, item=item).aggregate(
+                count=Count('pk'),
+                min=Min('quantity'),
+                max=Max('quantity'),
+                avg=Avg('quantity'),
+                drop_chance=Cast(Count('pk'), FloatField()) / grade_run_count * 100,
+                qty_per_100=Cast(Sum('quantity'), FloatField()) / grade_run_count * 100,
+            )
+            grade_report['drops'].append({'type': 'item', 'name': item.name, 'icon': item.icon, **result})
+
+        for monster in all_monsters:
+            result = drops['monsters'].filter(log__in=grade_qs, monster=monster).aggregate(
+                count=Count('pk'),
+                drop_chance=Cast(Count('pk'), FloatField()) / grade_run_count * 100,
+                qty_per_100=Cast(Func(Count('pk'), 0, function='nullif'), FloatField()) / grade_run_count * 100,
+            )
+            grade_report['drops'].append({
+                'type': 'monster',
+                'name': monster.name,
+                'icon': monster.image_filename,
+                'stars': monster.natural_stars,
+                **result,
+            })
+
+        for stars in sorted(all_runes.values_list('stars', flat=True).distinct(), reverse=True):
+            result = drops['runes'].filter(log__in=grade_qs, stars=stars).aggregate(
+                count=Count('pk'),
+                drop_chance=Cast(Count('pk'), FloatField()) / grade_run_count * 100,
+                qty_per_100=Cast(Func(Count('pk'), 0, function='nullif'), FloatField()) / grade_run_count * 100,
+            )
+            grade_report['drops'].append({'type': 'rune', 'name': f'{stars}⭐ Rune', **result})
+
+        report_data.append(grade_report)
+
+    return report_data
+
+
+class GradeSummaryReportTests(BaseLogTest):
+    fixtures = ['test_game_items', 'test_levels', 'test_summon_monsters']
+
+    def _assert_parity(self, qs, grade_choices):
+        expected = _per_drop_grade_summary_report(qs, grade_choices)
+        actual = grade_summary_report(qs, grade_choices)
+
+        self.assertEqual(len(actual), len(expected))
+        for actual_grade, expected_grade in zip(actual, expected):
+            self.assertEqual(actual_grade['grade'], expected_grade['grade'])
+            self.assertEqual(actual_grade['log_count'], expected_grade['log_count'])
+            self.assertEqual(len(actual_grade['drops']), len(expected_grade['drops']))
+
+            for actual_drop, expected_drop in zip(actual_grade['drops'], expected_grade['drops']):
+                self.assertEqual(list(actual_drop.keys()), list(expected_drop.keys()))
+                for key, value in expected_drop.items():
+                    if isinstance(value, float):
+                        self.assertAlmostEqual(actual_drop[key], value)
+                    else:
+                        self.assertEqual(actual_drop[key], value)
+
+    def test_rift_dungeon_parity(self):
+        self._do_log('BattleRiftDungeonResult/fire_beast_b.json')
+        self._do_log('BattleRiftDungeonResult/fire_beast_sss_transmog_stone.json')
+        self._do_log('BattleRiftDungeonResult/water_beast_a.json')
+        self._do_log('BattleRiftDungeonResult/water_beast_fail.json')
+
+        self._assert_parity(models.RiftDungeonLog.objects.all(), models.RiftDungeonLog.GRADE_CHOICES)
+
+    def test_world_boss_parity(self):
+        self._do_log('BattleWorldBossStart/world_boss_start.json')
+        self._do_log('BattleWorldBossResult/world_boss_result.json')
+
+        self._assert_parity(models.WorldBossLog.objects.all(), models.WorldBossLog.GRADE_CHOICES)
+
+    def test_no_logs(self):
+        self._assert_parity(models.RiftDungeonLog.objects.none(), models.RiftDungeonLog.GRADE_CHOICES)
@@ -0,0 +1,133 @@
+from datetime import timedelta
+
+from data_log import models
+from data_log.reports import generate, incremental
+from data_log.util import summarize_records
+from .test_log_views import BaseLogTest
+
+
+class IncrementalLevelReportTests(BaseLogTest):
+    fixtures = ['test_game_items', 'test_levels', 'test_summon_monsters']
+
+    def test_report_generated(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        incremental.generate_dungeon_log_reports()
+
+        self.assertEqual(models.LevelReport.objects.count(), 1)
+        report = models.LevelReport.objects.first()
+        self.assertEqual(report.log_count, 1)
+        self.assertIn('summary', report.report)
+        self.assertIn('runes', report.report)
+        self.assertIn('clear_time', report.report)
+
+    def test_only_new_logs_folded(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        incremental.generate_dungeon_log_reports()
+        aggregate = models.LevelReportAggregate.objects.get()
+        last_log_id = aggregate.last_log_id
+
+        self._do_log('BattleDungeonResult_V2/giants_b10_harmony_drop.json')
+        incremental.generate_dungeon_log_reports()
+        aggregate.refresh_from_db()
+
+        self.assertGreater(aggregate.last_log_id, last_log_id)
+        self.assertEqual(models.LevelReport.objects.latest('generated_on').log_count, 2)
+
+    def test_late_log_folded(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        first = models.DungeonLog.objects.get()
+        incremental.generate_dungeon_log_reports()
+
+        # Uploaded after the first log was folded, but played before it
+        self._do_log('BattleDungeonResult_V2/giants_b10_harmony_drop.json')
+        models.DungeonLog.objects.exclude(pk=first.pk).update(timestamp=first.timestamp - timedelta(hours=1))
+        incremental.generate_dungeon_log_reports()
+
+        self.assertEqual(models.LevelReport.objects.latest('generated_on').log_count, 2)
+
+    def test_incomplete_log_not_skipped(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        first = models.DungeonLog.objects.get()
+        models.DungeonLog.objects.filter(pk=first.pk).update(success=None)
+        self._do_log('BattleDungeonResult_V2/giants_b10_harmony_drop.json')
+        incremental.generate_dungeon_log_reports()
+
+        # Nothing is folded past the log waiting for its result
+        self.assertEqual(models.LevelReport.objects.count(), 0)
+
+        models.DungeonLog.objects.filter(pk=first.pk).update(success=True)
+        incremental.generate_dungeon_log_reports()
+        self.assertEqual(models.LevelReport.objects.get().log_count, 2)
+
+    def test_unique_contributors(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        self._do_log('BattleDungeonResult_V2/giants_b10_harmony_drop.json')
+        models.DungeonLog.objects.filter(pk=models.DungeonLog.objects.first().pk).update(wizard_id=1)
+        incremental.generate_dungeon_log_reports()
+
+        self.assertEqual(models.LevelReport.objects.get().unique_contributors, 2)
+
+    def test_no_new_logs_keeps_counts(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        incremental.generate_dungeon_log_reports()
+        incremental.generate_dungeon_log_reports()
+
+        self.assertEqual(models.LevelReport.objects.latest('generated_on').log_count, 1)
+
+    def test_merged_counters(self):
+        bucket = incremental._new_bucket()
+        incremental._add_stat(bucket['drops'].setdefault('items', {}).setdefault('item', {}), 1, 5)
+        other = incremental._new_bucket()
+        incremental._add_stat(other['drops'].setdefault('items', {}).setdefault('item', {}), 1, 2)
+
+        merged = incremental.merge_buckets([bucket, other])
+        self.assertEqual(merged['drops']['items']['item']['1'], [2, 7, 2, 5])
+
+
+class IncrementalReportAgreementTests(BaseLogTest):
+    # The incremental builders mirror those of generate.py, both must give the same figures for the same logs
+    fixtures = ['test_game_items', 'test_levels', 'test_summon_monsters']
+
+    def setUp(self):
+        super().setUp()
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        self._do_log('BattleDungeonResult_V2/giants_b10_harmony_drop.json')
+        self.qs = models.DungeonLog.objects.filter(success=True)
+
+        buckets, _ = incremental.fold_logs(self.qs)
+        self.merged = incremental.merge_buckets(buckets.values())
+        self.expected = generate.drop_report(self.qs, min_count=0)
+        self.report = incremental.drop_report_from_aggregates(models.DungeonLog, self.merged, min_count=0)
+
+    def test_log_figures(self):
+        records = summarize_records(self.qs)
+
+        self.assertEqual(self.merged['log_count'], records.count)
+        self.assertEqual(len(self.merged['wizards']), records.unique_contributors)
+        self.assertEqual(self.report.keys(), self.expected.keys())
+        self.assertEqual(self.report['clear_time'], self.expected['clear_time'])
+
+    def test_summary_chart(self):
+        self.assertEqual(
+            {row['name']: row['count'] for row in self.report['summary']['chart']},
+            {row['name']: row['count'] for row in self.expected['summary']['chart']},
+        )
+
+    def test_item_report(self):
+        report = {row['item']: row for row in self.report[models.ItemDrop.RELATED_NAME]}
+        expected = {row['item']: row for row in self.expected[models.ItemDrop.RELATED_NAME]}
+
+        self.assertEqual(report.keys(), expected.keys())
+        for item_id, row in expected.items():
+            for key in ['name', 'icon', 'count', 'min', 'max']:
+                self.assertEqual(report[item_id][key], row[key])
+            for key in ['avg', 'drop_chance', 'qty_per_100']:
+                self.assertAlmostEqual(report[item_id][key], row[key])
+
+    def test_rune_report(self):
+        report = self.report[models.RuneDrop.RELATED_NAME]
+        expected = self.expected[models.RuneDrop.RELATED_NAME]
+
+        for chart in ['stars', 'type', 'quality', 'slot', 'main_stat', 'innate_stat', 'substats']:
+            self.assertEqual(report[chart]['total'], expected[chart]['total'], chart)
+            self.assertEqual(report[chart]['data'], expected[chart]['data'], chart)
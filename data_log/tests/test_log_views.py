@@ -1,12 +1,13 @@
 import json
+from unittest import mock
 
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from rest_framework.authtoken.models import Token
 from rest_framework.reverse import reverse
 from rest_framework.test import APIRequestFactory
 
-from data_log import views, models
+from data_log import views, models, tasks
 from data_log.game_commands import accepted_api_params
 from herders.models import Summoner
 
@@ -177,3 +178,59 @@ class LogDataViewTests(BaseLogTest):
             )
             response = view(request)
             self.assertTrue(response.data.get('reinit'))
+
+
+@override_settings(LOG_QUEUE_ENABLED=True)
+class LogQueueTests(BaseLogTest):
+    fixtures = ['test_summon_monsters', 'test_game_items']
+
+    def test_log_queued(self):
+        response = self._do_log('SummonUnit/scroll_unknown_qty1.json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(models.PendingLog.objects.count(), 1)
+        self.assertEqual(models.SummonLog.objects.count(), 0)
+
+    def test_queue_processed(self):
+        self._do_log('SummonUnit/scroll_unknown_qty1.json')
+        result = tasks.process_log_queue()
+
+        self.assertEqual(result['parsed'], 1)
+        self.assertEqual(models.PendingLog.objects.count(), 0)
+        self.assertEqual(models.SummonLog.objects.count(), 1)
+
+    def test_queued_log_validation(self):
+        with open('data_log/tests/game_api_data/SummonUnit/scroll_unknown_qty1.json', 'r') as f:
+            data = get_requested_keys(json.load(f))
+
+        del data['data']['request']['mode']  # Delete required key for test
+        view = views.LogData.as_view({'post': 'create'})
+        request = self.factory.post(
+            reverse('data_log:log-upload-list'),
+            data=data,
+            format='json'
+        )
+        view(request)
+        result = tasks.process_log_queue()
+
+        self.assertEqual(result['invalid'], 1)
+        self.assertEqual(models.PendingLog.objects.count(), 0)
+        self.assertEqual(models.FullLog.objects.count(), 1)
+
+    @override_settings(LOG_QUEUE_MAX_ATTEMPTS=2)
+    def test_failed_log_kept(self):
+        self._do_log('SummonUnit/scroll_unknown_qty1.json')
+
+        with mock.patch('data_log.tasks.parse_log_data', side_effect=ValueError('Unexpected log data')):
+            result = tasks.process_log_queue()
+            pending = models.PendingLog.objects.get()
+            self.assertEqual(result['failed'], 1)
+            self.assertEqual(pending.attempts, 1)
+            self.assertIn('Unexpected log data', pending.error)
+
+            tasks.process_log_queue()
+            self.assertEqual(models.PendingLog.objects.get().attempts, 2)
+
+            # Out of attempts, left for inspection
+            self.assertEqual(tasks.process_log_queue()['failed'], 0)
+            self.assertEqual(models.PendingLog.objects.get().attempts, 2)
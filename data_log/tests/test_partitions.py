@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+
+import pytz
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+
+from data_log import models, partitions
+from .test_log_views import BaseLogTest
+
+
+class PartitionDateTests(SimpleTestCase):
+    def test_month_start(self):
+        self.assertEqual(
+            partitions.month_start(datetime(2021, 3, 31, 23, 30, tzinfo=pytz.utc)),
+            datetime(2021, 3, 1, tzinfo=pytz.utc),
+        )
+
+    def test_add_months(self):
+        start = datetime(2021, 11, 1, tzinfo=pytz.utc)
+        self.assertEqual(partitions.add_months(start, 1), datetime(2021, 12, 1, tzinfo=pytz.utc))
+        self.assertEqual(partitions.add_months(start, 2), datetime(2022, 1, 1, tzinfo=pytz.utc))
+        self.assertEqual(partitions.add_months(start, 14), datetime(2023, 1, 1, tzinfo=pytz.utc))
+
+    @override_settings(LOG_RETENTION={
+        'default': {'archive_after': 365, 'drop_after': None},
+        'FullLog': {'drop_after': 30},
+    })
+    def test_retention_override(self):
+        self.assertEqual(partitions.retention(models.DungeonLog), {'archive_after': 365, 'drop_after': None})
+        self.assertEqual(partitions.retention(models.FullLog), {'archive_after': 365, 'drop_after': 30})
+
+
+@override_settings(
+    LOG_PARTITION_MONTHS_AHEAD=2,
+    LOG_RETENTION={'default': {'archive_after': 365, 'drop_after': None}},
+)
+class PartitionMaintenanceTests(BaseLogTest):
+    fixtures = ['test_game_items', 'test_levels', 'test_summon_monsters']
+
+    def setUp(self):
+        super().setUp()
+        if not partitions.is_partitioned(models.DungeonLog):
+            self.skipTest('Log tables are not partitioned on this database')
+
+        # Logs of the sample data are dated well before partitioning, in the history partition
+        self.history_end = partitions.partitions(models.DungeonLog)[0][2]
+
+    def _maintain(self, now):
+        # Partitions cannot be detached with foreign key checks of the test transaction still pending
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        return partitions.maintain_partitions(now)
+
+    def test_creates_coming_months(self):
+        now = self.history_end + timedelta(days=100)
+        result = partitions.maintain_partitions(now)
+
+        table = models.DungeonLog._meta.db_table
+        names = [name for name, _, _ in partitions.partitions(models.DungeonLog)]
+        for month in range(3):
+            start = partitions.add_months(partitions.month_start(now), month)
+            self.assertIn(f'{table}_p{start:%Y_%m}', names)
+        self.assertIn(f'{table}_p{partitions.month_start(now):%Y_%m}', result['created'])
+
+        # Nothing left to create
+        self.assertEqual(partitions.maintain_partitions(now)['created'], [])
+
+    def test_logs_in_new_partition(self):
+        partitions.maintain_partitions(self.history_end)
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        log = models.DungeonLog.objects.get()
+
+        log.timestamp = self.history_end + timedelta(days=1)
+        log.save()
+
+        self.assertEqual(models.DungeonLog.objects.filter(timestamp__gte=self.history_end).count(), 1)
+        self.assertEqual(log.runes.count(), 1)
+
+    def test_archives_old_partitions(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        self.assertEqual(models.DungeonRuneDrop.objects.count(), 1)
+
+        result = self._maintain(self.history_end + timedelta(days=400))
+
+        archived = f'{models.DungeonLog._meta.db_table}_{self.history_end:%Y%m%d}'
+        self.assertIn(archived, result['archived'])
+        self.assertIn(archived, [name for name, _ in partitions.archived_partitions(models.DungeonLog)])
+        self.assertEqual(models.DungeonLog.objects.count(), 0)
+        self.assertEqual(models.DungeonRuneDrop.objects.count(), 0)
+
+    @override_settings(LOG_RETENTION={'default': {'archive_after': 365, 'drop_after': 730}})
+    def test_drops_archived_partitions(self):
+        archived = f'{models.DungeonLog._meta.db_table}_{self.history_end:%Y%m%d}'
+        self._maintain(self.history_end + timedelta(days=400))
+        self.assertIn(archived, [name for name, _ in partitions.archived_partitions(models.DungeonLog)])
+
+        result = self._maintain(self.history_end + timedelta(days=800))
+        self.assertIn(archived, result['dropped'])
+        self.assertNotIn(archived, [name for name, _ in partitions.archived_partitions(models.DungeonLog)])
@@ -0,0 +1,90 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from data_log import models
+from data_log.reports import generate
+from .test_log_views import BaseLogTest
+
+
+class ReportQueryBudgetTests(BaseLogTest):
+    # Budgets are kept loose enough for small changes to the reports but fail on repeated count/aggregate queries
+    # for each report row.
+    fixtures = ['test_game_items', 'test_levels', 'test_summon_monsters']
+
+    def assertQueryBudget(self, budget, func, *args, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            func(*args, **kwargs)
+
+        self.assertLessEqual(
+            len(context.captured_queries),
+            budget,
+            f'{func.__name__} made {len(context.captured_queries)} queries, budget is {budget}',
+        )
+
+    def test_dungeon_log_reports(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        self._do_log('BattleDungeonResult_V2/giants_b5_rainbowmon_drop.json')
+        self._do_log('BattleDungeonResult_V2/punisher_b5_artifact_drop.json')
+
+        # Per level: slice, report rows and its inserts
+        self.assertQueryBudget(3 * 40, generate.generate_dungeon_log_reports)
+
+    def test_rift_raid_reports(self):
+        self._do_log('BattleRiftOfWorldsRaidStart/raid_r1_3x_grindstones.json')
+        self._do_log('BattleRiftOfWorldsRaidResult/raid_r1_3x_grindstones.json')
+
+        self.assertQueryBudget(40, generate.generate_rift_raid_reports)
+
+    def test_rift_dungeon_reports(self):
+        self._do_log('BattleRiftDungeonResult/fire_beast_b.json')
+        self._do_log('BattleRiftDungeonResult/water_beast_a.json')
+
+        self.assertQueryBudget(2 * 60, generate.generate_rift_dungeon_reports)
+
+    def test_world_boss_dungeon_reports(self):
+        self._do_log('BattleWorldBossStart/world_boss_start.json')
+        self._do_log('BattleWorldBossResult/world_boss_result.json')
+
+        self.assertQueryBudget(60, generate.generate_world_boss_dungeon_reports)
+
+    def test_shop_refresh_reports(self):
+        self._do_log('GetBlackMarketList/shop_refresh_new.json')
+
+        self.assertQueryBudget(30, generate.generate_shop_refresh_reports)
+
+    def test_magic_box_crafting_reports(self):
+        self._do_log('BuyShopItem/craft_magic_box_mystical.json')
+        self._do_log('BuyShopItem/craft_magic_box_unknown.json')
+
+        # The slice of all crafts is shared by the boxes
+        self.assertQueryBudget(2 * 25, generate.generate_magic_box_crafting_reports)
+
+    def test_wish_reports(self):
+        self._do_log('DoRandomWishItem/wish_monster.json')
+        self._do_log('DoRandomWishItem/wish_mana.json')
+
+        self.assertQueryBudget(30, generate.generate_wish_reports)
+
+    def test_summon_reports(self):
+        self._do_log('SummonUnit/scroll_unknown_qty1.json')
+        self._do_log('SummonUnit/scroll_mystical.json')
+        self._do_log('SummonUnit/currency_social_qty1.json')
+
+        self.assertQueryBudget(3 * 15, generate.generate_summon_reports)
+
+    def test_rune_crafting_reports(self):
+        self._do_log('BuyShopItem/craft_rune_low.json')
+        self._do_log('BuyShopItem/craft_rune_mid.json')
+        self._do_log('BuyShopItem/craft_rune_high.json')
+
+        self.assertQueryBudget(3 * 15, generate.generate_rune_crafting_reports)
+
+    def test_empty_slice_shared(self):
+        # Nothing crafted recently, the boxes must not slice the crafts again
+        records = generate._magic_box_records()
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(generate.magic_box_crafting_report_fields(
+                models.MagicBoxCraft.BOX_MYSTICAL_MAGIC,
+                records=records,
+            ))
@@ -0,0 +1,53 @@
+from django.utils import timezone
+
+from data_log import models, tasks
+from .test_log_views import BaseLogTest
+
+
+class ParallelReportTaskTests(BaseLogTest):
+    fixtures = ['test_game_items', 'test_levels', 'test_summon_monsters']
+
+    def test_level_units_listed(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        log = models.DungeonLog.objects.first()
+
+        self.assertIn(('level', 'DungeonLog', log.level_id, {}), tasks.report_units())
+
+    def test_unit_does_not_publish(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        log = models.DungeonLog.objects.first()
+
+        result = tasks.generate_report('level', 'DungeonLog', log.level_id, {})
+        self.assertIsNotNone(result['fields'])
+        self.assertEqual(models.LevelReport.objects.count(), 0)
+
+    def test_publish_reports(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        log = models.DungeonLog.objects.first()
+
+        results = [
+            tasks.generate_report('level', 'DungeonLog', log.level_id, {}),
+            tasks.generate_report('wish'),
+        ]
+        summary = tasks.publish_reports(results, timezone.now().isoformat())
+
+        self.assertEqual(summary['units'], 2)
+        self.assertEqual(summary['reports'], 1)
+        self.assertEqual(models.LevelReport.objects.get().level_id, log.level_id)
+
+
+class GenerateAllReportsTests(BaseLogTest):
+    fixtures = ['test_game_items', 'test_levels', 'test_summon_monsters']
+
+    def test_level_report_modes(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+
+        for level_reports in tasks.LEVEL_REPORT_GENERATORS:
+            with self.subTest(level_reports=level_reports):
+                models.LevelReport.objects.all().delete()
+                tasks.generate_all_reports(level_reports)
+                self.assertEqual(models.LevelReport.objects.get().log_count, 1)
+
+    def test_unknown_level_report_mode(self):
+        with self.assertRaises(ValueError):
+            tasks.generate_all_reports('daily')
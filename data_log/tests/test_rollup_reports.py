@@ -0,0 +1,120 @@
+from datetime import timedelta
+from unittest import mock
+
+from data_log import models
+from data_log.reports import incremental, rollup
+from .test_log_views import BaseLogTest
+
+
+class RollupLevelReportTests(BaseLogTest):
+    fixtures = ['test_game_items', 'test_levels', 'test_summon_monsters']
+
+    def _update(self):
+        return rollup.update_rollups(models.DungeonLog)
+
+    def test_logs_rolled_up(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        log = models.DungeonLog.objects.get()
+
+        self.assertEqual(self._update(), 1)
+        log_rollup = models.LevelLogRollup.objects.get()
+        self.assertEqual(log_rollup.level_id, log.level_id)
+        self.assertEqual(log_rollup.log_count, 1)
+        self.assertEqual(log_rollup.clear_time['count'], 1)
+        self.assertEqual(
+            models.LevelDropRollup.objects.get(drop_type=models.RuneDrop.RELATED_NAME, dimension='slot').count,
+            1,
+        )
+
+    def test_incomplete_log_not_skipped(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        first = models.DungeonLog.objects.get()
+        models.DungeonLog.objects.filter(pk=first.pk).update(success=None)
+        self._do_log('BattleDungeonResult_V2/giants_b10_harmony_drop.json')
+
+        # Nothing is rolled up past the log waiting for its result
+        self.assertEqual(self._update(), 0)
+        self.assertEqual(models.LevelLogRollup.objects.count(), 0)
+
+        models.DungeonLog.objects.filter(pk=first.pk).update(success=True)
+        self.assertEqual(self._update(), 2)
+
+    def test_late_log_rolled_up(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        first = models.DungeonLog.objects.get()
+        self._update()
+        self._do_log('BattleDungeonResult_V2/giants_b10_harmony_drop.json')
+        models.DungeonLog.objects.exclude(pk=first.pk).update(timestamp=first.timestamp - timedelta(days=1))
+
+        self.assertEqual(self._update(), 1)
+        self.assertEqual(models.LevelLogRollup.objects.count(), 2)
+
+    def test_batches(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        self._do_log('BattleDungeonResult_V2/giants_b10_harmony_drop.json')
+
+        with mock.patch.object(rollup, 'BATCH_SIZE', 1):
+            self.assertEqual(self._update(), 2)
+
+        self.assertEqual(models.LevelLogRollup.objects.get().log_count, 2)
+        self.assertEqual(
+            models.LevelRollupWatermark.objects.get().last_log_id,
+            models.DungeonLog.objects.latest('pk').pk,
+        )
+
+    def test_only_new_logs_rolled_up(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        self._update()
+        self._do_log('BattleDungeonResult_V2/giants_b10_harmony_drop.json')
+
+        self.assertEqual(self._update(), 1)
+        self.assertEqual(self._update(), 0)
+        self.assertEqual(models.LevelLogRollup.objects.get().log_count, 2)
+        self.assertEqual(
+            models.LevelDropRollup.objects.get(drop_type=models.RuneDrop.RELATED_NAME, dimension='slot').count,
+            1,
+        )
+
+    def test_report_matches_incremental_report(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        self._do_log('BattleDungeonResult_V2/giants_b10_harmony_drop.json')
+        log = models.DungeonLog.objects.first()
+        self._update()
+
+        fields = rollup.level_report_fields(models.DungeonLog, log.level_id)
+        buckets, _ = incremental.fold_logs(models.DungeonLog.objects.filter(level=log.level, success=True))
+        expected = incremental.drop_report_from_aggregates(models.DungeonLog, incremental.merge_buckets(buckets.values()))
+
+        self.assertEqual(fields['log_count'], 2)
+        self.assertEqual(fields['unique_contributors'], 1)
+        self.assertEqual(fields['report'].keys(), expected.keys())
+        self.assertEqual(fields['report']['clear_time'], expected['clear_time'])
+        self.assertEqual(fields['report'][models.RuneDrop.RELATED_NAME], expected[models.RuneDrop.RELATED_NAME])
+
+    def test_unique_contributors(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        self._do_log('BattleDungeonResult_V2/giants_b10_harmony_drop.json')
+        log = models.DungeonLog.objects.first()
+        models.DungeonLog.objects.filter(pk=log.pk).update(wizard_id=1)
+        self._update()
+
+        self.assertEqual(rollup.level_report_fields(models.DungeonLog, log.level_id)['unique_contributors'], 2)
+
+    def test_report_window(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        log = models.DungeonLog.objects.get()
+        self._update()
+        day = models.LevelLogRollup.objects.get().day
+
+        self.assertEqual(rollup.level_report_fields(models.DungeonLog, log.level_id, start_day=day)['log_count'], 1)
+        self.assertIsNone(rollup.level_report_fields(models.DungeonLog, log.level_id, end_day=day - timedelta(days=1)))
+
+    def test_reports_generated(self):
+        self._do_log('BattleDungeonResult_V2/giants_b10_rune_drop.json')
+        self._update()
+        rollup.generate_dungeon_log_reports()
+
+        report = models.LevelReport.objects.get()
+        self.assertEqual(report.log_count, 1)
+        self.assertIn('runes', report.report)
+        self.assertIn('clear_time', report.report)
@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from bestiary.models import Level
+from data_log import models
+from data_log.util import slice_records
+
+
+class SliceRecordsTests(TestCase):
+    fixtures = ['test_levels']
+
+    def setUp(self):
+        self.level = Level.objects.first()
+        self.now = timezone.now()
+
+    def _log(self, days_ago, wizard_id=1):
+        return models.DungeonLog.objects.create(
+            wizard_id=wizard_id,
+            level=self.level,
+            success=True,
+            timestamp=self.now - timedelta(days=days_ago),
+        )
+
+    def test_within_timespan(self):
+        self._log(1, wizard_id=1)
+        self._log(2, wizard_id=2)
+        self._log(3, wizard_id=2)
+        self._log(30)
+
+        records = slice_records(models.DungeonLog.objects.all(), report_timespan=timedelta(weeks=2))
+
+        self.assertEqual(records.count, 3)
+        self.assertEqual(records.records.count(), 3)
+        self.assertEqual(records.unique_contributors, 2)
+        self.assertEqual(records.start_timestamp, self.now - timedelta(days=3))
+        self.assertEqual(records.end_timestamp, self.now - timedelta(days=1))
+
+    def test_minimum_count_extends_timespan(self):
+        for days_ago in [1, 20, 30, 40]:
+            self._log(days_ago)
+
+        records = slice_records(models.DungeonLog.objects.all(), minimum_count=3, report_timespan=timedelta(weeks=2))
+
+        self.assertEqual(records.count, 3)
+        self.assertEqual(records.cutoff, self.now - timedelta(days=30))
+        self.assertEqual(records.start_timestamp, self.now - timedelta(days=30))
+        self.assertEqual(records.records.count(), 3)
+
+    def test_maximum_count_limits_timespan(self):
+        for days_ago in [1, 2, 3, 4]:
+            self._log(days_ago)
+
+        records = slice_records(models.DungeonLog.objects.all(), maximum_count=2, report_timespan=timedelta(weeks=2))
+
+        self.assertEqual(records.count, 2)
+        self.assertEqual(records.cutoff, self.now - timedelta(days=2))
+
+    def test_nothing_within_timespan(self):
+        self._log(30)
+
+        records = slice_records(models.DungeonLog.objects.all(), minimum_count=3, report_timespan=timedelta(weeks=2))
+
+        self.assertFalse(records)
+        self.assertEqual(records.records.count(), 0)
+
+    def test_single_query(self):
+        self._log(1)
+
+        with self.assertNumQueries(1):
+            slice_records(models.DungeonLog.objects.all(), minimum_count=3, report_timespan=timedelta(weeks=2))
+
+    def test_filter_keeps_cutoff(self):
+        self._log(1, wizard_id=1)
+        self._log(2, wizard_id=2)
+        self._log(30, wizard_id=1)
+
+        records = slice_records(models.DungeonLog.objects.all(), report_timespan=timedelta(weeks=2))
+        filtered = records.filter(wizard_id=1)
+
+        self.assertEqual(filtered.count, 1)
+        self.assertEqual(filtered.cutoff, records.cutoff)
+        self.assertEqual(filtered.end_timestamp, self.now - timedelta(days=1))
+
+    def test_min_and_max_count(self):
+        with self.assertRaises(ValueError):
+            slice_records(models.DungeonLog.objects.all(), minimum_count=1, maximum_count=2)
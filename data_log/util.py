@@ -1,40 +1,106 @@
 from math import trunc
+from django.core.exceptions import EmptyResultSet
 from django.core.mail import mail_admins
-
+from django.db import connection
+from django.db.models import Count, Max, Min
 from django.utils import timezone
 
 
-def slice_records(qs, *args, **kwargs):
-    report_timespan = kwargs.get('report_timespan')
-    minimum_count = kwargs.get('minimum_count')
-    maximum_count = kwargs.get('maximum_count')
+class RecordSlice:
+    """
+    Logs selected for a report by slice_records(), with the figures stored on every report about them.
+    """
+
+    def __init__(self, records, cutoff=None, count=0, start_timestamp=None, end_timestamp=None, unique_contributors=0):
+        self.records = records
+        self.cutoff = cutoff
+        self.count = count
+        self.start_timestamp = start_timestamp
+        self.end_timestamp = end_timestamp
+        self.unique_contributors = unique_contributors
+
+    def __bool__(self):
+        return self.count > 0
+
+    def filter(self, *args, **kwargs):
+        """
+        The logs of this slice matching the given filters, keeping the cutoff of the whole slice.
+        """
+        return summarize_records(self.records.filter(*args, **kwargs), self.cutoff)
+
+
+def summarize_records(records, cutoff=None):
+    """
+    RecordSlice of logs already selected for a report, with its figures from one aggregate query.
+    """
+    figures = records.aggregate(
+        count=Count('pk'),
+        start_timestamp=Min('timestamp'),
+        end_timestamp=Max('timestamp'),
+        unique_contributors=Count('wizard_id', distinct=True),
+    )
+    return RecordSlice(records, cutoff, **figures)
 
+
+def slice_records(qs, report_timespan=None, minimum_count=None, maximum_count=None):
+    """
+    Select the logs within report_timespan, extended back to the latest minimum_count logs or cut down to the latest
+    maximum_count logs. The cutoff timestamp and the figures of the selected logs are found with a single query.
+
+    :return: RecordSlice
+    """
     if minimum_count and maximum_count:
         raise ValueError('Cannot use minimum_count and maximum_count at the same time.')
 
-    if qs.count() == 0:
-        return qs
+    try:
+        logs_sql, logs_params = qs.order_by().values_list('pk', 'timestamp', 'wizard_id').query.sql_with_params()
+    except EmptyResultSet:
+        return RecordSlice(qs.none())
 
-    if report_timespan:
-        result = qs.filter(timestamp__gte=timezone.now() - report_timespan)
-    else:
-        result = qs
+    since = timezone.now() - report_timespan if report_timespan else None
+    pk = connection.ops.quote_name(qs.model._meta.pk.column)
+    params = list(logs_params) + [since, since]
 
     if minimum_count or maximum_count:
-        num_records = result.count()
-
-        if num_records > 0:
-            if minimum_count and num_records < minimum_count:
-                temp_slice = qs[:minimum_count]
-                earliest_record = temp_slice[temp_slice.count() - 1]
-                result = qs.filter(timestamp__gte=earliest_record.timestamp)
-
-            if maximum_count and num_records > maximum_count:
-                temp_slice = qs[:maximum_count]
-                earliest_record = temp_slice[temp_slice.count() - 1]
-                result = qs.filter(timestamp__gte=earliest_record.timestamp)
+        # Timestamp of the Nth latest log, or of the oldest one if there are fewer
+        cutoff = f"""
+            CASE WHEN recent.count {'<' if minimum_count else '>'} %s
+            THEN (SELECT min("timestamp") FROM logs WHERE position <= %s)
+            ELSE %s::timestamptz END
+        """
+        params += [minimum_count or maximum_count] * 2 + [since]
+    else:
+        cutoff = '%s::timestamptz'
+        params.append(since)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            WITH logs AS (
+                SELECT "timestamp", wizard_id, row_number() OVER (ORDER BY "timestamp" DESC, {pk} DESC) AS position
+                FROM ({logs_sql}) AS qs
+            ), recent AS (
+                SELECT count(*) AS count FROM logs WHERE %s::timestamptz IS NULL OR "timestamp" >= %s
+            ), cutoff AS (
+                SELECT recent.count AS recent, {cutoff} AS "timestamp" FROM recent
+            )
+            SELECT cutoff."timestamp", count(logs.position), min(logs."timestamp"), max(logs."timestamp"),
+                count(DISTINCT logs.wizard_id)
+            FROM cutoff
+            LEFT JOIN logs ON cutoff.recent > 0
+                AND (cutoff."timestamp" IS NULL OR logs."timestamp" >= cutoff."timestamp")
+            GROUP BY cutoff."timestamp"
+        """, params)
+        cutoff, count, start_timestamp, end_timestamp, unique_contributors = cursor.fetchone()
+
+    if not count:
+        # Nothing logged within report_timespan
+        records = qs.none()
+    elif cutoff is None:
+        records = qs
+    else:
+        records = qs.filter(timestamp__gte=cutoff)
 
-    return result
+    return RecordSlice(records, cutoff, count, start_timestamp, end_timestamp, unique_contributors)
 
 
 def floor_to_nearest(num, multiple_of):
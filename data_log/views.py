@@ -1,6 +1,6 @@
 import json
 
-from django.core.mail import mail_admins
+from django.conf import settings
 from django.db.models.aggregates import Sum
 from django.http import Http404
 from django.shortcuts import render
@@ -13,8 +13,8 @@ from rest_framework.response import Response
 
 from bestiary.models.items import GameItem
 from herders.models import Summoner
-from .game_commands import active_log_commands, accepted_api_params
-from .models import FullLog, MagicShopRefreshReport, MagicBoxCraftingReport, WishReport, SummonReport, MagicBoxCraft, RuneCraftingReport, CraftRuneLog
+from .game_commands import active_log_commands, accepted_api_params, parse_log_data
+from .models import PendingLog, MagicShopRefreshReport, MagicBoxCraftingReport, WishReport, SummonReport, MagicBoxCraft, RuneCraftingReport, CraftRuneLog
 from .util import transform_to_dict
 
 
@@ -64,18 +64,12 @@ class LogData(viewsets.ViewSet):
             # Attempt to get summoner instance from wizard_id in log data
             summoner = Summoner.objects.filter(com2us_id=wizard_id).first()
 
-        # Validate log data format
-        if not active_log_commands[api_command].validate(log_data):
-            FullLog.parse(summoner, log_data)
+        if settings.LOG_QUEUE_ENABLED:
+            # Validation and parsing happen in data_log.tasks.process_log_queue
+            PendingLog.objects.create(command=api_command, summoner=summoner, log_data=log_data)
+        elif not parse_log_data(summoner, log_data):
             raise InvalidLogException(detail='Log data failed validation')
 
-        # Parse the log
-        try:
-            active_log_commands[api_command].parse(summoner, log_data)
-        except Exception as e:
-            mail_admins('Log server error', f'Request body:\n\n{log_data}')
-            raise e
-
         response = {'detail': 'Log OK'}
 
         # Check if accepted API params version matches the active version
@@ -1,9 +1,10 @@
 from celery.result import AsyncResult
 from django.core.mail import mail_admins
+from django.db import transaction
 from django.db.models import Q
-from django.db.models.signals import post_save
 from django_filters import rest_framework as filters
-from rest_framework import viewsets, status, parsers, versioning
+from rest_framework import viewsets, status, parsers, versioning, exceptions
+from rest_framework.decorators import action
 from rest_framework.filters import OrderingFilter
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -16,14 +17,16 @@ from herders.permissions import *
 from herders.serializers import *
 from herders.profile_parser import validate_sw_json, default_import_options
 from herders.sync_commands import accepted_api_params, active_log_commands
-from herders.tasks import com2us_data_import
-from herders.models import Summoner, MaterialStorage, MonsterShrineStorage, MonsterInstance, MonsterPiece, RuneInstance, RuneCraftInstance, BuildingInstance, ArtifactCraftInstance, ArtifactInstance
-from herders.signals import update_profile_date
+from herders.profile_stream import ProfileStream, save_profile_upload
+from herders.tasks import com2us_data_import, com2us_stream_import
+from herders.models import Summoner, MaterialStorage, MonsterShrineStorage, MonsterInstance, MonsterPiece, RuneInstance, RuneCraftInstance, BuildingInstance, ArtifactInstance, defer_build_stats, defer_profile_touch, defer_statistics_update, touch_profile
+from herders.sync_state import preload_sync_instances
 
 from data_log.models import FullLog
 from data_log.views import InvalidLogException
 
 import json
+import os
 
 
 class SummonerViewSet(viewsets.ModelViewSet):
@@ -285,9 +288,18 @@ class ProfileJsonUpload(viewsets.ViewSet):
     def create(self, request, *args, **kwargs):
         errors = []
         validation_failures = []
+        path = None
 
-        schema_errors, validation_errors = validate_sw_json(
-            request.data, request.user.summoner)
+        if request.FILES.get('json_file'):
+            # Exports uploaded as a file are read from disk in batches by the import
+            try:
+                path = save_profile_upload(request.FILES['json_file'])
+                schema_errors, validation_errors = ProfileStream(path).validate(request.user.summoner)
+            except ValueError as e:
+                schema_errors, validation_errors = f'Unable to parse file: {e}', []
+        else:
+            schema_errors, validation_errors = validate_sw_json(
+                request.data, request.user.summoner)
 
         if schema_errors:
             errors.append(schema_errors)
@@ -300,11 +312,17 @@ class ProfileJsonUpload(viewsets.ViewSet):
 
         if not errors and (not validation_failures or import_options['ignore_validation_errors']):
             # Queue the import
-            task = com2us_data_import.delay(
-                request.data, request.user.summoner.pk, import_options)
+            if path:
+                task = com2us_stream_import.delay(path, request.user.summoner.pk, import_options)
+            else:
+                task = com2us_data_import.delay(
+                    request.data, request.user.summoner.pk, import_options)
             return Response({'job_id': task.task_id})
 
-        elif validation_failures:
+        if path:
+            os.remove(path)
+
+        if validation_failures:
             return Response({'validation_error': validation_failures}, status=status.HTTP_409_CONFLICT)
         else:
             return Response({'error': errors}, status=status.HTTP_400_BAD_REQUEST)
@@ -325,68 +343,82 @@ class ProfileJsonUpload(viewsets.ViewSet):
             return Response(status=status.HTTP_404_NOT_FOUND)
 
 
+class SyncConflict(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Data conflict, synchronization failed. Try logging in again to synchronize your entire profile with SWARFARM'
+    default_code = 'sync_conflict'
+
+
+def _get_sync_command(summoner, log_data, excluded_commands=()):
+    try:
+        api_command = log_data['request']['command'] if log_data.get('request') and log_data['request'].get('command') else log_data['response']['command']
+        # HubUserLogin is a special case, it doesn't store `wizard_id` in request since it needs to fetch it first
+        wizard_id = log_data['request']['wizard_id'] if api_command != "HubUserLogin" else log_data['response']['wizard_info']['wizard_id']
+    except (KeyError, TypeError, AttributeError):
+        raise InvalidLogException(detail='Invalid log data format')
+
+    if api_command not in active_log_commands:
+        raise InvalidLogException('Unsupported game command')
+
+    if api_command in excluded_commands:
+        raise InvalidLogException(f'{api_command} can not be sent in a batch')
+
+    if summoner.com2us_id != wizard_id:
+        raise SyncConflict("Uploaded data does not match previously imported data. Make sure you are trying to synchronize correct account")
+
+    # Validate log data format
+    if not active_log_commands[api_command].validate(log_data):
+        FullLog.parse(summoner, log_data)
+        raise InvalidLogException(detail='Log data failed validation')
+
+    return api_command
+
+
 class SyncData(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
     # Ignore default of namespaced based versioning and use default version defined in settings
     versioning_class = versioning.QueryParameterVersioning
     parser_classes = (parsers.JSONParser, parsers.FormParser)
 
-    def create(self, request):
-        if not request.user.is_authenticated:
-            return Response({"detail": "Unauthorized, make sure that API Key is correct"}, status=status.HTTP_401_UNAUTHORIZED)
+    # Maximum number of commands in one batch
+    MAX_BATCH_SIZE = 100
 
+    # Full profile commands queue an import of the whole profile, send them on their own
+    BATCH_EXCLUDED_COMMANDS = ['HubUserLogin', 'getUnitStorageList']
+
+    def _get_log_data(self, request):
         log_data = request.data.get('data')
 
         if request.content_type == 'application/x-www-form-urlencoded':
             # log_data will be a string, needs to be parsed as json
             log_data = json.loads(log_data)
 
-        try:
-            api_command = log_data['request']['command'] if log_data.get('request') and log_data['request'].get('command') else log_data['response']['command']
-            # HubUserLogin is a special case, it doesn't store `wizard_id` in request since it needs to fetch it first
-            wizard_id = log_data['request']['wizard_id'] if api_command != "HubUserLogin" else log_data['response']['wizard_info']['wizard_id']
-        except (KeyError, TypeError):
-            raise InvalidLogException(detail='Invalid log data format')
+        return log_data
 
-        if api_command not in active_log_commands:
-            raise InvalidLogException('Unsupported game command')
+    def create(self, request):
+        if not request.user.is_authenticated:
+            return Response({"detail": "Unauthorized, make sure that API Key is correct"}, status=status.HTTP_401_UNAUTHORIZED)
 
+        log_data = self._get_log_data(request)
         summoner = request.user.summoner
+        api_command = _get_sync_command(summoner, log_data)
+
+        # Parse the log, updating the summoner profile last update date once
+        with defer_profile_touch():
+            try:
+                sync_conflict = active_log_commands[api_command].parse(
+                    summoner,
+                    log_data
+                )
+            except Exception as e:
+                mail_admins('Sync server error', f'Request body:\n\n{log_data}')
+                raise e
+
+            if sync_conflict:
+                raise SyncConflict()
+
+            touch_profile(summoner.pk)
 
-        if summoner.com2us_id != wizard_id:
-            return Response({'detail': "Uploaded data does not match previously imported data. Make sure you are trying to synchronize correct account"}, status=status.HTTP_409_CONFLICT)
-
-        # Validate log data format
-        if not active_log_commands[api_command].validate(log_data):
-            FullLog.parse(summoner, log_data)
-            raise InvalidLogException(detail='Log data failed validation')
-
-        # Disconnect summoner profile last update post-save signal to avoid mass spamming updates
-        post_save.disconnect(update_profile_date, sender=MonsterInstance)
-        post_save.disconnect(update_profile_date, sender=MonsterPiece)
-        post_save.disconnect(update_profile_date, sender=RuneInstance)
-        post_save.disconnect(update_profile_date, sender=RuneCraftInstance)
-        post_save.disconnect(update_profile_date, sender=ArtifactInstance)
-        post_save.disconnect(update_profile_date, sender=ArtifactCraftInstance)
-        post_save.disconnect(update_profile_date, sender=MaterialStorage)
-        post_save.disconnect(update_profile_date, sender=MonsterShrineStorage)
-        post_save.disconnect(update_profile_date, sender=BuildingInstance)
-
-        # Parse the log
-        try:
-            sync_conflict = active_log_commands[api_command].parse(
-                summoner,
-                log_data
-            )
-        except Exception as e:
-            mail_admins('Sync server error', f'Request body:\n\n{log_data}')
-            raise e
-
-        if sync_conflict:
-            return Response({"detail": "Data conflict, synchronization failed. Try logging in again to synchronize your entire profile with SWARFARM"}, status=status.HTTP_409_CONFLICT)
-
-        # update summoner profile last update date
-        summoner.save()
         response = {'detail': 'Log OK'}
 
         # Check if accepted API params version matches the active version
@@ -395,6 +427,59 @@ class SyncData(viewsets.ViewSet):
 
         return Response(response)
 
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Apply an ordered list of game commands in one transaction.
+
+        The summoner's monsters, runes and artifacts are loaded once for the whole batch. Each command gets a result
+        with the status and detail it would have been answered with on its own.
+        """
+        commands = self._get_log_data(request)
+
+        if not isinstance(commands, list) or not commands:
+            raise InvalidLogException(detail='Invalid log data format')
+
+        if len(commands) > self.MAX_BATCH_SIZE:
+            raise InvalidLogException(detail=f'Too many commands, send at most {self.MAX_BATCH_SIZE} at once')
+
+        summoner = request.user.summoner
+        results = []
+        reinit = False
+
+        with defer_profile_touch(), transaction.atomic(), preload_sync_instances(summoner), defer_build_stats(), \
+                defer_statistics_update():
+            for log_data in commands:
+                try:
+                    api_command = _get_sync_command(summoner, log_data, self.BATCH_EXCLUDED_COMMANDS)
+                except exceptions.APIException as e:
+                    detail = e.detail['detail'] if isinstance(e.detail, dict) else e.detail
+                    results.append({'status': e.status_code, 'detail': detail})
+                    continue
+
+                try:
+                    sync_conflict = active_log_commands[api_command].parse(summoner, log_data)
+                except Exception as e:
+                    mail_admins('Sync server error', f'Request body:\n\n{log_data}')
+                    raise e
+
+                if sync_conflict:
+                    results.append({'command': api_command, 'status': SyncConflict.status_code, 'detail': SyncConflict.default_detail})
+                else:
+                    results.append({'command': api_command, 'status': status.HTTP_200_OK, 'detail': 'Log OK'})
+
+                # Check if accepted API params version matches the active version
+                if log_data.get('__version') != accepted_api_params['__version']:
+                    reinit = True
+
+            touch_profile(summoner.pk)
+
+        response = {'results': results}
+        if reinit:
+            response['reinit'] = True
+
+        return Response(response)
+
 
 class SyncAcceptedCommands(viewsets.ViewSet):
     permission_classes = [permissions.AllowAny]
@@ -0,0 +1,131 @@
+from django.db.models import prefetch_related_objects
+
+from bestiary.rune_efficiency import update_rune_fields
+
+from .models import MonsterInstance, RuneInstance, RuneBuild, ArtifactInstance
+
+# Saves parsed profile objects with bulk queries instead of one save() per object. Build contents are written
+# straight to the m2m through tables, so the m2m_changed handlers in signals.py do not run - their effects
+# (assigned_to bookkeeping and build stats) are applied here for all imported monsters at once.
+
+BATCH_SIZE = 500
+
+
+def _update_field_names(model, exclude=()):
+    return [
+        f.name for f in model._meta.concrete_fields
+        if not f.primary_key and f.name not in exclude
+    ]
+
+
+def _bulk_save(model, objs, fields):
+    new_objs = [obj for obj in objs if obj._state.adding]
+    existing_objs = [obj for obj in objs if not obj._state.adding]
+
+    model.objects.bulk_create(new_objs, batch_size=BATCH_SIZE)
+    for obj in new_objs:
+        obj._state.adding = False
+
+    if existing_objs:
+        model.objects.bulk_update(existing_objs, fields, batch_size=BATCH_SIZE)
+
+
+def save_runes(runes):
+    update_rune_fields(runes)
+
+    _bulk_save(RuneInstance, runes, _update_field_names(RuneInstance, exclude=['assigned_to', 'rta_assigned_to']))
+
+
+def save_artifacts(artifacts):
+    for artifact in artifacts:
+        artifact._update_values()
+
+    _bulk_save(
+        ArtifactInstance,
+        artifacts,
+        _update_field_names(ArtifactInstance, exclude=['assigned_to', 'rta_assigned_to'])
+    )
+
+
+def save_monsters(parsed_monsters):
+    """
+    Save parsed monsters and replace their equipped runes and artifacts.
+
+    Equivalent to saving each monster, then setting its default build to the equipped runes/artifacts and clearing
+    its RTA build.
+    """
+    monsters = [mon['obj'] for mon in parsed_monsters]
+    if not monsters:
+        return
+
+    # Skills for the max skill level check in MonsterInstance.update_fields(), fetched in one query
+    prefetch_related_objects([mon.monster for mon in monsters], 'skills')
+    for mon in monsters:
+        mon.update_fields()
+
+    _bulk_save(MonsterInstance, monsters, _update_field_names(MonsterInstance))
+
+    # Create missing builds, as done by MonsterInstance.save()
+    new_builds = []
+    monsters_without_builds = []
+    for mon in monsters:
+        if mon.default_build_id is None or mon.rta_build_id is None:
+            monsters_without_builds.append(mon)
+        if mon.default_build_id is None:
+            mon.default_build = RuneBuild(owner_id=mon.owner_id, monster_id=mon.pk, name='Equipped Runes')
+            new_builds.append(mon.default_build)
+        if mon.rta_build_id is None:
+            mon.rta_build = RuneBuild(owner_id=mon.owner_id, monster_id=mon.pk, name='Real-Time Arena')
+            new_builds.append(mon.rta_build)
+
+    if new_builds:
+        RuneBuild.objects.bulk_create(new_builds, batch_size=BATCH_SIZE)
+        MonsterInstance.objects.bulk_update(
+            monsters_without_builds, ['default_build', 'rta_build'], batch_size=BATCH_SIZE
+        )
+
+    monster_ids = [mon.pk for mon in monsters]
+    build_ids = [mon.default_build_id for mon in monsters] + [mon.rta_build_id for mon in monsters]
+
+    # Empty the builds and unassign everything that was in them
+    RuneBuild.runes.through.objects.filter(runebuild_id__in=build_ids).delete()
+    RuneBuild.artifacts.through.objects.filter(runebuild_id__in=build_ids).delete()
+    RuneInstance.objects.filter(assigned_to__in=monster_ids).update(assigned_to=None)
+    RuneInstance.objects.filter(rta_assigned_to__in=monster_ids).update(rta_assigned_to=None)
+    ArtifactInstance.objects.filter(assigned_to__in=monster_ids).update(assigned_to=None)
+    ArtifactInstance.objects.filter(rta_assigned_to__in=monster_ids).update(rta_assigned_to=None)
+
+    # Fill the default builds with the equipped runes and artifacts
+    rune_rows = []
+    artifact_rows = []
+    equipped_runes = {}
+    equipped_artifacts = {}
+    build_stats = []
+
+    for parsed in parsed_monsters:
+        mon = parsed['obj']
+        runes = list({rune.pk: rune for rune in parsed['runes']}.values())
+        artifacts = list({artifact.pk: artifact for artifact in parsed['artifacts']}.values())
+
+        for rune in runes:
+            rune.assigned_to = mon
+            equipped_runes[rune.pk] = rune
+            rune_rows.append(RuneBuild.runes.through(runebuild_id=mon.default_build_id, runeinstance_id=rune.pk))
+
+        for artifact in artifacts:
+            artifact.assigned_to = mon
+            equipped_artifacts[artifact.pk] = artifact
+            artifact_rows.append(
+                RuneBuild.artifacts.through(runebuild_id=mon.default_build_id, artifactinstance_id=artifact.pk)
+            )
+
+        build_stats.append((mon.default_build_id, RuneBuild.compute_stats(runes, artifacts)))
+        build_stats.append((mon.rta_build_id, RuneBuild.compute_stats([], [])))
+
+    RuneBuild.runes.through.objects.bulk_create(rune_rows, batch_size=BATCH_SIZE)
+    RuneBuild.artifacts.through.objects.bulk_create(artifact_rows, batch_size=BATCH_SIZE)
+    RuneInstance.objects.bulk_update(equipped_runes.values(), ['assigned_to'], batch_size=BATCH_SIZE)
+    ArtifactInstance.objects.bulk_update(equipped_artifacts.values(), ['assigned_to'], batch_size=BATCH_SIZE)
+
+    RuneBuild.save_computed_stats(build_stats)
+
@@ -0,0 +1,187 @@
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import Count, Sum
+
+from bestiary.cache import get_game_data
+from bestiary.models import Building, Fusion, Monster
+
+from .models import BuildingInstance, MonsterInstance, MonsterShrineStorage
+
+# Per-summoner data compared on the compare pages. Profiles of every summoner missing from the cache are computed
+# together with queries grouped by owner and cached until the summoner's last_update changes. Rune and artifact
+# statistics are kept in SummonerStatistics instead.
+
+CACHE_TIMEOUT = 24 * 60 * 60  # One day
+
+# Families counted as fusion monsters for the natural stars breakdown
+FREE_NAT5_FAMILIES = [19200, 23000, 24100, 24600, 1000100, 1000200]
+ELEMENTAL = [Monster.ELEMENT_WATER, Monster.ELEMENT_FIRE, Monster.ELEMENT_WIND]
+
+
+def _cache_key(summoner):
+    return f'comparison-profile-{summoner.pk}-{summoner.last_update.timestamp()}'
+
+
+def get_comparison_profiles(*summoners):
+    """
+    Comparison profiles of the given summoners, in the same order.
+    """
+    keys = {summoner.pk: _cache_key(summoner) for summoner in summoners}
+    cached = cache.get_many(keys.values())
+    profiles = {pk: cached[key] for pk, key in keys.items() if key in cached}
+
+    missing = [pk for pk in keys if pk not in profiles]
+    if missing:
+        computed = _build_profiles(missing)
+        cache.set_many({keys[pk]: profile for pk, profile in computed.items()}, CACHE_TIMEOUT)
+        profiles.update(computed)
+
+    return [profiles[summoner.pk] for summoner in summoners]
+
+
+def _empty_profile(buildings):
+    return {
+        'totals': {
+            'Count': 0,
+            'Nat 5⭐': 0,
+            'Nat 4⭐': 0,
+        },
+        'monsters': {
+            'summary': {
+                'Count': 0,
+                'In Storage': 0,
+                'Outside Storage': 0,
+                'Max Skillups': 0,
+                'Fusion Food': 0,
+                'In Monster Shrine Storage': 0,
+            },
+            'stars': {i: 0 for i in range(1, 7)},
+            'natural_stars': {
+                i: {
+                    'fusion': {'elemental': 0, 'ld': 0},
+                    'nonfusion': {'elemental': 0, 'ld': 0},
+                } for i in range(1, 6)
+            },
+            'elements': {element[1]: 0 for element in Monster.NORMAL_ELEMENT_CHOICES},
+            'archetypes': {archetype[1]: 0 for archetype in Monster.ARCHETYPE_CHOICES},
+        },
+        'buildings': {
+            'summary': {
+                'Remaining Towers Cost': 0,
+                'Remaining Flags Cost': 0,
+            },
+            'levels': {building.name: 0 for building in buildings},
+            'remaining_costs': {building.name: 0 for building in buildings},
+        },
+    }
+
+
+def _build_profiles(owner_ids):
+    buildings = get_game_data('compare-buildings', lambda: list(Building.objects.all().order_by('area', 'name')))
+    profiles = {pk: _empty_profile(buildings) for pk in owner_ids}
+
+    instances = MonsterInstance.objects.filter(owner_id__in=owner_ids).order_by().values_list(
+        'owner_id', 'monster_id', 'stars', 'in_storage',
+        'skill_1_level', 'skill_2_level', 'skill_3_level', 'skill_4_level',
+    ).annotate(count=Count('pk'))
+    instances = list(instances)
+
+    shrine = MonsterShrineStorage.objects.filter(owner_id__in=owner_ids).order_by().values_list(
+        'owner_id', 'item_id',
+    ).annotate(quantity=Sum('quantity'))
+    shrine = list(shrine)
+
+    monster_ids = {row[1] for row in instances} | {row[1] for row in shrine}
+    monsters = Monster.objects.filter(pk__in=monster_ids).order_by().annotate(num_skills=Count('skills')).only(
+        'natural_stars', 'element', 'archetype', 'family_id', 'fusion_food', 'skill_ups_to_max',
+    )
+    monsters = {mon.pk: mon for mon in monsters}
+    fusions = get_game_data(
+        'compare-fusions',
+        lambda: set(Fusion.objects.values_list('product__family_id', 'product__element')),
+    )
+
+    def add_monster(report, monster, quantity):
+        mon_el = 'elemental' if monster.element in ELEMENTAL else 'ld'
+        fusion = 'fusion' if (
+            (monster.family_id, monster.element) in fusions or monster.family_id in FREE_NAT5_FAMILIES
+        ) else 'nonfusion'
+        report['natural_stars'][monster.natural_stars][fusion][mon_el] += quantity
+        report['elements'][monster.get_element_display()] += quantity
+        report['archetypes'][monster.get_archetype_display()] += quantity
+
+    for owner_id, monster_id, stars, in_storage, *skill_levels, count in instances:
+        profile = profiles[owner_id]
+        monster = monsters[monster_id]
+        report = profile['monsters']
+
+        profile['totals']['Count'] += count
+        if monster.natural_stars in (4, 5):
+            profile['totals'][f'Nat {monster.natural_stars}⭐'] += count
+
+        if monster.archetype == Monster.ARCHETYPE_MATERIAL:
+            continue
+
+        report['summary']['Count'] += count
+        report['summary']['In Storage' if in_storage else 'Outside Storage'] += count
+        skill_ups_remaining = (monster.skill_ups_to_max or 0) - sum(
+            level - 1 for level in skill_levels[:monster.num_skills]
+        )
+        if skill_ups_remaining == 0:
+            report['summary']['Max Skillups'] += count
+        if monster.fusion_food:
+            report['summary']['Fusion Food'] += count
+        report['stars'][stars] += count
+        add_monster(report, monster, count)
+
+    for owner_id, monster_id, quantity in shrine:
+        profile = profiles[owner_id]
+        monster = monsters[monster_id]
+        report = profile['monsters']
+        quantity = quantity or 0
+
+        profile['totals']['Count'] += quantity
+        if monster.natural_stars in (4, 5):
+            profile['totals'][f'Nat {monster.natural_stars}⭐'] += quantity
+
+        if monster.archetype == Monster.ARCHETYPE_MATERIAL:
+            continue
+
+        report['summary']['Count'] += quantity
+        report['summary']['In Monster Shrine Storage'] += quantity
+        report['stars'][monster.natural_stars] += quantity
+        add_monster(report, monster, quantity)
+
+    levels = defaultdict(dict)
+    for owner_id, building_id, level in BuildingInstance.objects.filter(owner_id__in=owner_ids).values_list(
+            'owner_id', 'building_id', 'level'):
+        levels[owner_id][building_id] = level
+
+    for owner_id, profile in profiles.items():
+        report = profile['buildings']
+        for building in buildings:
+            if building.pk in levels[owner_id]:
+                level = levels[owner_id][building.pk]
+                report['levels'][building.name] = level
+            else:
+                level = 0
+
+            remaining_cost = sum(building.upgrade_cost[level:])
+            report['remaining_costs'][building.name] = remaining_cost
+            if building.area == Building.AREA_GENERAL:
+                report['summary']['Remaining Towers Cost'] += remaining_cost
+            else:
+                report['summary']['Remaining Flags Cost'] += remaining_cost
+
+    return profiles
+
+
+def pair(summoner_data, follower_data):
+    """
+    Merge two profile sections into the {"summoner": ..., "follower": ...} leaves expected by the compare reports.
+    """
+    if isinstance(summoner_data, dict):
+        return {key: pair(value, follower_data[key]) for key, value in summoner_data.items()}
+
+    return {"summoner": summoner_data, "follower": follower_data}
@@ -1,7 +1,14 @@
+import hashlib
+
 from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.cache import cache
 from django.urls import reverse
-from django.http import HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect
 from django.shortcuts import render
+from django.utils.cache import patch_vary_headers
+
+from .models import Summoner
 
 
 def username_case_redirect(function):
@@ -20,3 +27,67 @@ def username_case_redirect(function):
     wrap.__doc__ = function.__doc__
     wrap.__name__ = function.__name__
     return wrap
+
+
+PROFILE_RESPONSE_TIMEOUT = 24 * 60 * 60  # One day
+
+
+def cache_profile_response(*session_keys):
+    """
+    Cache rendered responses of a public profile view for visitors other than the owner.
+
+    Responses are cached per profile version (Summoner.last_update, bumped by any change to the profile), URL,
+    query string, the given session keys holding view settings and visitor, as pages include the visitor's navigation
+    and dark mode preference. Requests setting a view mode through URL arguments are not cached.
+    """
+    def decorator(function):
+        def wrap(request, *args, **kwargs):
+            profile_name = kwargs.get('profile_name')
+            view_settings = {key: value for key, value in kwargs.items() if key != 'profile_name'}
+            if request.method != 'GET' or not profile_name or any(view_settings.values()):
+                return function(request, *args, **kwargs)
+
+            profile = Summoner.objects.filter(user__username=profile_name).values_list(
+                'pk', 'user_id', 'last_update'
+            ).first()
+            if profile is None or profile[1] == request.user.pk:
+                return function(request, *args, **kwargs)
+
+            summoner_id, _, last_update = profile
+            variant = [
+                function.__module__,
+                function.__name__,
+                sorted(request.GET.lists()),
+                [request.session.get(key) for key in session_keys],
+                request.user.pk,
+            ]
+            digest = hashlib.md5(repr(variant).encode()).hexdigest()
+            cache_key = f'profile-response-{summoner_id}-{last_update.timestamp()}-{digest}'
+
+            cached = cache.get(cache_key)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                patch_vary_headers(response, ['Cookie'])
+                return response
+
+            response = function(request, *args, **kwargs)
+
+            # Responses with a CSRF token, flashed messages or session changes are specific to this request
+            cacheable = (
+                response.status_code == 200
+                and not response.streaming
+                and not request.META.get('CSRF_COOKIE_USED')
+                and not request.session.modified
+                and not getattr(get_messages(request), 'used', False)
+            )
+            if cacheable:
+                cache.set(cache_key, (response.content, response['Content-Type']), PROFILE_RESPONSE_TIMEOUT)
+
+            return response
+
+        wrap.__doc__ = function.__doc__
+        wrap.__name__ = function.__name__
+        return wrap
+
+    return decorator
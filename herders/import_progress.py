@@ -0,0 +1,69 @@
+import logging
+import time
+from contextlib import contextmanager
+
+from celery import states
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class ImportProgress:
+    """
+    Item counts, timing and query counts for each stage of a profile import.
+
+    Stages are published as the task state polled by the import progress page and logged as they complete.
+    """
+    def __init__(self, task=None):
+        # No task when the import is called directly instead of by a worker
+        self.task = task
+        self.stages = []
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return round(time.perf_counter() - self.started, 3)
+
+    @contextmanager
+    def stage(self, name, items=0):
+        """
+        Time a stage of the import. Yields the stage metrics so the item count can be set once it is known.
+        """
+        metrics = {'name': name, 'items': items, 'elapsed': 0, 'items_per_sec': 0, 'queries': 0}
+        self._publish(name)
+
+        def count_queries(execute, sql, params, many, context):
+            metrics['queries'] += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(count_queries):
+                yield metrics
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics['elapsed'] = round(elapsed, 3)
+            metrics['items_per_sec'] = round(metrics['items'] / elapsed, 1) if elapsed else 0
+            self.stages.append(metrics)
+
+            logger.info(
+                'Profile import stage %(name)s: %(items)d items in %(elapsed).3fs (%(items_per_sec).1f/s), '
+                '%(queries)d queries',
+                metrics,
+                extra={'import_stage': metrics},
+            )
+
+    def _publish(self, step):
+        if self.task is not None:
+            self.task.update_state(state=states.STARTED, meta={
+                'step': step,
+                'stages': self.stages,
+                'elapsed': self.elapsed,
+            })
+
+    def summary(self):
+        return {
+            'stages': self.stages,
+            'elapsed': self.elapsed,
+            'queries': sum(stage['queries'] for stage in self.stages),
+        }
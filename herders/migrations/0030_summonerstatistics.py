@@ -0,0 +1,28 @@
+# Generated by Django 2.2.24 on 2026-10-18 12:00
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('herders', '0029_summoner_dark_mode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SummonerStatistics',
+            fields=[
+                ('summoner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistics', serialize=False, to='herders.Summoner')),
+                ('runes', django.contrib.postgres.fields.jsonb.JSONField(default=dict)),
+                ('artifacts', django.contrib.postgres.fields.jsonb.JSONField(default=dict)),
+                ('stale', models.BooleanField(default=True)),
+                ('updated_on', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Summoner statistics',
+            },
+        ),
+    ]
@@ -1,5 +1,7 @@
+import threading
 import uuid
-from collections import OrderedDict
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
 from math import floor, ceil
 
 from django.core.exceptions import MultipleObjectsReturned
@@ -7,13 +9,17 @@ from django.contrib.auth.models import User
 from django.contrib.postgres.fields import ArrayField, JSONField
 from django.core.exceptions import ValidationError
 from django.db import models
-from django.db.models import Q, Count, Avg
+from django.db.models import Q, Count, Avg, Sum, Min, Max, StdDev
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.functional import cached_property
 from django.utils.safestring import mark_safe
 from timezone_field import TimeZoneField
 
 from bestiary.models import base, Monster, Building, Level, Rune, RuneCraft, Artifact, ArtifactCraft, GameItem
 
+from .aggregations import Median, Perc25, Perc75
+
 
 # Individual user/monster collection models
 class Summoner(models.Model):
@@ -63,6 +69,44 @@ class Summoner(models.Model):
         return self.user.username
 
 
+_profile_touches = threading.local()
+
+
+@contextmanager
+def defer_profile_touch():
+    """
+    Update last_update of summoners whose profile changes inside the block once on exit, instead of after each change.
+    Nested blocks are flushed by the outermost one.
+
+    The touches are also flushed when the block raises, as changes committed inside it before the error are kept. Open
+    the block outside of transaction.atomic() so the flush does not run in a transaction broken by the error.
+    """
+    if getattr(_profile_touches, 'pending', None) is not None:
+        yield
+        return
+
+    _profile_touches.pending = set()
+    try:
+        yield
+    finally:
+        pending, _profile_touches.pending = _profile_touches.pending, None
+
+        if pending:
+            Summoner.objects.filter(pk__in=pending).update(last_update=timezone.now())
+
+
+def touch_profile(summoner_id):
+    # Updated in place, as the summoner may be deleted along with the changed instance
+    if summoner_id is None:
+        return
+
+    pending = getattr(_profile_touches, 'pending', None)
+    if pending is None:
+        Summoner.objects.filter(pk=summoner_id).update(last_update=timezone.now())
+    else:
+        pending.add(summoner_id)
+
+
 class Storage(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     owner = models.ForeignKey(Summoner, on_delete=models.CASCADE)
@@ -427,7 +471,7 @@ class MonsterInstance(models.Model, base.Stars):
                 code='invalid_stars'
             )
 
-    def save(self, *args, **kwargs):
+    def update_fields(self):
         # Remove custom name if not a homunculus
         if not self.monster.homunculus:
             self.custom_name = ''
@@ -447,6 +491,8 @@ class MonsterInstance(models.Model, base.Stars):
         if len(skills) >= 4 and self.skill_4_level > skills[3].max_level:
             self.skill_4_level = skills[3].max_level
 
+    def save(self, *args, **kwargs):
+        self.update_fields()
         super(MonsterInstance, self).save(*args, **kwargs)
 
         if self.default_build is None or self.rta_build is None:
@@ -512,6 +558,38 @@ class RuneInstance(Rune):
         ordering = ['slot', 'type', 'level']
 
 
+_build_stats = threading.local()
+
+
+@contextmanager
+def defer_build_stats():
+    """
+    Recompute stats of builds whose runes or artifacts change inside the block once on exit, instead of after each
+    change. Nested blocks are flushed by the outermost one.
+    """
+    if getattr(_build_stats, 'pending', None) is not None:
+        yield
+        return
+
+    _build_stats.pending = {}
+    try:
+        yield
+    finally:
+        pending, _build_stats.pending = _build_stats.pending, None
+
+    RuneBuild.recompute_stats(pending.values())
+
+
+def queue_build_stats_update(build):
+    # Returns True if the build was queued for recompute by an active defer_build_stats() block
+    pending = getattr(_build_stats, 'pending', None)
+    if pending is None:
+        return False
+
+    pending[build.pk] = build
+    return True
+
+
 class RuneBuild(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     owner = models.ForeignKey(Summoner, on_delete=models.CASCADE)
@@ -610,18 +688,46 @@ class RuneBuild(models.Model):
 
         return stats
 
-    def update_stats(self):
-        # Sum all stats on the runes
-        stat_bonuses = {}
-        runes = self.runes.all()
-        artifacts = self.artifacts.all()
+    STAT_FIELDS = {
+        base.Stats.STAT_HP: 'hp',
+        base.Stats.STAT_HP_PCT: 'hp_pct',
+        base.Stats.STAT_ATK: 'attack',
+        base.Stats.STAT_ATK_PCT: 'attack_pct',
+        base.Stats.STAT_DEF: 'defense',
+        base.Stats.STAT_DEF_PCT: 'defense_pct',
+        base.Stats.STAT_SPD: 'speed',
+        base.Stats.STAT_SPD_PCT: 'speed_pct',
+        base.Stats.STAT_CRIT_RATE_PCT: 'crit_rate',
+        base.Stats.STAT_CRIT_DMG_PCT: 'crit_damage',
+        base.Stats.STAT_RESIST_PCT: 'resistance',
+        base.Stats.STAT_ACCURACY_PCT: 'accuracy',
+    }
 
-        for stat, _ in RuneInstance.STAT_CHOICES:
-            if stat not in stat_bonuses:
-                stat_bonuses[stat] = 0
+    @staticmethod
+    def get_active_rune_sets(runes):
+        completed_sets = []
+        set_counts = Counter(rune.type for rune in runes)
+
+        for rune_type, present in set_counts.items():
+            required = RuneInstance.RUNE_SET_COUNT_REQUIREMENTS[rune_type]
+            completed_sets.extend([rune_type] * (present // required))
+
+        return completed_sets
+
+    @classmethod
+    def compute_stats(cls, runes, artifacts):
+        """
+        Stat bonus and avg_efficiency field values for a build made of the given rune and artifact instances.
+        Works on objects already in memory so many builds can be computed without querying each one.
+        """
+        # Sum all stats on the runes
+        stat_bonuses = {stat: 0 for stat, _ in RuneInstance.STAT_CHOICES}
 
-            for rune in runes:
-                stat_bonuses[stat] += rune.get_stat(stat)
+        for rune in runes:
+            # Only stats present on the rune can be non-zero
+            for stat in {rune.main_stat, rune.innate_stat, *rune.substats}:
+                if stat in stat_bonuses:
+                    stat_bonuses[stat] += rune.get_stat(stat)
 
         for artifact in artifacts:
             # artifact has only main stat, which increases base monster stats
@@ -629,25 +735,68 @@ class RuneBuild(models.Model):
 
         # Add in any active set bonuses
         stat_bonuses[RuneInstance.STAT_SPD_PCT] = 0
-        for active_set in self.active_rune_sets:
+        for active_set in cls.get_active_rune_sets(runes):
             stat = RuneInstance.RUNE_SET_BONUSES[active_set]['stat']
             if stat:
                 stat_bonuses[stat] += RuneInstance.RUNE_SET_BONUSES[active_set]['value']
 
-        self.hp = stat_bonuses.get(base.Stats.STAT_HP, 0)
-        self.hp_pct = stat_bonuses.get(base.Stats.STAT_HP_PCT, 0)
-        self.attack = stat_bonuses.get(base.Stats.STAT_ATK, 0)
-        self.attack_pct = stat_bonuses.get(base.Stats.STAT_ATK_PCT, 0)
-        self.defense = stat_bonuses.get(base.Stats.STAT_DEF, 0)
-        self.defense_pct = stat_bonuses.get(base.Stats.STAT_DEF_PCT, 0)
-        self.speed = stat_bonuses.get(base.Stats.STAT_SPD, 0)
-        self.speed_pct = stat_bonuses.get(base.Stats.STAT_SPD_PCT, 0)
-        self.crit_rate = stat_bonuses.get(base.Stats.STAT_CRIT_RATE_PCT, 0)
-        self.crit_damage = stat_bonuses.get(base.Stats.STAT_CRIT_DMG_PCT, 0)
-        self.resistance = stat_bonuses.get(base.Stats.STAT_RESIST_PCT, 0)
-        self.accuracy = stat_bonuses.get(base.Stats.STAT_ACCURACY_PCT, 0)
-        self.avg_efficiency = self.runes.aggregate(
-            Avg('efficiency'))['efficiency__avg'] or 0.0
+        fields = {field: stat_bonuses.get(stat, 0) for stat, field in cls.STAT_FIELDS.items()}
+
+        efficiencies = [rune.efficiency for rune in runes if rune.efficiency is not None]
+        fields['avg_efficiency'] = sum(efficiencies) / len(efficiencies) if efficiencies else 0.0
+
+        return fields
+
+    def update_stats(self):
+        for field, value in self.compute_stats(list(self.runes.all()), list(self.artifacts.all())).items():
+            setattr(self, field, value)
+
+    @classmethod
+    def save_computed_stats(cls, build_stats):
+        """
+        Write compute_stats() results for many builds in one bulk update.
+
+        :param build_stats: List of (RuneBuild instance or pk, stats dict) tuples. Instances are updated in place.
+        """
+        builds = []
+        for build, stats in build_stats:
+            if not isinstance(build, cls):
+                # Only the stat fields are written, so the rest of the build does not need to be loaded
+                build = cls(pk=build)
+
+            for field, value in stats.items():
+                setattr(build, field, value)
+            builds.append(build)
+
+        if builds:
+            fields = list(cls.STAT_FIELDS.values()) + ['avg_efficiency']
+            cls.objects.bulk_update(builds, fields, batch_size=500)
+
+    @classmethod
+    def recompute_stats(cls, builds):
+        """
+        Recompute stats of many builds from their current runes and artifacts with one query per relation.
+
+        :param builds: RuneBuild instances or pks
+        """
+        builds = {build.pk if isinstance(build, cls) else build: build for build in builds}
+        if not builds:
+            return
+
+        runes = {build_id: [] for build_id in builds}
+        artifacts = {build_id: [] for build_id in builds}
+
+        for row in cls.runes.through.objects.filter(runebuild_id__in=builds.keys()).select_related('runeinstance'):
+            runes[row.runebuild_id].append(row.runeinstance)
+
+        for row in cls.artifacts.through.objects.filter(
+            runebuild_id__in=builds.keys()
+        ).select_related('artifactinstance'):
+            artifacts[row.runebuild_id].append(row.artifactinstance)
+
+        cls.save_computed_stats([
+            (build, cls.compute_stats(runes[build_id], artifacts[build_id])) for build_id, build in builds.items()
+        ])
 
     def clear_cache_properties(self):
         fields = [
@@ -667,14 +816,16 @@ class RuneBuild(models.Model):
                 pass 
 
     def assign_rune(self, rune):
-        # Clear any existing rune in slot
-        self.runes.remove(*self.runes.filter(slot=rune.slot))
-        self.runes.add(rune)
+        with defer_build_stats():
+            # Clear any existing rune in slot
+            self.runes.remove(*self.runes.filter(slot=rune.slot))
+            self.runes.add(rune)
 
     def assign_artifact(self, artifact):
-        # Clear any existing artifact in slot
-        self.artifacts.remove(*self.artifacts.filter(slot=artifact.slot))
-        self.artifacts.add(artifact)
+        with defer_build_stats():
+            # Clear any existing artifact in slot
+            self.artifacts.remove(*self.artifacts.filter(slot=artifact.slot))
+            self.artifacts.add(artifact)
 
     @cached_property
     def runes_per_slot(self):
@@ -736,6 +887,178 @@ class ArtifactCraftInstance(ArtifactCraft):
     quantity = models.IntegerField(default=1)
 
 
+_stale_statistics = threading.local()
+
+
+@contextmanager
+def defer_statistics_update():
+    """
+    Mark statistics of summoners whose runes or artifacts change inside the block stale once on exit, instead of after
+    each change. Nested blocks are flushed by the outermost one.
+    """
+    if getattr(_stale_statistics, 'pending', None) is not None:
+        yield
+        return
+
+    _stale_statistics.pending = set()
+    try:
+        yield
+    finally:
+        pending, _stale_statistics.pending = _stale_statistics.pending, None
+
+    SummonerStatistics.mark_stale(pending)
+
+
+def queue_statistics_update(summoner_id):
+    pending = getattr(_stale_statistics, 'pending', None)
+    if pending is None:
+        SummonerStatistics.mark_stale([summoner_id])
+    else:
+        pending.add(summoner_id)
+
+
+class SummonerStatistics(models.Model):
+    """
+    Rune and artifact histograms and efficiency statistics of a summoner for the stats and compare pages.
+
+    Rune and artifact changes mark the statistics stale and they are rebuilt with one pass over the summoner's runes
+    and artifacts when next read.
+    """
+    # Report name, queried value and choices to display it with. List values count each element.
+    RUNE_HISTOGRAMS = [
+        ('stars', 'stars', None),
+        ('sets', 'type', Rune.TYPE_CHOICES),
+        ('quality', 'quality', Rune.QUALITY_CHOICES),
+        ('quality_original', 'original_quality', Rune.QUALITY_CHOICES),
+        ('slot', 'slot', None),
+        ('main_stat', 'main_stat', Rune.STAT_CHOICES),
+        ('innate_stat', 'innate_stat', Rune.STAT_CHOICES),
+        ('substats', 'substats', Rune.STAT_CHOICES),
+    ]
+    ARTIFACT_HISTOGRAMS = [
+        ('quality', 'quality', Artifact.QUALITY_CHOICES),
+        ('quality_original', 'original_quality', Artifact.QUALITY_CHOICES),
+        ('slot', 'precise_slot', Artifact.ARCHETYPE_CHOICES + Artifact.NORMAL_ELEMENT_CHOICES),
+        ('main_stat', 'main_stat', Artifact.MAIN_STAT_CHOICES),
+        ('substats', 'effects', Artifact.EFFECT_CHOICES),
+    ]
+    EFFICIENCY_AGGREGATES = [Avg, StdDev, Min, Perc25, Median, Perc75, Max]
+
+    summoner = models.OneToOneField(Summoner, on_delete=models.CASCADE, primary_key=True, related_name='statistics')
+    runes = JSONField(default=dict)
+    artifacts = JSONField(default=dict)
+    stale = models.BooleanField(default=True)
+    updated_on = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Summoner statistics'
+
+    def __str__(self):
+        return f'Statistics of {self.summoner}'
+
+    @classmethod
+    def get_for_summoner(cls, summoner):
+        return cls.get_for_summoners([summoner])[0]
+
+    @classmethod
+    def get_for_summoners(cls, summoners):
+        existing = cls.objects.in_bulk([summoner.pk for summoner in summoners])
+        statistics = []
+        for summoner in summoners:
+            stats = existing.get(summoner.pk)
+            if stats is None:
+                stats, _ = cls.objects.get_or_create(summoner_id=summoner.pk)
+            if stats.stale:
+                stats.rebuild()
+            statistics.append(stats)
+
+        return statistics
+
+    @classmethod
+    def mark_stale(cls, summoner_ids):
+        if summoner_ids:
+            cls.objects.filter(summoner_id__in=summoner_ids, stale=False).update(stale=True)
+
+    def rebuild(self):
+        # Cleared before reading so changes made while rebuilding mark it stale again
+        SummonerStatistics.objects.filter(pk=self.pk).update(stale=False)
+        self.stale = False
+
+        runes = RuneInstance.objects.filter(owner_id=self.summoner_id)
+        artifacts = ArtifactInstance.objects.filter(owner_id=self.summoner_id).annotate(
+            precise_slot=Coalesce('archetype', 'element'),
+        )
+
+        self.runes = self._collect(runes, self.RUNE_HISTOGRAMS, worth=True)
+        self.artifacts = self._collect(artifacts, self.ARTIFACT_HISTOGRAMS)
+        self.save(update_fields=['runes', 'artifacts', 'updated_on'])
+
+    @classmethod
+    def _collect(cls, queryset, histograms, worth=False):
+        counters = [Counter() for _ in histograms]
+        values = [value for _, value, _ in histograms]
+        if worth:
+            values.append('value')
+        count = 0
+        total_worth = 0
+
+        for row in queryset.values_list(*values):
+            count += 1
+            if worth:
+                total_worth += row[-1] or 0
+
+            for counter, value in zip(counters, row):
+                if isinstance(value, list):
+                    counter.update(value)
+                else:
+                    counter[value] += 1
+
+        aggregates = [Count('efficiency')] + [aggregate('efficiency') for aggregate in cls.EFFICIENCY_AGGREGATES]
+        if worth:
+            aggregates.append(Sum('value'))
+
+        return {
+            'count': count,
+            'worth': total_worth,
+            'efficiency': queryset.aggregate(*aggregates),
+            # Lists of [value, count] pairs, as JSON object keys would turn the values into strings
+            'histograms': {
+                name: [[value, num] for value, num in counter.items()]
+                for (name, _, _), counter in zip(histograms, counters)
+            },
+        }
+
+    def _document(self, model):
+        return self.runes if issubclass(model, Rune) else self.artifacts
+
+    def summary(self, model):
+        document = self._document(model)
+        return document['count'], document['worth']
+
+    def efficiency_statistics(self, model):
+        """
+        Result of aggregating efficiency with Count, EFFICIENCY_AGGREGATES and (for runes) the Sum of value.
+        """
+        return self._document(model)['efficiency']
+
+    def histograms(self, model):
+        """
+        Count of runes or artifacts per displayed value, keyed by report name.
+        """
+        if issubclass(model, Rune):
+            definitions = self.RUNE_HISTOGRAMS
+        else:
+            definitions = self.ARTIFACT_HISTOGRAMS
+
+        counts = self._document(model)['histograms']
+        report = {}
+        for name, _, choices in definitions:
+            display = dict(choices or [])
+            report[name] = [(display.get(value, value), num) for value, num in counts.get(name, [])]
+
+        return report
+
+
 class TeamGroup(models.Model):
     owner = models.ForeignKey(Summoner, on_delete=models.CASCADE)
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -3,6 +3,7 @@ from django.utils.timezone import get_current_timezone
 from jsonschema.exceptions import best_match
 
 from bestiary.models import Monster, Building, GameItem
+from bestiary.registry import get_registry
 from herders.models import MonsterInstance, RuneInstance, RuneCraftInstance, MonsterPiece, BuildingInstance, ArtifactInstance, ArtifactCraftInstance
 from herders.profile_schema import HubUserLoginValidator, VisitFriendValidator
 
@@ -54,7 +55,55 @@ def validate_sw_json(data, summoner):
     return schema_error, validation_errors
 
 
-def parse_sw_json(data, owner, options):
+class ImportContext:
+    """
+    Bestiary objects and the owner's existing instances keyed by com2us_id, loaded up front so parsing a profile
+    does not query once per unit, rune and artifact.
+    """
+    INSTANCE_MODELS = [MonsterInstance, RuneInstance, RuneCraftInstance, ArtifactInstance, ArtifactCraftInstance]
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.monsters = get_registry().monsters
+        self.buildings = _by_com2us_id(Building.objects.all())
+        self.instances = {
+            model: _by_com2us_id(model.objects.filter(owner=owner)) for model in self.INSTANCE_MODELS
+        }
+
+        self.building_instances = {}
+        for building_instance in BuildingInstance.objects.filter(owner=owner):
+            self.building_instances.setdefault(building_instance.building_id, []).append(building_instance)
+
+        self.monster_pieces = {
+            piece.monster_id: piece for piece in MonsterPiece.objects.filter(owner=owner)
+        }
+
+    def get_monster(self, com2us_id):
+        try:
+            return self.monsters.get(int(com2us_id))
+        except (TypeError, ValueError):
+            raise ValueError(
+                'Unable to find monster matching ID ' + str(com2us_id))
+
+    def get_instance(self, model, com2us_id):
+        return self.instances[model].get(com2us_id)
+
+    def add_instance(self, instance):
+        # Register a newly parsed object so repeated IDs in the data resolve to it
+        self.instances[type(instance)][instance.com2us_id] = instance
+
+
+def _by_com2us_id(qs):
+    # Keep the first object in default ordering for duplicated IDs, same as filter(com2us_id=...).first()
+    objects = {}
+    for obj in qs:
+        objects.setdefault(obj.com2us_id, obj)
+    return objects
+
+
+def parse_sw_json(data, owner, options, context=None):
+    # Parts of one export parsed separately share a context, see ProfileStream
+    context = context or ImportContext(owner)
     wizard_id = None
     parsed_runes = {}
     parsed_rune_crafts = {}
@@ -94,25 +143,24 @@ def parse_sw_json(data, owner, options):
                 break
 
     for deco in deco_list:
-        try:
-            base_building = Building.objects.get(com2us_id=deco['master_id'])
-        except Building.DoesNotExist:
+        base_building = context.buildings.get(deco['master_id'])
+        if base_building is None:
             continue
 
         level = deco['level']
 
-        try:
-            building_instance = BuildingInstance.objects.get(
-                owner=owner, building=base_building)
-        except BuildingInstance.DoesNotExist:
+        building_instances = context.building_instances.get(base_building.pk)
+        if not building_instances:
             building_instance = BuildingInstance(
                 owner=owner, building=base_building)
-        except BuildingInstance.MultipleObjectsReturned:
-            # Should only be 1 ever - use the first and delete the others.
-            building_instance = BuildingInstance.objects.filter(
-                owner=owner, building=base_building).first()
-            BuildingInstance.objects.filter(owner=owner, building=base_building).exclude(
-                pk=building_instance.pk).delete()
+            context.building_instances[base_building.pk] = [building_instance]
+        else:
+            building_instance = building_instances[0]
+            if len(building_instances) > 1:
+                # Should only be 1 ever - use the first and delete the others.
+                BuildingInstance.objects.filter(owner=owner, building=base_building).exclude(
+                    pk=building_instance.pk).delete()
+                del building_instances[1:]
 
         if building_instance.level != level:
             building_instance.level = level
@@ -141,18 +189,17 @@ def parse_sw_json(data, owner, options):
             elif item['item_master_type'] == GameItem.CATEGORY_MONSTER_PIECE:
                 quantity = item.get('item_quantity')
                 if quantity > 0:
-                    mon = get_monster_from_id(item['item_master_id'])
+                    mon = get_monster_from_id(item['item_master_id'], context)
 
                     if mon:
                         has_changed = False
-                        monster_piece, created = MonsterPiece.objects.get_or_create(
-                            owner=owner, 
-                            monster=mon,
-                            defaults={
-                                'pieces': quantity,
-                            }
-                        )
-                        if not created and monster_piece.pieces != quantity:
+                        monster_piece = context.monster_pieces.get(mon.pk)
+                        created = monster_piece is None
+                        if created:
+                            # Saved with the rest of the changed pieces
+                            monster_piece = MonsterPiece(owner=owner, monster=mon, pieces=quantity)
+                            context.monster_pieces[mon.pk] = monster_piece
+                        elif monster_piece.pieces != quantity:
                             monster_piece.pieces = quantity
                             has_changed = True
                         
@@ -168,7 +215,7 @@ def parse_sw_json(data, owner, options):
     # Extract Rune Inventory (unequipped runes)
     if runes_info:
         for rune_data in runes_info:
-            rune = parse_rune_data(rune_data, owner)
+            rune = parse_rune_data(rune_data, owner, context)
             if rune:
                 parsed_runes[rune.pk] = rune
 
@@ -176,12 +223,11 @@ def parse_sw_json(data, owner, options):
     for unit_info in unit_list:
         # Get base monster type
         com2us_id = unit_info.get('unit_id')
-        monster_type_id = str(unit_info.get('unit_master_id'))
+        monster_type_id = unit_info.get('unit_master_id')
         mon = None
 
         if not options['clear_profile']:
-            mon = MonsterInstance.objects.filter(
-                com2us_id=com2us_id, owner=owner).first()
+            mon = context.get_instance(MonsterInstance, com2us_id)
 
         if not mon:
             mon = MonsterInstance()
@@ -192,9 +238,8 @@ def parse_sw_json(data, owner, options):
         mon.com2us_id = com2us_id
 
         # Base monster
-        try:
-            temp_monster = Monster.objects.get(com2us_id=monster_type_id)
-        except Monster.DoesNotExist:
+        temp_monster = context.monsters.get(monster_type_id)
+        if temp_monster is None:
             # Unable to find a matching monster in the database - either crap data or brand new monster. Don't parse it.
             continue
 
@@ -208,14 +253,14 @@ def parse_sw_json(data, owner, options):
 
         mon_runes = []
         for rune_data in equipped_runes:
-            rune = parse_rune_data(rune_data, owner)
+            rune = parse_rune_data(rune_data, owner, context)
             if rune:
                 parsed_runes[rune.pk] = rune
                 mon_runes.append(rune)
 
         mon_artifacts = []
         for artifact_data in equipped_artifacts:
-            artifact = parse_artifact_data(artifact_data, owner)
+            artifact = parse_artifact_data(artifact_data, owner, context)
             if artifact:
                 parsed_artifacts[artifact.pk] = artifact
                 mon_artifacts.append(artifact)
@@ -290,7 +335,7 @@ def parse_sw_json(data, owner, options):
     if craft_info:
         for craft_data in craft_info:
             craft, has_changed_or_new = parse_rune_craft_data(
-                craft_data, owner)
+                craft_data, owner, context)
             if craft:
                 if has_changed_or_new:
                     craft.owner = owner
@@ -302,14 +347,14 @@ def parse_sw_json(data, owner, options):
     # Extract artifact inventory
     if artifact_info:
         for artifact_data in artifact_info:
-            artifact = parse_artifact_data(artifact_data, owner)
+            artifact = parse_artifact_data(artifact_data, owner, context)
             if artifact:
                 parsed_artifacts[artifact.pk] = artifact
 
     if artifact_craft_info:
         for craft_data in artifact_craft_info:
             craft, has_changed_or_new = parse_artifact_craft_data(
-                craft_data, owner)
+                craft_data, owner, context)
             if craft:
                 if has_changed_or_new:
                     craft.owner = owner
@@ -336,9 +381,12 @@ def parse_sw_json(data, owner, options):
     return import_results
 
 
-def get_monster_from_id(com2us_id):
+def get_monster_from_id(com2us_id, context=None):
+    if context:
+        return context.get_monster(com2us_id)
+
     try:
-        return Monster.objects.get(com2us_id=com2us_id)
+        return get_registry().get_monster(com2us_id)
     except (TypeError, ValueError):
         raise ValueError(
             'Unable to find monster matching ID ' + str(com2us_id))
@@ -346,11 +394,14 @@ def get_monster_from_id(com2us_id):
         return None
 
 
-def parse_rune_data(rune_data, owner):
+def parse_rune_data(rune_data, owner, context=None):
     com2us_id = rune_data.get('rune_id')
 
-    rune = RuneInstance.objects.filter(
-        com2us_id=com2us_id, owner=owner).first()
+    if context:
+        rune = context.get_instance(RuneInstance, com2us_id)
+    else:
+        rune = RuneInstance.objects.filter(
+            com2us_id=com2us_id, owner=owner).first()
 
     if not rune:
         rune = RuneInstance()
@@ -405,10 +456,13 @@ def parse_rune_data(rune_data, owner):
 
     rune.owner = owner
 
+    if context:
+        context.add_instance(rune)
+
     return rune
 
 
-def parse_rune_craft_data(craft_data, owner):
+def parse_rune_craft_data(craft_data, owner, context=None):
     # craft_type_id = 5 digit number
     # Work backwards to figure it out
     # [-1:] = quality
@@ -416,12 +470,17 @@ def parse_rune_craft_data(craft_data, owner):
     # [:-4] = rune set
 
     com2us_id = craft_data['craft_item_id']
-    craft = RuneCraftInstance.objects.filter(
-        com2us_id=com2us_id, owner=owner).first()
+    if context:
+        craft = context.get_instance(RuneCraftInstance, com2us_id)
+    else:
+        craft = RuneCraftInstance.objects.filter(
+            com2us_id=com2us_id, owner=owner).first()
 
     if not craft:
         is_new = True
         craft = RuneCraftInstance(com2us_id=com2us_id, owner=owner)
+        if context:
+            context.add_instance(craft)
     else:
         is_new = False
 
@@ -446,11 +505,14 @@ def parse_rune_craft_data(craft_data, owner):
     return craft, True  # craft obj, has_changed_or_new
 
 
-def parse_artifact_data(artifact_data, owner):
+def parse_artifact_data(artifact_data, owner, context=None):
     com2us_id = artifact_data.get('rid')
 
-    artifact = ArtifactInstance.objects.filter(
-        com2us_id=com2us_id, owner=owner).first()
+    if context:
+        artifact = context.get_instance(ArtifactInstance, com2us_id)
+    else:
+        artifact = ArtifactInstance.objects.filter(
+            com2us_id=com2us_id, owner=owner).first()
 
     if not artifact:
         artifact = ArtifactInstance(com2us_id=com2us_id, owner=owner)
@@ -495,10 +557,13 @@ def parse_artifact_data(artifact_data, owner):
 
     artifact.owner = owner
 
+    if context:
+        context.add_instance(artifact)
+
     return artifact
 
 
-def parse_artifact_craft_data(craft_data, owner):
+def parse_artifact_craft_data(craft_data, owner, context=None):
     # master_id = 12 digit number
     # Digits:
     #   [0] = always 1, skip
@@ -509,12 +574,17 @@ def parse_artifact_craft_data(craft_data, owner):
     #   [9:] = effect
 
     com2us_id = craft_data['rid']
-    craft = ArtifactCraftInstance.objects.filter(
-        com2us_id=com2us_id, owner=owner).first()
+    if context:
+        craft = context.get_instance(ArtifactCraftInstance, com2us_id)
+    else:
+        craft = ArtifactCraftInstance.objects.filter(
+            com2us_id=com2us_id, owner=owner).first()
 
     if not craft:
         is_new = True
         craft = ArtifactCraftInstance(com2us_id=com2us_id, owner=owner)
+        if context:
+            context.add_instance(craft)
     else:
         is_new = False
 
@@ -1,4 +1,4 @@
-from jsonschema import Draft4Validator
+from data_log.compiled_schema import compile_validator
 
 HubUserLoginSchema = {
     '$schema': 'http://json-schema.org/draft-04/schema#',
@@ -261,5 +261,5 @@ VisitFriendSchema = {
     'required': ['friend'],
 }
 
-HubUserLoginValidator = Draft4Validator(HubUserLoginSchema)
-VisitFriendValidator = Draft4Validator(VisitFriendSchema)
+HubUserLoginValidator = compile_validator(HubUserLoginSchema)
+VisitFriendValidator = compile_validator(VisitFriendSchema)
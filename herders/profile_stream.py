@@ -0,0 +1,122 @@
+import os
+import uuid
+from itertools import islice
+
+import ijson
+from django.conf import settings
+
+from .profile_parser import validate_sw_json
+
+# Reads SWEX profile exports from a file without loading them whole. The large sections are read in batches of items
+# and everything else is loaded up front, so an import keeps at most one batch of raw items in memory.
+
+STREAMED_SECTIONS = ['unit_list', 'runes', 'artifacts']
+BATCH_SIZE = 500
+
+
+def save_profile_upload(uploaded_file):
+    """
+    Copy an uploaded export to PROFILE_IMPORT_DIR, where the import task reads it from. Returns the file path.
+    """
+    os.makedirs(settings.PROFILE_IMPORT_DIR, exist_ok=True)
+    path = os.path.join(settings.PROFILE_IMPORT_DIR, f'{uuid.uuid4()}.json')
+
+    with open(path, 'wb') as f:
+        for chunk in uploaded_file.chunks():
+            f.write(chunk)
+
+    return path
+
+
+class ProfileStream:
+    """
+    A profile export saved to a file.
+
+    data holds the export with the streamed sections replaced by empty lists. batches() reads a streamed section in
+    batches, each one returned as export data that parse_sw_json() can parse on its own.
+    """
+
+    def __init__(self, path, batch_size=BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+
+        with open(path, 'rb') as f:
+            self.data = _read_sections(f)
+
+        if not isinstance(self.data, dict):
+            raise ValueError('Profile export is not a JSON object')
+
+        if self.data.get('command') == 'VisitFriend':
+            self.prefix = 'friend.'
+            self.profile = self.data.get('friend') or {}
+        else:
+            self.prefix = ''
+            self.profile = self.data
+
+    def batches(self, section):
+        with open(self.path, 'rb') as f:
+            items = ijson.items(f, f'{self.prefix}{section}.item', use_float=True)
+            try:
+                while True:
+                    batch = list(islice(items, self.batch_size))
+                    if not batch:
+                        return
+
+                    yield {
+                        # Storage building and locked monsters are needed to parse monsters
+                        'building_list': self.profile.get('building_list', []),
+                        'unit_lock_list': self.profile.get('unit_lock_list'),
+                        'deco_list': [],
+                        'unit_list': [],
+                        'world_arena_rune_equip_list': [],
+                        'world_arena_artifact_equip_list': [],
+                        section: batch,
+                    }
+            except ijson.JSONError as e:
+                raise ValueError(str(e))
+
+    def validate(self, summoner):
+        """
+        Same as validate_sw_json() on the whole export.
+        """
+        if self.prefix:
+            # Monsters of friend exports are checked by the schema, one batch at a time
+            result = None
+            for batch in self.batches('unit_list'):
+                friend = dict(self.profile, unit_list=batch['unit_list'])
+                result = validate_sw_json(dict(self.data, friend=friend), summoner)
+                if result[0]:
+                    break
+            return result or validate_sw_json(self.data, summoner)
+
+        return validate_sw_json(self.data, summoner)
+
+
+def _read_sections(f):
+    # Build the export with ijson events, replacing the streamed sections by empty lists instead of building them
+    builder = ijson.ObjectBuilder()
+    skipped = None
+    skip_started = False
+
+    try:
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if skipped is not None:
+                if not skip_started and event not in ('start_array', 'start_map'):
+                    # Scalar in place of a list
+                    skipped = None
+                elif prefix == skipped and event in ('end_array', 'end_map'):
+                    skipped = None
+                skip_started = True
+                continue
+
+            builder.event(event, value)
+
+            if event == 'map_key' and value in STREAMED_SECTIONS and prefix in ('', 'friend'):
+                builder.event('start_array', None)
+                builder.event('end_array', None)
+                skipped = f'{prefix}.{value}' if prefix else value
+                skip_started = False
+    except ijson.JSONError as e:
+        raise ValueError(str(e))
+
+    return getattr(builder, 'value', None)
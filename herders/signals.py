@@ -1,9 +1,10 @@
 from django.core.exceptions import ValidationError
 from django.db.models import Count, Q
-from django.db.models.signals import post_save, m2m_changed
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 
-from .models import MonsterInstance, MonsterPiece, RuneInstance, RuneBuild, RuneCraftInstance, ArtifactInstance, ArtifactCraftInstance, MaterialStorage, MonsterShrineStorage, BuildingInstance
+from .models import MonsterInstance, MonsterPiece, RuneInstance, RuneBuild, RuneCraftInstance, ArtifactInstance, ArtifactCraftInstance, MaterialStorage, MonsterShrineStorage, BuildingInstance, TeamGroup, Team, queue_build_stats_update, queue_statistics_update, touch_profile
+from .sync_state import instance_saved, instance_deleted, forget_instances
 
 
 @receiver(post_save, sender=MonsterInstance)
@@ -15,8 +16,39 @@ from .models import MonsterInstance, MonsterPiece, RuneInstance, RuneBuild, Rune
 @receiver(post_save, sender=MaterialStorage)
 @receiver(post_save, sender=MonsterShrineStorage)
 @receiver(post_save, sender=BuildingInstance)
-def update_profile_date(sender, instance, **kwargs):
-    instance.owner.save()
+@receiver(post_delete, sender=MonsterInstance)
+@receiver(post_delete, sender=MonsterPiece)
+@receiver(post_delete, sender=RuneInstance)
+@receiver(post_delete, sender=RuneCraftInstance)
+@receiver(post_delete, sender=ArtifactInstance)
+@receiver(post_delete, sender=ArtifactCraftInstance)
+@receiver(post_delete, sender=MaterialStorage)
+@receiver(post_delete, sender=MonsterShrineStorage)
+@receiver(post_delete, sender=BuildingInstance)
+@receiver(post_save, sender=TeamGroup)
+@receiver(post_delete, sender=TeamGroup)
+@receiver(post_save, sender=Team)
+@receiver(post_delete, sender=Team)
+def touch_profile_date(sender, instance, **kwargs):
+    touch_profile(instance.owner_id)
+
+
+@receiver(m2m_changed, sender=RuneBuild.runes.through)
+@receiver(m2m_changed, sender=RuneBuild.artifacts.through)
+@receiver(m2m_changed, sender=Team.roster.through)
+def touch_profile_date_on_m2m_change(sender, instance, action, reverse, **kwargs):
+    if action not in ('post_add', 'post_clear', 'post_remove') or reverse:
+        return
+
+    touch_profile_date(sender, instance)
+
+
+@receiver(post_save, sender=RuneInstance)
+@receiver(post_delete, sender=RuneInstance)
+@receiver(post_save, sender=ArtifactInstance)
+@receiver(post_delete, sender=ArtifactInstance)
+def update_summoner_statistics(sender, instance, **kwargs):
+    queue_statistics_update(instance.owner_id)
 
 
 @receiver(m2m_changed, sender=RuneBuild.runes.through)
@@ -91,6 +123,9 @@ def update_rune_build_stats(sender, instance, action, **kwargs):
         return
 
     instance.clear_cache_properties()
+    if queue_build_stats_update(instance):
+        return
+
     instance.update_stats()
     instance.save()
 
@@ -122,4 +157,28 @@ def manage_assigned_to(sender, instance, action, reverse, model, pk_set, **kwarg
             model.objects.filter(pk__in=pk_set).update(rta_assigned_to=instance.monster)
         elif action == 'post_clear':
             # Remove all objects assigned to the monster
-            model.objects.filter(rta_assigned_to=instance.monster).update(rta_assigned_to=None)
\ No newline at end of file
+            model.objects.filter(rta_assigned_to=instance.monster).update(rta_assigned_to=None)
+
+
+@receiver(post_save, sender=MonsterInstance)
+@receiver(post_save, sender=RuneInstance)
+@receiver(post_save, sender=ArtifactInstance)
+def share_saved_sync_instance(sender, instance, **kwargs):
+    instance_saved(instance)
+
+
+@receiver(post_delete, sender=MonsterInstance)
+@receiver(post_delete, sender=RuneInstance)
+@receiver(post_delete, sender=ArtifactInstance)
+def forget_deleted_sync_instance(sender, instance, **kwargs):
+    instance_deleted(instance)
+
+
+@receiver(m2m_changed, sender=RuneBuild.runes.through)
+@receiver(m2m_changed, sender=RuneBuild.artifacts.through)
+def forget_reassigned_sync_instances(sender, action, reverse, model, pk_set, **kwargs):
+    # manage_assigned_to updates assigned_to with queryset updates
+    if action not in ('post_add', 'post_clear', 'post_remove') or reverse:
+        return
+
+    forget_instances(model, pk_set)
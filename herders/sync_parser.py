@@ -4,8 +4,10 @@ from django.db import transaction
 
 from .tasks import com2us_data_import, swex_sync_monster_shrine
 from .profile_parser import validate_sw_json, default_import_options, parse_rune_data, parse_rune_craft_data, parse_artifact_data, parse_artifact_craft_data
-from .models import MaterialStorage, MonsterPiece, MonsterInstance, MonsterShrineStorage, RuneInstance, ArtifactInstance
+from .models import MaterialStorage, MonsterPiece, MonsterInstance, MonsterShrineStorage, RuneInstance, ArtifactInstance, defer_build_stats, defer_statistics_update
 from bestiary.models import GameItem, Rune, Monster
+from bestiary.registry import get_registry
+from .sync_state import get_instance, forget_instances
 
 
 def sync_profile(summoner, log_data):
@@ -51,7 +53,7 @@ def _create_new_monster(unit_info, summoner):
     mon.com2us_id = com2us_id
 
     try:
-        mon.monster = Monster.objects.get(com2us_id=monster_type_id)
+        mon.monster = get_registry().get_monster(monster_type_id)
     except Monster.DoesNotExist:
         # Unable to find a matching monster in the database - either crap data or brand new monster. Don't parse it.
         return
@@ -142,13 +144,11 @@ def _sync_item(info, summoner):
     if not info:
         return
 
-    item = GameItem.objects.filter(
-        category=info['item_master_type'], 
-        com2us_id=info['item_master_id'],
-    ).first()
-
-    if not item:
+    try:
+        item = get_registry().get_item(info['item_master_type'], info['item_master_id'])
+    except GameItem.DoesNotExist:
         return
+
     MaterialStorage.objects.update_or_create(
         owner=summoner,
         item=item,
@@ -169,9 +169,9 @@ def _add_quantity_to_item(info, summoner):
     if idx is None or quantity is None or typex is None:
         return
 
-    item = GameItem.objects.filter(category=typex, com2us_id=idx).first()
-
-    if not item:
+    try:
+        item = get_registry().get_item(typex, idx)
+    except GameItem.DoesNotExist:
         return
 
     obj, created = MaterialStorage.objects.get_or_create(
@@ -191,9 +191,9 @@ def _sync_monster_piece(info, summoner):
     if not info:
         return
 
-    mon = Monster.objects.filter(com2us_id=info['item_master_id']).first()
-
-    if not mon:
+    try:
+        mon = get_registry().get_monster(info['item_master_id'])
+    except Monster.DoesNotExist:
         return
 
     obj, _ = MonsterPiece.objects.update_or_create(
@@ -446,6 +446,7 @@ def sync_storage_monster_move(summoner, log_data):
 
     # we can omit `save` method, because it's only `in_storage` boolean field
     MonsterInstance.objects.bulk_update(mons_updated, ['in_storage'])
+    forget_instances(MonsterInstance, [mon.pk for mon in mons_updated])
 
 
 def sync_convert_monster_to_shrine(summoner, log_data):
@@ -556,8 +557,7 @@ def sync_awaken_unit(summoner, log_data):
                 elif item['item_master_type'] == GameItem.CATEGORY_ESSENCE:
                     _sync_item(item, summoner)
 
-        mon = MonsterInstance.objects.filter(
-            owner=summoner, com2us_id=mon_data['unit_id']).first()
+        mon = get_instance(MonsterInstance, summoner, mon_data['unit_id'])
 
         if not mon:
             # probably not synced data
@@ -601,7 +601,7 @@ def sync_upgrade_unit(summoner, log_data):
         if not mon_data:
             mon_data = log_data['response'].get('target_unit', {})
 
-        mon = MonsterInstance.objects.filter(owner=summoner, com2us_id=mon_data['unit_id']).first()
+        mon = get_instance(MonsterInstance, summoner, mon_data['unit_id'])
 
         if not mon:
             _ = _create_new_monster(mon_data, summoner)
@@ -640,10 +640,7 @@ def sync_upgrade_unit(summoner, log_data):
 
 
 def sync_lock_unit(summoner, log_data):
-    mon = MonsterInstance.objects.filter(
-        owner=summoner,
-        com2us_id=log_data['response']['unit_id']
-    ).first()
+    mon = get_instance(MonsterInstance, summoner, log_data['response']['unit_id'])
     
     if not mon:
         return "monster"
@@ -653,10 +650,7 @@ def sync_lock_unit(summoner, log_data):
 
 
 def sync_unlock_unit(summoner, log_data):
-    mon = MonsterInstance.objects.filter(
-        owner=summoner,
-        com2us_id=log_data['response']['unit_id']
-    ).first()
+    mon = get_instance(MonsterInstance, summoner, log_data['response']['unit_id'])
 
     if not mon:
         return "monster"
@@ -693,10 +687,7 @@ def sync_upgrade_rune(summoner, log_data):
     if not rune_data:
         return
 
-    rune = RuneInstance.objects.filter(
-        owner=summoner,
-        com2us_id=rune_data['rune_id']
-    ).first()
+    rune = get_instance(RuneInstance, summoner, rune_data['rune_id'])
     if rune:
         if rune_data['upgrade_curr'] != rune.level:
             rune.level = rune_data['upgrade_curr']
@@ -710,10 +701,9 @@ def sync_upgrade_rune(summoner, log_data):
                 monster.default_build.update_stats()
                 monster.default_build.save()
     else:
-        assigned_to = MonsterInstance.objects.filter(
-            owner=summoner,
-            com2us_id=rune_data['occupied_id']
-        ).first() if rune_data['occupied_id'] != 0 else None
+        assigned_to = get_instance(
+            MonsterInstance, summoner, rune_data['occupied_id']
+        ) if rune_data['occupied_id'] != 0 else None
 
         if not assigned_to:
             return "monster"
@@ -726,7 +716,7 @@ def sync_sell_rune(summoner, log_data):
     if not rune_ids:
         return
 
-    with transaction.atomic():
+    with transaction.atomic(), defer_build_stats(), defer_statistics_update():
         runes = RuneInstance.objects.select_related('assigned_to').filter(
             owner=summoner,
             com2us_id__in=rune_ids
@@ -754,10 +744,7 @@ def sync_grind_enchant_rune(summoner, log_data):
         return
 
     with transaction.atomic():
-        rune = RuneInstance.objects.filter(
-            owner=summoner,
-            com2us_id=rune_data['rune_id']
-        ).first()
+        rune = get_instance(RuneInstance, summoner, rune_data['rune_id'])
 
         if rune:
             _change_rune_substats(rune, rune_data, summoner)
@@ -768,10 +755,9 @@ def sync_grind_enchant_rune(summoner, log_data):
                 monster.default_build.update_stats()
                 monster.default_build.save()
         else:
-            assigned_to = MonsterInstance.objects.filter(
-                owner=summoner,
-                com2us_id=rune_data['occupied_id']
-            ).first() if rune_data['occupied_id'] != 0 else None
+            assigned_to = get_instance(
+                MonsterInstance, summoner, rune_data['occupied_id']
+            ) if rune_data['occupied_id'] != 0 else None
 
             _create_new_rune(rune_data, summoner, assigned_to)
 
@@ -791,10 +777,7 @@ def sync_reapp_rune(summoner, log_data):
 
     rune_data = log_data['response'].get('rune', {})
 
-    rune = RuneInstance.objects.filter(
-        owner=summoner,
-        com2us_id=rune_data['rune_id']
-    ).first()
+    rune = get_instance(RuneInstance, summoner, rune_data['rune_id'])
 
     if rune:
         _change_rune_substats(rune, rune_data, summoner)
@@ -805,10 +788,9 @@ def sync_reapp_rune(summoner, log_data):
             monster.default_build.update_stats()
             monster.default_build.save()
     else:
-        assigned_to = MonsterInstance.objects.filter(
-            owner=summoner,
-            com2us_id=rune_data['occupied_id']
-        ).first() if rune_data['occupied_id'] != 0 else None
+        assigned_to = get_instance(
+            MonsterInstance, summoner, rune_data['occupied_id']
+        ) if rune_data['occupied_id'] != 0 else None
 
         _create_new_rune(rune_data, summoner, assigned_to)
 
@@ -822,10 +804,7 @@ def sync_equip_rune(summoner, log_data):
         return
 
     with transaction.atomic():
-        mon = MonsterInstance.objects.filter(
-            owner=summoner,
-            com2us_id=mon_data['unit_id'],
-        ).first()
+        mon = get_instance(MonsterInstance, summoner, mon_data['unit_id'])
 
         if not mon:
             return "monster"
@@ -839,10 +818,7 @@ def sync_equip_rune(summoner, log_data):
             # mon.default_build.runes.remove(*runes_to_remove)
             runes_to_remove.delete()
 
-        rune = RuneInstance.objects.filter(
-            owner=summoner,
-            com2us_id=rune_id,
-        ).first()
+        rune = get_instance(RuneInstance, summoner, rune_id)
 
         if not rune:
             return "rune"
@@ -858,11 +834,8 @@ def sync_change_runes_in_rune_management(summoner, log_data):
     if not mon_data:
         return
 
-    with transaction.atomic():
-        mon = MonsterInstance.objects.filter(
-            owner=summoner,
-            com2us_id=mon_data['unit_id'],
-        ).first()
+    with transaction.atomic(), defer_build_stats(), defer_statistics_update():
+        mon = get_instance(MonsterInstance, summoner, mon_data['unit_id'])
         if not mon:
             return "monster"
 
@@ -898,18 +871,12 @@ def sync_unequip_rune(summoner, log_data):
         return
 
     with transaction.atomic():
-        mon = MonsterInstance.objects.filter(
-            owner=summoner,
-            com2us_id=mon_data['unit_id'],
-        ).first()
+        mon = get_instance(MonsterInstance, summoner, mon_data['unit_id'])
 
         if not mon:
             return "monster"
 
-        rune = RuneInstance.objects.filter(
-            owner=summoner,
-            com2us_id=rune_data['rune_id'],
-        ).first()
+        rune = get_instance(RuneInstance, summoner, rune_data['rune_id'])
 
         if not rune:
             return "rune"
@@ -945,10 +912,7 @@ def sync_upgrade_artifact(summoner, log_data):
     if not artifact_data:
         return
 
-    artifact = ArtifactInstance.objects.filter(
-        owner=summoner,
-        com2us_id=artifact_data['rid']
-    ).first()
+    artifact = get_instance(ArtifactInstance, summoner, artifact_data['rid'])
 
     if artifact:
         if artifact_data['level'] != artifact.level:
@@ -961,10 +925,9 @@ def sync_upgrade_artifact(summoner, log_data):
                 monster.default_build.update_stats()
                 monster.default_build.save()
     else:
-        assigned_to = MonsterInstance.objects.filter(
-            owner=summoner,
-            com2us_id=artifact_data['occupied_id']
-        ).first() if artifact_data['occupied_id'] != 0 else None
+        assigned_to = get_instance(
+            MonsterInstance, summoner, artifact_data['occupied_id']
+        ) if artifact_data['occupied_id'] != 0 else None
 
         if not assigned_to:
             return "monster"
@@ -979,7 +942,7 @@ def sync_change_artifact_assignment(summoner, log_data):
     mons_id = []
     artifacts_id = []
 
-    with transaction.atomic():
+    with transaction.atomic(), defer_build_stats(), defer_statistics_update():
         for artifact_data in log_artifacts:
             artifacts_id.append(artifact_data['rid'])
             if artifact_data['occupied_id'] > 0:
@@ -1023,7 +986,7 @@ def sync_sell_artifacts(summoner, log_data):
     if not artifact_ids:
         return
 
-    with transaction.atomic():
+    with transaction.atomic(), defer_build_stats(), defer_statistics_update():
         artifacts = ArtifactInstance.objects.select_related('assigned_to').filter(
             owner=summoner,
             com2us_id__in=artifact_ids,
@@ -1055,10 +1018,7 @@ def sync_artifact_post_enchant(summoner, log_data):
     if not artifact_data or log_data['request'].get('before_after', 1) == 1:
         return
 
-    artifact = ArtifactInstance.objects.filter(
-        owner=summoner,
-        com2us_id=artifact_data['rid'],
-    ).first()
+    artifact = get_instance(ArtifactInstance, summoner, artifact_data['rid'])
 
     if artifact:
         _change_artifact_substats(artifact, artifact_data, summoner)
@@ -1069,10 +1029,9 @@ def sync_artifact_post_enchant(summoner, log_data):
             monster.default_build.update_stats()
             monster.default_build.save()
     else:
-        assigned_to = MonsterInstance.objects.filter(
-            owner=summoner,
-            com2us_id=artifact_data['occupied_id']
-        ).first() if artifact_data['occupied_id'] != 0 else None
+        assigned_to = get_instance(
+            MonsterInstance, summoner, artifact_data['occupied_id']
+        ) if artifact_data['occupied_id'] != 0 else None
 
         if not assigned_to:
             return "monster"
@@ -1173,10 +1132,7 @@ def sync_lab_crate_reward(summoner, log_data):
 
 def sync_update_unit_exp_gained(summoner, log_data):
     for mon_data in log_data['response'].get('unit_list', []):
-        mon = MonsterInstance.objects.filter(
-            owner=summoner, 
-            com2us_id=mon_data['unit_id']
-        ).first()
+        mon = get_instance(MonsterInstance, summoner, mon_data['unit_id'])
 
         if not mon:
             _ = _create_new_monster(mon_data, summoner)
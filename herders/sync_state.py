@@ -0,0 +1,97 @@
+import threading
+from contextlib import contextmanager
+
+from .models import MonsterInstance, RuneInstance, ArtifactInstance
+from .profile_parser import _by_com2us_id
+
+# Instances shared by the sync commands of a batch, see SyncData.batch. The summoner's monsters, runes and artifacts
+# are loaded once and looked up by com2us_id. Saves and deletes replace or drop the shared instances through the
+# signals in signals.py, and changes made with queryset updates drop them, so the next lookup queries them again.
+
+PRELOADED_MODELS = [MonsterInstance, RuneInstance, ArtifactInstance]
+
+_preloaded = threading.local()
+
+
+@contextmanager
+def preload_sync_instances(summoner):
+    """
+    Share the summoner's monsters, runes and artifacts between the sync commands parsed inside the block.
+    """
+    if getattr(_preloaded, 'instances', None) is not None:
+        yield
+        return
+
+    _preloaded.owner_id = summoner.pk
+    _preloaded.instances = {
+        MonsterInstance: _by_com2us_id(MonsterInstance.objects.filter(owner=summoner).select_related('default_build')),
+        RuneInstance: _by_com2us_id(RuneInstance.objects.filter(owner=summoner)),
+        ArtifactInstance: _by_com2us_id(ArtifactInstance.objects.filter(owner=summoner)),
+    }
+    try:
+        yield
+    finally:
+        _preloaded.instances = None
+
+
+def _shared_instances(model, owner_id):
+    instances = getattr(_preloaded, 'instances', None)
+    if instances is None or model not in instances or owner_id != _preloaded.owner_id:
+        return None
+    return instances[model]
+
+
+def get_instance(model, summoner, com2us_id):
+    """
+    The summoner's instance of model with the given com2us_id, or None.
+    """
+    instances = _shared_instances(model, summoner.pk)
+    if instances is not None and com2us_id in instances:
+        return instances[com2us_id]
+
+    instance = model.objects.filter(owner=summoner, com2us_id=com2us_id).first()
+    if instances is not None and instance is not None:
+        instances[com2us_id] = instance
+    return instance
+
+
+def instance_saved(instance):
+    instances = _shared_instances(type(instance), instance.owner_id)
+    if instances is not None and instance.com2us_id is not None:
+        instances[instance.com2us_id] = instance
+
+
+def instance_deleted(instance):
+    instances = _shared_instances(type(instance), instance.owner_id)
+    if instances is None:
+        return
+
+    shared = instances.get(instance.com2us_id)
+    if shared is not None and shared.pk == instance.pk:
+        del instances[instance.com2us_id]
+
+    if isinstance(instance, MonsterInstance):
+        # Equipped runes and artifacts are unassigned by on_delete=SET_NULL without saving them
+        for model in [RuneInstance, ArtifactInstance]:
+            _forget(model, lambda obj: instance.pk in (obj.assigned_to_id, obj.rta_assigned_to_id))
+
+
+def forget_instances(model, pks=None):
+    """
+    Drop shared instances changed without saving them, all of them if pks is None.
+    """
+    if pks is None:
+        _forget(model, lambda obj: True)
+    else:
+        pks = set(pks)
+        _forget(model, lambda obj: obj.pk in pks)
+
+
+def _forget(model, predicate):
+    instances = getattr(_preloaded, 'instances', None)
+    if instances is None or model not in instances:
+        return
+
+    for com2us_id, obj in list(instances[model].items()):
+        if predicate(obj):
+            del instances[model][com2us_id]
@@ -1,18 +1,47 @@
-from celery import shared_task, current_task, states
+import os
+
+from celery import shared_task, current_task
 from django.core.exceptions import ValidationError
 from django.core.mail import mail_admins
 from django.db import transaction, IntegrityError
-from django.db.models.signals import post_save
 
-from .models import Summoner, MaterialStorage, MonsterShrineStorage, MonsterInstance, MonsterPiece, RuneInstance, RuneCraftInstance, BuildingInstance, ArtifactCraftInstance, ArtifactInstance
-from .profile_parser import parse_sw_json
-from .signals import update_profile_date
+from . import bulk_import
+from .import_progress import ImportProgress
+from .models import defer_build_stats, defer_profile_touch, defer_statistics_update, Summoner, SummonerStatistics, MaterialStorage, MonsterShrineStorage, MonsterInstance, MonsterPiece, RuneInstance, RuneCraftInstance, BuildingInstance, ArtifactCraftInstance, ArtifactInstance
+from .profile_parser import ImportContext, parse_sw_json
+from .profile_stream import ProfileStream
 
 from bestiary.models import GameItem, Monster
 
 
 @shared_task
 def com2us_data_import(data, user_id, import_options):
+    # Update the profile date once instead of after every imported object
+    with defer_profile_touch():
+        return _import_profile(data, user_id, import_options)
+
+
+@shared_task
+def com2us_stream_import(path, user_id, import_options):
+    # Import of an export saved by save_profile_upload(), read from the file in batches instead of all at once
+    try:
+        stream = ProfileStream(path)
+        with defer_profile_touch():
+            return _import_profile(stream.data, user_id, import_options, stream)
+    finally:
+        os.remove(path)
+
+
+def _parse_batches(stream, section, summoner, import_options, context):
+    # Batches of a streamed export section, parsed one at a time
+    if stream is None:
+        return
+
+    for data in stream.batches(section):
+        yield parse_sw_json(data, summoner, import_options, context)
+
+
+def _import_profile(data, user_id, import_options, stream=None):
     summoner = Summoner.objects.get(pk=user_id)
     imported_monsters = []
     imported_runes = []
@@ -20,41 +49,27 @@ def com2us_data_import(data, user_id, import_options):
     imported_artifacts = []
     imported_artifact_crafts = []
     imported_pieces = []
-
-    if not current_task.request.called_directly:
-        current_task.update_state(state=states.STARTED, meta={
-                                  'step': 'preprocessing'})
-
-    # Import the new objects
-    with transaction.atomic():
-        if import_options['clear_profile']:
-            RuneInstance.objects.filter(owner=summoner).delete()
-            RuneCraftInstance.objects.filter(owner=summoner).delete()
-            ArtifactInstance.objects.filter(owner=summoner).delete()
-            ArtifactCraftInstance.objects.filter(owner=summoner).delete()
-            MonsterInstance.objects.filter(owner=summoner).delete()
-            MonsterPiece.objects.filter(owner=summoner).delete()
-            MaterialStorage.objects.filter(owner=summoner).delete()
-            MonsterShrineStorage.objects.filter(owner=summoner).delete()
-
-    results = parse_sw_json(data, summoner, import_options)
-
-    if not current_task.request.called_directly:
-        current_task.update_state(
-            state=states.STARTED, meta={'step': 'summoner'})
-
-    # Disconnect summoner profile last update post-save signal to avoid mass spamming updates
-    post_save.disconnect(update_profile_date, sender=MonsterInstance)
-    post_save.disconnect(update_profile_date, sender=MonsterPiece)
-    post_save.disconnect(update_profile_date, sender=RuneInstance)
-    post_save.disconnect(update_profile_date, sender=RuneCraftInstance)
-    post_save.disconnect(update_profile_date, sender=ArtifactInstance)
-    post_save.disconnect(update_profile_date, sender=ArtifactCraftInstance)
-    post_save.disconnect(update_profile_date, sender=MaterialStorage)
-    post_save.disconnect(update_profile_date, sender=MonsterShrineStorage)
-    post_save.disconnect(update_profile_date, sender=BuildingInstance)
-
-    with transaction.atomic():
+    progress = ImportProgress(None if current_task.request.called_directly else current_task)
+
+    with progress.stage('preprocessing') as stage:
+        # Import the new objects
+        with transaction.atomic(), defer_statistics_update():
+            if import_options['clear_profile']:
+                RuneInstance.objects.filter(owner=summoner).delete()
+                RuneCraftInstance.objects.filter(owner=summoner).delete()
+                ArtifactInstance.objects.filter(owner=summoner).delete()
+                ArtifactCraftInstance.objects.filter(owner=summoner).delete()
+                MonsterInstance.objects.filter(owner=summoner).delete()
+                MonsterPiece.objects.filter(owner=summoner).delete()
+                MaterialStorage.objects.filter(owner=summoner).delete()
+                MonsterShrineStorage.objects.filter(owner=summoner).delete()
+
+        context = ImportContext(summoner)
+        results = parse_sw_json(data, summoner, import_options, context)
+        stage['items'] = len(results['monsters']) + len(results['runes']) + len(results['artifacts'])
+
+    storage_count = len(results['inventory']) + len(results['monster_shrine']) + len(results['buildings'])
+    with progress.stage('storage', storage_count), transaction.atomic():
         # Update summoner and inventory
         if results['wizard_id']:
             summoner.com2us_id = results['wizard_id']
@@ -128,38 +143,41 @@ def com2us_data_import(data, user_id, import_options):
         BuildingInstance.objects.filter(owner=summoner).exclude(
             pk__in=results['buildings'].keys()).update(level=0)
 
-    if not current_task.request.called_directly:
-        current_task.update_state(state=states.STARTED, meta={'step': 'runes'})
-
-    with transaction.atomic():
+    with progress.stage('runes', len(results['runes'])) as stage, transaction.atomic():
         # Save imported runes
-        for rune in results['runes'].values():
-            rune.save()
-            imported_runes.append(rune.pk)
+        bulk_import.save_runes(list(results['runes'].values()))
+        imported_runes.extend(results['runes'].keys())
 
-    if not current_task.request.called_directly:
-        current_task.update_state(
-            state=states.STARTED, meta={'step': 'artifacts'})
+        for batch in _parse_batches(stream, 'runes', summoner, import_options, context):
+            bulk_import.save_runes(list(batch['runes'].values()))
+            imported_runes.extend(batch['runes'].keys())
+            stage['items'] += len(batch['runes'])
 
-    with transaction.atomic():
+    with progress.stage('artifacts', len(results['artifacts'])) as stage, transaction.atomic():
         # Save imported artifacts
-        for artifact in results['artifacts'].values():
-            artifact.save()
-            imported_artifacts.append(artifact.pk)
-
-    if not current_task.request.called_directly:
-        current_task.update_state(
-            state=states.STARTED, meta={'step': 'monsters'})
-
-    with transaction.atomic():
-        # Save the imported monsters
-        for mon in results['monsters'].values():
-            mon['obj'].save()
-            mon['obj'].default_build.runes.set(mon['runes'], clear=True)
-            mon['obj'].default_build.artifacts.set(mon['artifacts'], clear=True)
-            mon['obj'].rta_build.runes.clear()
-            mon['obj'].rta_build.artifacts.clear()
-            imported_monsters.append(mon['obj'].pk)
+        bulk_import.save_artifacts(list(results['artifacts'].values()))
+        imported_artifacts.extend(results['artifacts'].keys())
+
+        for batch in _parse_batches(stream, 'artifacts', summoner, import_options, context):
+            bulk_import.save_artifacts(list(batch['artifacts'].values()))
+            imported_artifacts.extend(batch['artifacts'].keys())
+            stage['items'] += len(batch['artifacts'])
+
+    monster_count = len(results['monsters']) + len(results['monster_pieces'])
+    with progress.stage('monsters', monster_count) as stage, transaction.atomic():
+        # Save the imported monsters along with their equipped runes and artifacts
+        bulk_import.save_monsters(list(results['monsters'].values()))
+        imported_monsters.extend(results['monsters'].keys())
+
+        for batch in _parse_batches(stream, 'unit_list', summoner, import_options, context):
+            # Equipped runes and artifacts of streamed monsters are parsed with them
+            bulk_import.save_runes(list(batch['runes'].values()))
+            bulk_import.save_artifacts(list(batch['artifacts'].values()))
+            bulk_import.save_monsters(list(batch['monsters'].values()))
+            imported_runes.extend(batch['runes'].keys())
+            imported_artifacts.extend(batch['artifacts'].keys())
+            imported_monsters.extend(batch['monsters'].keys())
+            stage['items'] += len(batch['monsters'])
 
         # Update saved monster pieces
         for piece in results['monster_pieces']:
@@ -171,33 +189,22 @@ def com2us_data_import(data, user_id, import_options):
 
             imported_pieces.append(piece['obj'].pk)
 
-    if not current_task.request.called_directly:
-        current_task.update_state(state=states.STARTED, meta={
-                                  'step': 'rune_crafts'})
-
-    with transaction.atomic():
+    with progress.stage('crafts', len(results['rune_crafts'])), transaction.atomic():
         # Save imported rune crafts
         for craft in results['rune_crafts'].values():
             if craft['new']:
                 craft['obj'].save()
             imported_crafts.append(craft['obj'].pk)
 
-    if not current_task.request.called_directly:
-        current_task.update_state(state=states.STARTED, meta={
-                                  'step': 'artifact_crafts'})
-
-    with transaction.atomic():
+    with progress.stage('artifact_crafts', len(results['artifact_crafts'])), transaction.atomic():
         # Save imported artifact crafts
         for craft in results['artifact_crafts'].values():
             if craft['new']:
                 craft['obj'].save()
             imported_artifact_crafts.append(craft['obj'].pk)
 
-    if not current_task.request.called_directly:
-        current_task.update_state(state=states.STARTED, meta={
-                                  'step': 'rta_builds'})
-
-    with transaction.atomic():
+    rta_count = len(results['rta_assignments']) + len(results['rta_assignments_artifacts'])
+    with progress.stage('rta_builds', rta_count), transaction.atomic(), defer_build_stats():
         # Set RTA rune builds assignments
         # Group by assignee first
         assignments = {}
@@ -250,8 +257,7 @@ def com2us_data_import(data, user_id, import_options):
                 # Continue with import
                 continue
 
-
-    with transaction.atomic():
+    with progress.stage('delete_missing'), transaction.atomic(), defer_statistics_update():
         # Delete objects missing from import
         if import_options['delete_missing_monsters']:
             MonsterInstance.objects.filter(owner=summoner).exclude(
@@ -269,6 +275,12 @@ def com2us_data_import(data, user_id, import_options):
             ArtifactCraftInstance.objects.filter(owner=summoner).exclude(
                 pk__in=imported_artifact_crafts).delete()
 
+    # Objects are saved in bulk or without the signals above, so update the profile date and statistics once
+    summoner.save()
+    SummonerStatistics.mark_stale([summoner.pk])
+
+    return progress.summary()
+
 
 @shared_task
 def swex_sync_monster_shrine(data, user_id):
@@ -299,7 +311,11 @@ def swex_sync_monster_shrine(data, user_id):
             )
 
     # monster shrine, remove old records if not existing anymore
-    MonsterShrineStorage.objects.filter(owner=summoner).exclude(pk__in=summoner_mon_shrine_pks).delete()
+    with defer_profile_touch():
+        MonsterShrineStorage.objects.filter(owner=summoner).exclude(pk__in=summoner_mon_shrine_pks).delete()
     MonsterShrineStorage.objects.bulk_create(summoner_new_mon_shrine)
     MonsterShrineStorage.objects.bulk_update(
         summoner_old_mon_shrine, ['quantity'])
+
+    # Saved in bulk without signals, so update the profile date once
+    summoner.save()
@@ -0,0 +1,63 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+
+from bestiary.models import Monster
+from herders import models
+from herders.comparison import get_comparison_profiles, pair
+
+User = get_user_model()
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'local'},
+})
+class ComparisonProfileTests(TestCase):
+    fixtures = ['test_summon_monsters']
+
+    def setUp(self):
+        self.summoner = models.Summoner.objects.create(user=User.objects.create(username='summoner'))
+        self.follower = models.Summoner.objects.create(user=User.objects.create(username='follower'))
+
+        for stars in [5, 6]:
+            models.MonsterInstance.objects.create(
+                owner=self.summoner,
+                monster=Monster.objects.get(com2us_id=14102),
+                stars=stars,
+                level=1,
+            )
+        models.MonsterInstance.objects.create(
+            owner=self.follower,
+            monster=Monster.objects.get(com2us_id=14202),
+            stars=1,
+            level=1,
+        )
+        self.summoner.refresh_from_db()
+        self.follower.refresh_from_db()
+
+    def test_profiles(self):
+        summoner_profile, follower_profile = get_comparison_profiles(self.summoner, self.follower)
+
+        self.assertEqual(summoner_profile['totals']['Count'], 2)
+        self.assertEqual(summoner_profile['totals']['Nat 4⭐'], 2)
+        self.assertEqual(summoner_profile['monsters']['stars'][6], 1)
+        self.assertEqual(summoner_profile['monsters']['elements']['Fire'], 2)
+
+        # Material monsters count towards the total only
+        self.assertEqual(follower_profile['totals']['Count'], 1)
+        self.assertEqual(follower_profile['monsters']['summary']['Count'], 0)
+
+        report = pair(summoner_profile['totals'], follower_profile['totals'])
+        self.assertEqual(report['Count'], {'summoner': 2, 'follower': 1})
+
+    def test_cached_until_profile_update(self):
+        get_comparison_profiles(self.summoner, self.follower)
+
+        with self.assertNumQueries(0):
+            get_comparison_profiles(self.summoner, self.follower)
+
+        models.MonsterInstance.objects.filter(owner=self.follower).delete()
+        self.follower.refresh_from_db()
+
+        _, follower_profile = get_comparison_profiles(self.summoner, self.follower)
+        self.assertEqual(follower_profile['totals']['Count'], 0)
@@ -1412,3 +1412,54 @@ class ArtifactSyncTest(BaseSyncTest):
 
         self.assertEqual(artifact.assigned_to, mon)
         self.assertEqual(mon.default_build.defense, artifact.main_stat_value)
+
+
+class BatchSyncTest(BaseSyncTest):
+    def _load(self, log_data_filename):
+        with open(f'herders/tests/game_api_data/{log_data_filename}', 'r') as f:
+            return json.load(f)['data']
+
+    def _do_batch_sync(self, commands):
+        view = api_views.SyncData.as_view({'post': 'batch'})
+        request = self.factory.post(
+            reverse('v2:sync-profile-batch'),
+            data={'data': commands},
+            format='json',
+            HTTP_AUTHORIZATION=f'Token {self.token.key}',
+        )
+        return view(request)
+
+    def test_batch_sync(self):
+        mon = models.MonsterInstance.objects.create(
+            owner=self.summoner,
+            com2us_id=10563022833,
+            monster=Monster.objects.get(com2us_id=14102),
+            stars=4,
+            level=30,
+        )
+        missing_mon = self._load('LockUnlockUnit/lock_unit.json')
+        missing_mon['response']['unit_id'] = 1
+
+        resp = self._do_batch_sync([
+            self._load('LockUnlockUnit/lock_unit.json'),
+            missing_mon,
+            {'request': {}},
+            self._load('LockUnlockUnit/unlock_unit.json'),
+        ])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([result['status'] for result in resp.data['results']], [200, 409, 400, 200])
+
+        mon.refresh_from_db()
+        self.assertFalse(mon.ignore_for_fusion)
+
+    def test_batch_sync_excludes_profile_commands(self):
+        resp = self._do_batch_sync([{
+            'request': {'command': 'HubUserLogin'},
+            'response': {'command': 'HubUserLogin', 'wizard_info': {'wizard_id': 123}},
+        }])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['results'][0]['status'], 400)
+
+    def test_batch_sync_invalid(self):
+        resp = self._do_batch_sync({'request': {}})
+        self.assertEqual(resp.status_code, 400)
@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.db import SessionStore
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from herders import models
+from herders.decorators import cache_profile_response
+
+User = get_user_model()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ProfileResponseCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='testuser')
+        self.summoner = models.Summoner.objects.create(user=self.user, public=True)
+        self.calls = 0
+
+        @cache_profile_response('view_mode')
+        def view(request, profile_name, view_mode=None):
+            self.calls += 1
+            return HttpResponse(f'render {self.calls}')
+
+        self.view = view
+
+    def _get(self, user=None, **kwargs):
+        request = RequestFactory().get('/profile/testuser/teams/list/', kwargs.pop('data', None))
+        request.user = user or AnonymousUser()
+        request.session = SessionStore()
+        return self.view(request, profile_name='testuser', **kwargs)
+
+    def test_cached_until_profile_changes(self):
+        self.assertEqual(self._get().content, b'render 1')
+        self.assertEqual(self._get().content, b'render 1')
+
+        models.TeamGroup.objects.create(owner=self.summoner, name='Arena')
+        self.assertEqual(self._get().content, b'render 2')
+
+    def test_cached_per_query_string(self):
+        self._get(data={'page': 1})
+        self._get(data={'page': 2})
+        self.assertEqual(self.calls, 2)
+
+    def test_owner_and_view_settings_not_cached(self):
+        self._get(user=self.user)
+        self._get(user=self.user)
+        self._get(view_mode='list')
+        self._get(view_mode='list')
+        self.assertEqual(self.calls, 4)
+
+
+class DeferProfileTouchTests(TestCase):
+    def setUp(self):
+        self.summoner = models.Summoner.objects.create(user=User.objects.create(username='testuser'))
+        self.last_update = self.summoner.last_update
+
+    def _last_update(self):
+        return models.Summoner.objects.values_list('last_update', flat=True).get(pk=self.summoner.pk)
+
+    def test_touched_once_on_exit(self):
+        with models.defer_profile_touch():
+            with models.defer_profile_touch():
+                group = models.TeamGroup.objects.create(owner=self.summoner, name='Arena')
+            models.TeamGroup.objects.create(owner=self.summoner, name='Guild')
+            self.assertEqual(self._last_update(), self.last_update)
+
+            # Only the group itself is saved
+            with self.assertNumQueries(1):
+                group.save()
+
+        self.assertGreater(self._last_update(), self.last_update)
+
+    def test_touched_when_block_raises(self):
+        # Stages committed before the error keep their changes, e.g. in a failed profile import
+        with self.assertRaises(RuntimeError):
+            with models.defer_profile_touch():
+                models.TeamGroup.objects.create(owner=self.summoner, name='Arena')
+                raise RuntimeError
+
+        self.assertGreater(self._last_update(), self.last_update)
+
+    def test_touched_immediately_outside_block(self):
+        models.TeamGroup.objects.create(owner=self.summoner, name='Arena')
+        self.assertGreater(self._last_update(), self.last_update)
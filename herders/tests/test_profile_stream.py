@@ -0,0 +1,66 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+
+from herders.profile_stream import ProfileStream, save_profile_upload
+
+
+class ProfileStreamTests(SimpleTestCase):
+    def setUp(self):
+        self.import_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.import_dir)
+        self.export = {
+            'command': 'HubUserLogin',
+            'wizard_info': {'wizard_id': 1},
+            'building_list': [{'building_id': 1, 'building_master_id': 25}],
+            'deco_list': [],
+            'unit_lock_list': [3],
+            'unit_list': [{'unit_id': i, 'runes': [{'rune_id': i, 'prefix_eff': [0, 0.5]}]} for i in range(7)],
+            'runes': [{'rune_id': 100 + i} for i in range(3)],
+            'artifacts': [],
+        }
+
+    def _save(self, data):
+        with override_settings(PROFILE_IMPORT_DIR=self.import_dir):
+            return save_profile_upload(SimpleUploadedFile('export.json', json.dumps(data).encode()))
+
+    def test_streamed_sections_not_loaded(self):
+        stream = ProfileStream(self._save(self.export))
+
+        self.assertEqual(stream.data['unit_list'], [])
+        self.assertEqual(stream.data['runes'], [])
+        self.assertEqual(stream.data['artifacts'], [])
+        self.assertEqual(stream.data['building_list'], self.export['building_list'])
+        self.assertEqual(stream.data['wizard_info'], {'wizard_id': 1})
+
+    def test_batches(self):
+        stream = ProfileStream(self._save(self.export), batch_size=3)
+
+        batches = list(stream.batches('unit_list'))
+        self.assertEqual([len(batch['unit_list']) for batch in batches], [3, 3, 1])
+        self.assertEqual(batches[0]['unit_list'][0], self.export['unit_list'][0])
+        self.assertEqual(batches[0]['building_list'], self.export['building_list'])
+        self.assertEqual(batches[0]['unit_lock_list'], [3])
+        self.assertNotIn('runes', batches[0])
+
+        self.assertEqual([batch['runes'] for batch in stream.batches('runes')], [self.export['runes']])
+        self.assertEqual(list(stream.batches('artifacts')), [])
+
+    def test_friend_export(self):
+        stream = ProfileStream(self._save({'command': 'VisitFriend', 'friend': self.export}), batch_size=5)
+
+        self.assertEqual(stream.prefix, 'friend.')
+        self.assertEqual(stream.data['friend']['unit_list'], [])
+        self.assertEqual([len(batch['unit_list']) for batch in stream.batches('unit_list')], [5, 2])
+
+    def test_invalid_json(self):
+        path = os.path.join(self.import_dir, 'invalid.json')
+        with open(path, 'w') as f:
+            f.write('{"unit_list": [1,')
+
+        with self.assertRaises(ValueError):
+            ProfileStream(path)
@@ -3,7 +3,7 @@ from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 
 from bestiary.models import Monster
-from herders import models
+from herders import bulk_import, models
 
 User = get_user_model()
 
@@ -214,3 +214,77 @@ class RuneBuildModelTests(TestCase):
         artifact.refresh_from_db()
         self.assertEqual(artifact.assigned_to, self.monster)
         self.assertEqual(artifact.rta_assigned_to, None)
+
+    def test_bulk_import_matches_build_signals(self):
+        rune = models.RuneInstance(
+            owner=self.summoner,
+            type=models.RuneInstance.TYPE_ENERGY,
+            slot=1,
+            main_stat=models.RuneInstance.STAT_ATK,
+            stars=1,
+            level=0,
+            quality=models.RuneInstance.QUALITY_MAGIC,
+            innate_stat=models.RuneInstance.STAT_HP,
+            innate_stat_value=4,
+            substats=[models.RuneInstance.STAT_DEF],
+            substat_values=[4],
+            substats_enchanted=[False],
+            substats_grind_value=[3],
+        )
+        bulk_import.save_runes([rune])
+        bulk_import.save_monsters([{'obj': self.monster, 'runes': [rune], 'artifacts': []}])
+
+        rune.refresh_from_db()
+        self.rune_build.refresh_from_db()
+        self.assertEqual(rune.assigned_to, self.monster)
+        self.assertEqual(list(self.rune_build.runes.all()), [rune])
+        self.assertEqual(self.rune_build.attack, 3)
+        self.assertEqual(self.rune_build.hp, 4)
+        self.assertEqual(self.rune_build.defense, 7)
+
+        # Re-importing the monster without runes empties the build
+        bulk_import.save_monsters([{'obj': self.monster, 'runes': [], 'artifacts': []}])
+
+        rune.refresh_from_db()
+        self.rune_build.refresh_from_db()
+        self.assertIsNone(rune.assigned_to)
+        self.assertEqual(self.rune_build.runes.count(), 0)
+        self.assertEqual(self.rune_build.attack, 0)
+
+    def test_deferred_stats_recomputed_on_exit(self):
+        rune = models.RuneInstance.objects.create(
+            owner=self.summoner,
+            type=models.RuneInstance.TYPE_ENERGY,
+            slot=1,
+            main_stat=models.RuneInstance.STAT_ATK,
+            stars=1,
+            level=0,
+            quality=models.RuneInstance.QUALITY_MAGIC,
+        )
+
+        with models.defer_build_stats():
+            self.rune_build.runes.add(rune)
+            self.rune_build.refresh_from_db()
+            self.assertEqual(self.rune_build.attack, 0)
+
+        self.assertEqual(self.rune_build.attack, 3)
+        self.rune_build.refresh_from_db()
+        self.assertEqual(self.rune_build.attack, 3)
+
+    def test_recompute_stats_by_id(self):
+        rune = models.RuneInstance.objects.create(
+            owner=self.summoner,
+            type=models.RuneInstance.TYPE_ENERGY,
+            slot=1,
+            main_stat=models.RuneInstance.STAT_ATK,
+            stars=1,
+            level=0,
+            quality=models.RuneInstance.QUALITY_MAGIC,
+        )
+        self.rune_build.runes.add(rune)
+        models.RuneBuild.objects.filter(pk=self.rune_build.pk).update(attack=0)
+
+        models.RuneBuild.recompute_stats([self.rune_build.pk, self.rta_build.pk])
+
+        self.rune_build.refresh_from_db()
+        self.assertEqual(self.rune_build.attack, 3)
@@ -0,0 +1,66 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+
+from herders import models
+
+User = get_user_model()
+
+
+class SummonerStatisticsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='testuser')
+        self.summoner = models.Summoner.objects.create(user=self.user)
+
+    def _create_rune(self, **kwargs):
+        defaults = {
+            'owner': self.summoner,
+            'type': models.RuneInstance.TYPE_ENERGY,
+            'slot': 1,
+            'main_stat': models.RuneInstance.STAT_ATK,
+            'stars': 6,
+            'level': 0,
+            'innate_stat': None,
+            'substats': [models.RuneInstance.STAT_DEF],
+            'substat_values': [4],
+            'substats_enchanted': [False],
+            'substats_grind_value': [0],
+        }
+        defaults.update(kwargs)
+        return models.RuneInstance.objects.create(**defaults)
+
+    def test_histograms(self):
+        self._create_rune()
+        self._create_rune(type=models.RuneInstance.TYPE_FATAL, slot=2, innate_stat=models.RuneInstance.STAT_SPD, innate_stat_value=4)
+
+        stats = models.SummonerStatistics.get_for_summoner(self.summoner)
+        histograms = stats.histograms(models.RuneInstance)
+
+        self.assertEqual(stats.summary(models.RuneInstance)[0], 2)
+        self.assertEqual(dict(histograms['sets']), {'Energy': 1, 'Fatal': 1})
+        self.assertEqual(dict(histograms['slot']), {1: 1, 2: 1})
+        self.assertEqual(dict(histograms['innate_stat']), {None: 1, 'SPD': 1})
+        self.assertEqual(dict(histograms['substats']), {'DEF': 2})
+
+    def test_rebuilt_after_rune_changes(self):
+        rune = self._create_rune()
+        stats = models.SummonerStatistics.get_for_summoner(self.summoner)
+        self.assertEqual(stats.summary(models.RuneInstance)[0], 1)
+
+        rune.delete()
+        stats.refresh_from_db()
+        self.assertTrue(stats.stale)
+
+        stats = models.SummonerStatistics.get_for_summoner(self.summoner)
+        self.assertEqual(stats.summary(models.RuneInstance)[0], 0)
+        self.assertEqual(stats.histograms(models.RuneInstance)['sets'], [])
+
+    def test_deferred_update(self):
+        stats = models.SummonerStatistics.get_for_summoner(self.summoner)
+
+        with models.defer_statistics_update():
+            self._create_rune()
+            stats.refresh_from_db()
+            self.assertFalse(stats.stale)
+
+        stats.refresh_from_db()
+        self.assertTrue(stats.stale)
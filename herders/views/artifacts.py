@@ -8,7 +8,7 @@ from django.template import loader
 from django.template.context_processors import csrf
 from django.urls import reverse
 
-from herders.decorators import username_case_redirect
+from herders.decorators import cache_profile_response, username_case_redirect
 from herders.filters import ArtifactInstanceFilter
 from herders.forms import FilterArtifactForm, ArtifactInstanceForm, AssignArtifactForm
 from herders.models import Summoner, MonsterInstance, ArtifactInstance, ArtifactCraftInstance
@@ -41,6 +41,7 @@ def artifacts(request, profile_name):
 
 
 @username_case_redirect
+@cache_profile_response('artifact_inventory_box_method')
 def inventory(request, profile_name, box_grouping=None):
     # If we passed in view mode or sort method, set the session variable and redirect back to base profile URL
     if box_grouping:
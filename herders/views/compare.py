@@ -7,17 +7,19 @@ from django.utils.text import slugify
 from django.http import HttpResponseBadRequest
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.db.models import prefetch_related_objects
 from django.db.models.aggregates import Avg, Count, Max, Min, StdDev, Sum
 
-from bestiary.models import Rune, RuneCraft, Artifact, Monster, Building, Fusion
+from bestiary.models import Rune, RuneCraft, Artifact
 
 from herders.aggregations import Median, Perc25, Perc75
+from herders.comparison import get_comparison_profiles, pair
 from herders.decorators import username_case_redirect
-from herders.models import BuildingInstance, MonsterShrineStorage, RuneInstance, RuneCraftInstance, ArtifactInstance, ArtifactCraftInstance, Summoner, MonsterInstance
+from herders.models import RuneInstance, RuneCraftInstance, ArtifactInstance, ArtifactCraftInstance, Summoner, SummonerStatistics, RuneBuild
 from herders.forms import CompareMonstersWithFollowerForm
 
 
-def _get_efficiency_statistics(model, owner, field="efficiency", count=False, worth=False, worth_field='value'):
+def _get_efficiency_statistics(model, owner, field="efficiency", count=False, worth=False, worth_field='value', statistics=None):
     eff_values = {}
     eff_map = {
         "efficiency__avg": "Efficiency (Average)",
@@ -44,7 +46,13 @@ def _get_efficiency_statistics(model, owner, field="efficiency", count=False, wo
     if count:
         aggregations.insert(0, Count(field))
 
-    efficiencies = model.objects.filter(owner=owner).aggregate(*aggregations)
+    if model in (RuneInstance, ArtifactInstance) and field == 'efficiency' and worth_field == 'value':
+        statistics = statistics or SummonerStatistics.get_for_summoner(owner)
+        precomputed = statistics.efficiency_statistics(model)
+        efficiencies = {agg.default_alias: precomputed[agg.default_alias] for agg in aggregations}
+    else:
+        efficiencies = model.objects.filter(owner=owner).aggregate(*aggregations)
+
     for eff_key, eff_val in efficiencies.items():
         eff_values[eff_map[eff_key]] = round(eff_val or 0, 2)
 
@@ -72,99 +80,34 @@ def _find_comparison_winner(data):
                 "Dictionary depth doesn't end with `summoner`, `follower` dictionary.")
 
 
-def _compare_summary(summoner, follower):
-    report = {
-        "runes": {},
-        "artifacts": {},
-        "monsters": {
-            'Count': {
-                "summoner": MonsterInstance.objects.filter(owner=summoner).count() + (MonsterShrineStorage.objects.filter(owner=summoner).aggregate(count=Sum('quantity'))['count'] or 0),
-                "follower": MonsterInstance.objects.filter(owner=follower).count() + (MonsterShrineStorage.objects.filter(owner=follower).aggregate(count=Sum('quantity'))['count'] or 0),
-            },
-            'Nat 5⭐': {
-                "summoner": MonsterInstance.objects.filter(owner=summoner, monster__natural_stars=5).count(),
-                "follower": MonsterInstance.objects.filter(owner=follower, monster__natural_stars=5).count(),
-            },
-            'Nat 4⭐': {
-                "summoner": MonsterInstance.objects.filter(owner=summoner, monster__natural_stars=4).count(),
-                "follower": MonsterInstance.objects.filter(owner=follower, monster__natural_stars=4).count(),
-            },
-        },
-        "buildings": {
-            'Remaining Towers Cost': {"summoner": 0, "follower": 0},
-            'Remaining Flags Cost': {"summoner": 0, "follower": 0},
-        }
-    }
-    runes_summoner_eff = _get_efficiency_statistics(
-        RuneInstance, summoner, count=True, worth=True)
-    runes_follower_eff = _get_efficiency_statistics(
-        RuneInstance, follower, count=True, worth=True)
-    for key in runes_summoner_eff.keys():
-        report["runes"][key] = {
-            "summoner": runes_summoner_eff[key],
-            "follower": runes_follower_eff[key],
-        }
+def _reverse_comparison_winner(record):
+    if record["winner"] == "summoner":
+        record["winner"] = "follower"
+    elif record["winner"] == "follower":
+        record["winner"] = "summoner"
 
-    artifacts_summoner_eff = _get_efficiency_statistics(
-        ArtifactInstance, summoner, count=True)
-    artifacts_follower_eff = _get_efficiency_statistics(
-        ArtifactInstance, follower, count=True)
-    for key in artifacts_summoner_eff.keys():
-        report["artifacts"][key] = {
-            "summoner": artifacts_summoner_eff[key],
-            "follower": artifacts_follower_eff[key],
-        }
 
-    owners = [summoner, follower]
-    monsters_shrine = MonsterShrineStorage.objects.select_related('owner', 'item').filter(
-        owner__in=owners, item__natural_stars__gte=4).order_by('owner')
-    for owner, iter_ in itertools.groupby(monsters_shrine, key=attrgetter('owner')):
-        owner_str = "summoner"
-        if owner == follower:
-            owner_str = "follower"
-        monsters_owner = list(iter_)
-        for monster in monsters_owner:
-            report['monsters'][f'Nat {monster.item.natural_stars}⭐'][owner_str] += monster.quantity or 0
-
-    buildings = BuildingInstance.objects.select_related(
-        'owner', 'building').filter(owner__in=owners).order_by('owner')
-    buildings_owners = {
-        "summoner": [],
-        "follower": [],
+def _compare_summary(summoner, follower):
+    summoner_profile, follower_profile = get_comparison_profiles(summoner, follower)
+    summoner_stats, follower_stats = SummonerStatistics.get_for_summoners([summoner, follower])
+    report = {
+        "runes": pair(
+            _get_efficiency_statistics(RuneInstance, summoner, count=True, worth=True, statistics=summoner_stats),
+            _get_efficiency_statistics(RuneInstance, follower, count=True, worth=True, statistics=follower_stats),
+        ),
+        "artifacts": pair(
+            _get_efficiency_statistics(ArtifactInstance, summoner, count=True, statistics=summoner_stats),
+            _get_efficiency_statistics(ArtifactInstance, follower, count=True, statistics=follower_stats),
+        ),
+        "monsters": pair(summoner_profile['totals'], follower_profile['totals']),
+        "buildings": pair(summoner_profile['buildings']['summary'], follower_profile['buildings']['summary']),
     }
-    for owner, iter_ in itertools.groupby(buildings, key=attrgetter('owner')):
-        owner_str = "summoner"
-        if owner == follower:
-            owner_str = "follower"
-        buildings_owner = list(iter_)
-        for building in buildings_owner:
-            buildings_owners[owner_str].append(building.building.name)
-            remaining_cost = building.remaining_upgrade_cost()
-            if building.building.area == Building.AREA_GENERAL:
-                report['buildings']['Remaining Towers Cost'][owner_str] += remaining_cost or 0
-            else:
-                report['buildings']['Remaining Flags Cost'][owner_str] += remaining_cost or 0
-
-    for building in Building.objects.all().order_by('area', 'name'):
-        for owner in ["summoner", "follower"]:
-            if building.name not in buildings_owners[owner]:
-                upgrade_cost = sum(building.upgrade_cost)
-                if building.area == Building.AREA_GENERAL:
-                    report['buildings']['Remaining Towers Cost'][owner] += upgrade_cost or 0
-                else:
-                    report['buildings']['Remaining Flags Cost'][owner] += upgrade_cost or 0
 
     _find_comparison_winner(report)
 
     # reverse comparison winner
-    if report['buildings']['Remaining Towers Cost']["winner"] == "summoner":
-        report['buildings']['Remaining Towers Cost']["winner"] = "follower"
-    elif report['buildings']['Remaining Towers Cost']["winner"] == "follower":
-        report['buildings']['Remaining Towers Cost']["winner"] = "summoner"
-    if report['buildings']['Remaining Flags Cost']["winner"] == "summoner":
-        report['buildings']['Remaining Flags Cost']["winner"] = "follower"
-    elif report['buildings']['Remaining Flags Cost']["winner"] == "follower":
-        report['buildings']['Remaining Flags Cost']["winner"] = "summoner"
+    _reverse_comparison_winner(report['buildings']['Remaining Towers Cost'])
+    _reverse_comparison_winner(report['buildings']['Remaining Flags Cost'])
 
     return report
 
@@ -238,37 +181,17 @@ def _compare_runes(summoner, follower):
         'substats': copy.deepcopy(stats),
     }
     report_runes['innate_stat'][None] = {"summoner": 0, "follower": 0}
-    owners = [summoner, follower]
-    runes = RuneInstance.objects.select_related(
-        'owner').filter(owner__in=owners).order_by('owner')
-
-    rune_substats = dict(Rune.STAT_CHOICES)
-
-    for owner, iter_ in itertools.groupby(runes, key=attrgetter('owner')):
-        owner_str = "summoner"
-        if owner == follower:
-            owner_str = "follower"
-        runes_owner = list(iter_)
-        report_runes['summary']['Count'][owner_str] = len(runes_owner)
-        for rune in runes_owner:
-            for sub_stat in rune.substats:
-                report_runes['substats'][rune_substats[sub_stat]
-                                         ][owner_str] += 1
-
-            report_runes['stars'][rune.stars][owner_str] += 1
-            report_runes['sets'][rune.get_type_display()][owner_str] += 1
-            report_runes['quality'][rune.get_quality_display()][owner_str] += 1
-            report_runes['quality_original'][rune.get_original_quality_display(
-            )][owner_str] += 1
-            report_runes['slot'][rune.slot][owner_str] += 1
-            report_runes['main_stat'][rune.get_main_stat_display()
-                                      ][owner_str] += 1
-            report_runes['innate_stat'][rune.get_innate_stat_display()
-                                        ][owner_str] += 1
-            report_runes['summary']['Worth'][owner_str] += rune.value or 0
-
-    summoner_eff = _get_efficiency_statistics(RuneInstance, summoner)
-    follower_eff = _get_efficiency_statistics(RuneInstance, follower)
+    summoner_stats, follower_stats = SummonerStatistics.get_for_summoners([summoner, follower])
+    for statistics, owner_str in ((summoner_stats, "summoner"), (follower_stats, "follower")):
+        count, worth = statistics.summary(RuneInstance)
+        report_runes['summary']['Count'][owner_str] = count
+        report_runes['summary']['Worth'][owner_str] = worth
+        for name, counts in statistics.histograms(RuneInstance).items():
+            for key, num in counts:
+                report_runes[name][key][owner_str] += num
+
+    summoner_eff = _get_efficiency_statistics(RuneInstance, summoner, statistics=summoner_stats)
+    follower_eff = _get_efficiency_statistics(RuneInstance, follower, statistics=follower_stats)
     for key in summoner_eff.keys():
         report_runes["summary"][key] = {
             "summoner": summoner_eff[key],
@@ -417,30 +340,15 @@ def _compare_artifacts(summoner, follower):
         'main_stat': {stat[1]: {"summoner": 0, "follower": 0} for stat in sorted(Artifact.MAIN_STAT_CHOICES, key=lambda x: x[1])},
         'substats': {effect[1]: {"summoner": 0, "follower": 0} for effect in sorted(Artifact.EFFECT_CHOICES, key=lambda x: x[1])},
     }
-    owners = [summoner, follower]
-    artifacts = ArtifactInstance.objects.select_related(
-        'owner').filter(owner__in=owners).order_by('owner')
-
-    artifact_substats = dict(Artifact.EFFECT_CHOICES)
-
-    for owner, iter_ in itertools.groupby(artifacts, key=attrgetter('owner')):
-        owner_str = "summoner"
-        if owner == follower:
-            owner_str = "follower"
-        artifacts_owner = list(iter_)
-        report['summary']['Count'][owner_str] = len(artifacts_owner)
-        for artifact in artifacts_owner:
-            for sub_stat in artifact.effects:
-                report['substats'][artifact_substats[sub_stat]][owner_str] += 1
-
-            report['quality'][artifact.get_quality_display()][owner_str] += 1
-            report['quality_original'][artifact.get_original_quality_display()
-                                       ][owner_str] += 1
-            report['slot'][artifact.get_precise_slot_display()][owner_str] += 1
-            report['main_stat'][artifact.get_main_stat_display()][owner_str] += 1
-
-    summoner_eff = _get_efficiency_statistics(ArtifactInstance, summoner)
-    follower_eff = _get_efficiency_statistics(ArtifactInstance, follower)
+    summoner_stats, follower_stats = SummonerStatistics.get_for_summoners([summoner, follower])
+    for statistics, owner_str in ((summoner_stats, "summoner"), (follower_stats, "follower")):
+        report['summary']['Count'][owner_str], _ = statistics.summary(ArtifactInstance)
+        for name, counts in statistics.histograms(ArtifactInstance).items():
+            for key, num in counts:
+                report[name][key][owner_str] += num
+
+    summoner_eff = _get_efficiency_statistics(ArtifactInstance, summoner, statistics=summoner_stats)
+    follower_eff = _get_efficiency_statistics(ArtifactInstance, follower, statistics=follower_stats)
     for key in summoner_eff.keys():
         report["summary"][key] = {
             "summoner": summoner_eff[key],
@@ -553,105 +461,8 @@ def artifact_crafts(request, profile_name, follow_username):
 
 
 def _compare_monsters(summoner, follower):
-    owners = [summoner, follower]
-    report = {
-        'summary': {
-            'Count': {"summoner": 0, "follower": 0},
-            'In Storage': {"summoner": 0, "follower": 0},
-            'Outside Storage': {"summoner": 0, "follower": 0},
-            'Max Skillups': {"summoner": 0, "follower": 0},
-            'Fusion Food': {"summoner": 0, "follower": 0},
-            'In Monster Shrine Storage': {"summoner": 0, "follower": 0},
-        },
-        'stars': {
-            1: {"summoner": 0, "follower": 0},
-            2: {"summoner": 0, "follower": 0},
-            3: {"summoner": 0, "follower": 0},
-            4: {"summoner": 0, "follower": 0},
-            5: {"summoner": 0, "follower": 0},
-            6: {"summoner": 0, "follower": 0},
-        },
-        'natural_stars': {
-            i: {
-                "fusion": {
-                    "elemental": {"summoner": 0, "follower": 0},
-                    "ld": {"summoner": 0, "follower": 0},
-                },
-                "nonfusion": {
-                    "elemental": {"summoner": 0, "follower": 0},
-                    "ld": {"summoner": 0, "follower": 0},
-                },
-            } for i in range(1, 6)},
-        'elements': {element[1]: {"summoner": 0, "follower": 0} for element in Monster.NORMAL_ELEMENT_CHOICES},
-        'archetypes': {archetype[1]: {"summoner": 0, "follower": 0} for archetype in Monster.ARCHETYPE_CHOICES},
-    }
-    monsters = MonsterInstance.objects.select_related('owner', 'monster', 'monster__awakens_to', 'monster__awakens_from', 'monster__awakens_from__awakens_from',
-                                                      'monster__awakens_to__awakens_to').prefetch_related('monster__skills').filter(owner__in=owners).order_by('owner')
-    monsters_fusion = [
-        f'{mon.product.family_id}-{mon.product.element}' for mon in Fusion.objects.select_related('product').only('product')]
-    free_nat5_families = [19200, 23000, 24100, 24600, 1000100, 1000200]
-
-    for owner, iter_ in itertools.groupby(monsters, key=attrgetter('owner')):
-        owner_str = "summoner"
-        if owner == follower:
-            owner_str = "follower"
-        monsters_owner = list(iter_)
-        report['summary']['Count'][owner_str] = len(monsters_owner)
-        for monster in monsters_owner:
-            if monster.monster.archetype == Monster.ARCHETYPE_MATERIAL:
-                report['summary']['Count'][owner_str] -= 1
-                continue
-
-            if monster.in_storage:
-                report['summary']['In Storage'][owner_str] += 1
-            else:
-                report['summary']['Outside Storage'][owner_str] += 1
-            if monster.skill_ups_to_max() == 0:
-                report['summary']['Max Skillups'][owner_str] += 1
-            report['stars'][monster.stars][owner_str] += 1
-
-            mon_el = "elemental" if monster.monster.element in [
-                Monster.ELEMENT_WATER, Monster.ELEMENT_FIRE, Monster.ELEMENT_WIND] else "ld"
-            if f'{monster.monster.family_id}-{monster.monster.element}' in monsters_fusion or monster.monster.family_id in free_nat5_families:
-                report['natural_stars'][monster.monster.natural_stars]['fusion'][mon_el][owner_str] += 1
-            else:
-                report['natural_stars'][monster.monster.natural_stars]['nonfusion'][mon_el][owner_str] += 1
-
-            report['elements'][monster.monster.get_element_display()
-                               ][owner_str] += 1
-            report['archetypes'][monster.monster.get_archetype_display()
-                                 ][owner_str] += 1
-
-            if monster.monster.fusion_food:
-                report['summary']['Fusion Food'][owner_str] += 1
-
-    monsters_shrine = MonsterShrineStorage.objects.select_related(
-        'owner', 'item').filter(owner__in=owners).order_by('owner')
-
-    for owner, iter_ in itertools.groupby(monsters_shrine, key=attrgetter('owner')):
-        owner_str = "summoner"
-        if owner == follower:
-            owner_str = "follower"
-        monsters_owner = list(iter_)
-        for monster in monsters_owner:
-            if monster.item.archetype == Monster.ARCHETYPE_MATERIAL:
-                continue
-
-            report['summary']['Count'][owner_str] += monster.quantity
-            report['summary']['In Monster Shrine Storage'][owner_str] += monster.quantity or 0
-            report['stars'][monster.item.natural_stars][owner_str] += monster.quantity or 0
-
-            mon_el = "elemental" if monster.item.element in [
-                Monster.ELEMENT_WATER, Monster.ELEMENT_FIRE, Monster.ELEMENT_WIND] else "ld"
-            if f'{monster.item.family_id}-{monster.item.element}' in monsters_fusion or monster.item.family_id in free_nat5_families:
-                report['natural_stars'][monster.item.natural_stars]['fusion'][mon_el][owner_str] += monster.quantity
-            else:
-                report['natural_stars'][monster.item.natural_stars]['nonfusion'][mon_el][owner_str] += monster.quantity
-
-            report['elements'][monster.item.get_element_display(
-            )][owner_str] += monster.quantity or 0
-            report['archetypes'][monster.item.get_archetype_display()
-                                 ][owner_str] += monster.quantity or 0
+    summoner_profile, follower_profile = get_comparison_profiles(summoner, follower)
+    report = pair(summoner_profile['monsters'], follower_profile['monsters'])
 
     _find_comparison_winner(report)
 
@@ -693,62 +504,17 @@ def monsters(request, profile_name, follow_username):
 
 
 def _compare_buildings(summoner, follower):
-    owners = [summoner, follower]
-    building_objs = Building.objects.all().order_by('area', 'name')
-    building_choices = {building.name: {"summoner": 0,
-                                        "follower": 0} for building in building_objs}
-    report = {
-        'summary': {
-            'Remaining Towers Cost': {"summoner": 0, "follower": 0},
-            'Remaining Flags Cost': {"summoner": 0, "follower": 0},
-        },
-        'levels': copy.deepcopy(building_choices),
-        'remaining_costs': copy.deepcopy(building_choices),
-    }
-    buildings = BuildingInstance.objects.select_related(
-        'owner', 'building').filter(owner__in=owners).order_by('owner')
-
-    for owner, iter_ in itertools.groupby(buildings, key=attrgetter('owner')):
-        owner_str = "summoner"
-        if owner == follower:
-            owner_str = "follower"
-        buildings_owner = list(iter_)
-        for building in buildings_owner:
-            remaining_cost = building.remaining_upgrade_cost()
-            if building.building.area == Building.AREA_GENERAL:
-                report['summary']['Remaining Towers Cost'][owner_str] += remaining_cost or 0
-            else:
-                report['summary']['Remaining Flags Cost'][owner_str] += remaining_cost or 0
-            report['remaining_costs'][building.building.name][owner_str] = remaining_cost
-            report['levels'][building.building.name][owner_str] = building.level
-
-    for building in building_objs:
-        for owner in ["summoner", "follower"]:
-            if report['levels'][building.name][owner] == 0 and report['remaining_costs'][building.name][owner] == 0:
-                upgrade_cost = sum(building.upgrade_cost)
-                report['remaining_costs'][building.name][owner] = upgrade_cost
-                if building.area == Building.AREA_GENERAL:
-                    report['summary']['Remaining Towers Cost'][owner] += upgrade_cost or 0
-                else:
-                    report['summary']['Remaining Flags Cost'][owner] += upgrade_cost or 0
+    summoner_profile, follower_profile = get_comparison_profiles(summoner, follower)
+    report = pair(summoner_profile['buildings'], follower_profile['buildings'])
 
     _find_comparison_winner(report)
 
     # reverse comparison winner
-    if report['summary']['Remaining Towers Cost']["winner"] == "summoner":
-        report['summary']['Remaining Towers Cost']["winner"] = "follower"
-    elif report['summary']['Remaining Towers Cost']["winner"] == "follower":
-        report['summary']['Remaining Towers Cost']["winner"] = "summoner"
-    if report['summary']['Remaining Flags Cost']["winner"] == "summoner":
-        report['summary']['Remaining Flags Cost']["winner"] = "follower"
-    elif report['summary']['Remaining Flags Cost']["winner"] == "follower":
-        report['summary']['Remaining Flags Cost']["winner"] = "summoner"
-
-    for key, val in report['remaining_costs'].items():
-        if val['winner'] == "summoner":
-            report['remaining_costs'][key]['winner'] = "follower"
-        elif val['winner'] == "follower":
-            report['remaining_costs'][key]['winner'] = "summoner"
+    _reverse_comparison_winner(report['summary']['Remaining Towers Cost'])
+    _reverse_comparison_winner(report['summary']['Remaining Flags Cost'])
+
+    for val in report['remaining_costs'].values():
+        _reverse_comparison_winner(val)
 
     return report
 
@@ -814,8 +580,8 @@ def _compare_monster_objects(mon_s, mon_f):
 
 
 def _compare_monster_rune_sets(s_build, f_build):
-    sets = {"summoner": s_build.active_rune_sets,
-            "follower": f_build.active_rune_sets}
+    sets = {"summoner": RuneBuild.get_active_rune_sets(s_build.runes.all()),
+            "follower": RuneBuild.get_active_rune_sets(f_build.runes.all())}
     sets_without_stat_increase = {"summoner": [], "follower": []}
 
     for owner, sets_ in sets.items():
@@ -875,9 +641,12 @@ def _compare_build_objects(mon_s, mon_f, rta=False):
 
     comparison["Rune sets"] = _compare_monster_rune_sets(
         mon_s_build, mon_f_build)
+    # Runes are prefetched by builds(), so pick the slots from the loaded runes
+    s_runes = {rune.slot: rune for rune in reversed(mon_s_build.runes.all())}
+    f_runes = {rune.slot: rune for rune in reversed(mon_f_build.runes.all())}
     for slot in [2, 4, 6]:
-        s_rune = mon_s_build.runes.filter(slot=slot).first()
-        f_rune = mon_f_build.runes.filter(slot=slot).first()
+        s_rune = s_runes.get(slot)
+        f_rune = f_runes.get(slot)
         comparison[f"Slot {slot}"] = {
             "summoner": s_rune.get_main_stat_display() if s_rune else "",
             "follower": f_rune.get_main_stat_display() if f_rune else "",
@@ -913,6 +682,12 @@ def builds(request, profile_name, follow_username):
             request.POST, summoner_name=profile_name, follower_name=follow_username)
 
         if form.is_valid():
+            # Builds and their runes for both monsters, loaded once for all comparisons
+            prefetch_related_objects(
+                [form.cleaned_data['summoner_monster'], form.cleaned_data['follower_monster']],
+                'default_build__runes',
+                'rta_build__runes',
+            )
             context = {
                 'is_owner': is_owner,
                 'can_compare': can_compare,
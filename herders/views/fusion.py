@@ -5,10 +5,11 @@ from django.http import HttpResponseBadRequest
 from django.shortcuts import render
 
 from bestiary.models import Fusion, ESSENCE_MAP, Monster
-from herders.decorators import username_case_redirect
+from herders.decorators import cache_profile_response, username_case_redirect
 from herders.models import Summoner, MonsterInstance, MonsterPiece, MaterialStorage, MonsterShrineStorage
 
 
+@cache_profile_response()
 def fusion_progress(request, profile_name):
     try:
         summoner = Summoner.objects.select_related('user').get(user__username=profile_name)
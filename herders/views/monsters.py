@@ -15,7 +15,7 @@ from django.template.context_processors import csrf
 from django.urls import reverse
 
 from bestiary.models import Monster, Building, Fusion, ESSENCE_MAP, GameItem
-from herders.decorators import username_case_redirect
+from herders.decorators import cache_profile_response, username_case_redirect
 from herders.filters import MonsterInstanceFilter
 from herders.forms import CompareMonstersForm, FilterMonsterInstanceForm, \
     AddMonsterInstanceForm, BulkAddMonsterInstanceForm, \
@@ -54,6 +54,7 @@ def monsters(request, profile_name):
 
 
 @username_case_redirect
+@cache_profile_response('profile_view_mode', 'profile_group_method')
 def monster_inventory(request, profile_name, view_mode=None, box_grouping=None):
     # If we passed in view mode or sort method, set the session variable and redirect back to ourself without the view mode or box grouping
     if view_mode:
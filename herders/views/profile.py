@@ -2,8 +2,8 @@
 Profile CRUD, import/export, storage, and buildings
 """
 
-import json
 import copy
+import os
 
 from celery.result import AsyncResult
 from django.contrib import messages
@@ -23,10 +23,10 @@ from django.utils.text import slugify
 from herders.decorators import username_case_redirect
 from herders.forms import RegisterUserForm, CrispyChangeUsernameForm, DeleteProfileForm, EditUserForm, \
     EditSummonerForm, EditBuildingForm, ImportSWParserJSONForm
-from herders.models import ArtifactInstance, MonsterInstance, RuneCraftInstance, RuneInstance, Summoner, MaterialStorage, MonsterShrineStorage, Building, BuildingInstance, ArtifactCraftInstance
-from herders.profile_parser import validate_sw_json
+from herders.models import ArtifactInstance, MonsterInstance, RuneCraftInstance, RuneInstance, Summoner, SummonerStatistics, MaterialStorage, MonsterShrineStorage, Building, BuildingInstance, ArtifactCraftInstance
+from herders.profile_stream import ProfileStream, save_profile_upload
 from herders.rune_optimizer_parser import export_win10
-from herders.tasks import com2us_data_import
+from herders.tasks import com2us_stream_import
 from herders.views.compare import _get_efficiency_statistics
 
 from bestiary.models import GameItem, RuneCraft, Rune, Artifact, Monster, Fusion
@@ -649,15 +649,19 @@ def import_sw_json(request, profile_name):
                 summoner.preferences['import_options'] = import_options
                 summoner.save()
 
+            path = None
             try:
-                data = json.load(uploaded_file)
+                path = save_profile_upload(uploaded_file)
+                stream = ProfileStream(path)
             except ValueError as e:
                 errors.append('Unable to parse file: ' + str(e))
-            except AttributeError:
+            except (AttributeError, OSError):
                 errors.append('Issue opening uploaded file. Please try again.')
             else:
-                schema_errors, validation_errors = validate_sw_json(
-                    data, request.user.summoner)
+                try:
+                    schema_errors, validation_errors = stream.validate(request.user.summoner)
+                except ValueError as e:
+                    schema_errors, validation_errors = 'Unable to parse file: ' + str(e), []
 
                 if schema_errors:
                     errors.append(schema_errors)
@@ -667,8 +671,8 @@ def import_sw_json(request, profile_name):
 
                 if not errors and (not validation_failures or import_options['ignore_validation_errors']):
                     # Queue the import
-                    task = com2us_data_import.delay(
-                        data, summoner.pk, import_options)
+                    task = com2us_stream_import.delay(
+                        path, summoner.pk, import_options)
                     request.session['import_task_id'] = task.task_id
 
                     return render(
@@ -676,6 +680,10 @@ def import_sw_json(request, profile_name):
                         'herders/profile/import_export/import_progress.html',
                         context={'profile_name': profile_name}
                     )
+
+            if path:
+                # Not queued for import, which would remove it after reading
+                os.remove(path)
     else:
         form = ImportSWParserJSONForm(
             initial=request.user.summoner.preferences.get('import_options', {})
@@ -812,23 +820,12 @@ def _get_stats_runes(summoner):
         'substats': copy.deepcopy(stats),
     }
     report_runes['innate_stat'][None] = 0
-    runes = RuneInstance.objects.select_related('owner').filter(owner=summoner)
-
-    rune_substats = dict(Rune.STAT_CHOICES)
-
-    report_runes['summary']['Count'] = runes.count()
-    for rune in runes:
-        for sub_stat in rune.substats:
-            report_runes['substats'][rune_substats[sub_stat]] += 1
+    statistics = SummonerStatistics.get_for_summoner(summoner)
 
-        report_runes['stars'][rune.stars] += 1
-        report_runes['sets'][rune.get_type_display()] += 1
-        report_runes['quality'][rune.get_quality_display()] += 1
-        report_runes['quality_original'][rune.get_original_quality_display()] += 1
-        report_runes['slot'][rune.slot] += 1
-        report_runes['main_stat'][rune.get_main_stat_display()] += 1
-        report_runes['innate_stat'][rune.get_innate_stat_display()] += 1
-        report_runes['summary']['Worth'] += rune.value or 0
+    report_runes['summary']['Count'], report_runes['summary']['Worth'] = statistics.summary(RuneInstance)
+    for name, counts in statistics.histograms(RuneInstance).items():
+        for key, num in counts:
+            report_runes[name][key] += num
 
     summoner_eff = _get_efficiency_statistics(RuneInstance, summoner)
     for key in summoner_eff.keys():
@@ -960,20 +957,12 @@ def _get_stats_artifacts(summoner):
         'main_stat': {stat[1]: 0 for stat in sorted(Artifact.MAIN_STAT_CHOICES, key=lambda x: x[1])},
         'substats': {effect[1]: 0 for effect in sorted(Artifact.EFFECT_CHOICES, key=lambda x: x[1])},
     }
-    artifacts = ArtifactInstance.objects.select_related(
-        'owner').filter(owner=summoner)
-
-    artifact_substats = dict(Artifact.EFFECT_CHOICES)
-
-    report['summary']['Count'] = artifacts.count()
-    for artifact in artifacts:
-        for sub_stat in artifact.effects:
-            report['substats'][artifact_substats[sub_stat]] += 1
+    statistics = SummonerStatistics.get_for_summoner(summoner)
 
-        report['quality'][artifact.get_quality_display()] += 1
-        report['quality_original'][artifact.get_original_quality_display()] += 1
-        report['slot'][artifact.get_precise_slot_display()] += 1
-        report['main_stat'][artifact.get_main_stat_display()] += 1
+    report['summary']['Count'], _ = statistics.summary(ArtifactInstance)
+    for name, counts in statistics.histograms(ArtifactInstance).items():
+        for key, num in counts:
+            report[name][key] += num
 
     summoner_eff = _get_efficiency_statistics(ArtifactInstance, summoner)
     for key in summoner_eff.keys():
@@ -2,17 +2,19 @@ from collections import OrderedDict
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db.models import F
 from django.http import HttpResponseForbidden, JsonResponse, HttpResponse, HttpResponseBadRequest
 from django.shortcuts import render, get_object_or_404
 from django.template import loader
 from django.template.context_processors import csrf
 from django.urls import reverse
 
-from herders.decorators import username_case_redirect
+from bestiary.rune_efficiency import recompute_rune_fields
+from herders.decorators import cache_profile_response, username_case_redirect
 from herders.filters import RuneInstanceFilter
 from herders.forms import FilterRuneForm, \
     AddRuneInstanceForm, AssignRuneForm, AddRuneCraftInstanceForm
-from herders.models import Summoner, MonsterInstance, RuneInstance, \
+from herders.models import Summoner, SummonerStatistics, MonsterInstance, RuneInstance, \
     RuneCraftInstance
 
 
@@ -44,6 +46,7 @@ def runes(request, profile_name):
 
 
 @username_case_redirect
+@cache_profile_response('rune_inventory_view_mode', 'rune_inventory_box_method')
 def rune_inventory(request, profile_name, view_mode=None, box_grouping=None):
     # If we passed in view mode or sort method, set the session variable and redirect back to base profile URL
     if view_mode:
@@ -88,81 +91,20 @@ def rune_inventory(request, profile_name, view_mode=None, box_grouping=None):
 
     if is_owner or summoner.public:
         if view_mode == 'box':
-            rune_box = []
             if box_grouping == 'slot':
-                rune_box.append({
-                    'name': 'Slot 1',
-                    'runes': rune_filter.qs.filter(slot=1)
-                })
-                rune_box.append({
-                    'name': 'Slot 2',
-                    'runes': rune_filter.qs.filter(slot=2)
-                })
-                rune_box.append({
-                    'name': 'Slot 3',
-                    'runes': rune_filter.qs.filter(slot=3)
-                })
-                rune_box.append({
-                    'name': 'Slot 4',
-                    'runes': rune_filter.qs.filter(slot=4)
-                })
-                rune_box.append({
-                    'name': 'Slot 5',
-                    'runes': rune_filter.qs.filter(slot=5)
-                })
-                rune_box.append({
-                    'name': 'Slot 6',
-                    'runes': rune_filter.qs.filter(slot=6)
-                })
+                rune_box = _group_runes(rune_filter.qs, lambda rune: rune.slot, [
+                    (slot, f'Slot {slot}') for slot in range(1, 7)
+                ])
             elif box_grouping == 'grade':
-                rune_box.append({
-                    'name': '6*',
-                    'runes': rune_filter.qs.filter(stars=6)
-                })
-                rune_box.append({
-                    'name': '5*',
-                    'runes': rune_filter.qs.filter(stars=5)
-                })
-                rune_box.append({
-                    'name': '4*',
-                    'runes': rune_filter.qs.filter(stars=4)
-                })
-                rune_box.append({
-                    'name': '3*',
-                    'runes': rune_filter.qs.filter(stars=3)
-                })
-                rune_box.append({
-                    'name': '2*',
-                    'runes': rune_filter.qs.filter(stars=2)
-                })
-                rune_box.append({
-                    'name': '1*',
-                    'runes': rune_filter.qs.filter(stars=1)
-                })
+                rune_box = _group_runes(rune_filter.qs, lambda rune: rune.stars, [
+                    (stars, f'{stars}*') for stars in range(6, 0, -1)
+                ])
             elif box_grouping == 'equipped':
-                rune_box.append({
-                    'name': 'Not Equipped',
-                    'runes': rune_filter.qs.filter(assigned_to__isnull=True)
-                })
-
-                # Create a dictionary of monster PKs and their equipped runes
-                monsters = OrderedDict()
-                for rune in rune_filter.qs.filter(assigned_to__isnull=False).select_related('assigned_to', 'assigned_to__monster').order_by('assigned_to__monster__name', 'slot'):
-                    if rune.assigned_to.pk not in monsters:
-                        monsters[rune.assigned_to.pk] = {
-                            'name': str(rune.assigned_to),
-                            'runes': []
-                        }
-
-                    monsters[rune.assigned_to.pk]['runes'].append(rune)
-                for monster_runes in monsters.values():
-                    rune_box.append(monster_runes)
+                rune_box = _group_runes_by_monster(rune_filter.qs)
             elif box_grouping == 'type':
-                for (type, type_name) in RuneInstance.TYPE_CHOICES:
-                    rune_box.append({
-                        'name': type_name,
-                        'runes': rune_filter.qs.filter(type=type)
-                    })
+                rune_box = _group_runes(rune_filter.qs, lambda rune: rune.type, RuneInstance.TYPE_CHOICES)
+            else:
+                rune_box = []
 
             context['runes'] = rune_box
             context['box_grouping'] = box_grouping
@@ -177,6 +119,42 @@ def rune_inventory(request, profile_name, view_mode=None, box_grouping=None):
         return render(request, 'herders/profile/not_public.html', context)
 
 
+def _group_runes(runes, key, groups):
+    """
+    Split runes into box view groups in a single pass, keeping the queryset order within each group.
+
+    :param key: Function returning the group value of a rune
+    :param groups: (value, name) pairs in display order. Runes with any other value are not shown.
+    """
+    rune_box = OrderedDict((value, {'name': name, 'runes': []}) for value, name in groups)
+
+    for rune in runes:
+        group = rune_box.get(key(rune))
+        if group is not None:
+            group['runes'].append(rune)
+
+    return list(rune_box.values())
+
+
+def _group_runes_by_monster(runes):
+    # Unequipped runes first, then one group per monster ordered by monster name
+    rune_box = OrderedDict([(None, {'name': 'Not Equipped', 'runes': []})])
+    runes = runes.order_by(
+        F('assigned_to__monster__name').asc(nulls_first=True), 'assigned_to', 'slot', 'type', 'level'
+    )
+
+    for rune in runes:
+        if rune.assigned_to_id not in rune_box:
+            rune_box[rune.assigned_to_id] = {
+                'name': str(rune.assigned_to),
+                'runes': [],
+            }
+
+        rune_box[rune.assigned_to_id]['runes'].append(rune)
+
+    return list(rune_box.values())
+
+
 @username_case_redirect
 def rune_inventory_crafts(request, profile_name):
     try:
@@ -523,8 +501,10 @@ def rune_resave_all(request, profile_name):
     is_owner = (request.user.is_authenticated and summoner.user == request.user)
 
     if is_owner:
-        for r in RuneInstance.objects.filter(owner=summoner, substats__isnull=True):
-            r.save()
+        if recompute_rune_fields(RuneInstance.objects.filter(owner=summoner, substats__isnull=True)):
+            # Runes are updated in bulk without post_save signals, so touch the profile once
+            summoner.save()
+            SummonerStatistics.mark_stale([summoner.pk])
 
         response_data = {
             'code': 'success',
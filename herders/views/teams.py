@@ -6,12 +6,13 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 
 from bestiary.models import SkillEffect
-from herders.decorators import username_case_redirect
+from herders.decorators import cache_profile_response, username_case_redirect
 from herders.forms import AddTeamGroupForm, EditTeamGroupForm, DeleteTeamGroupForm, EditTeamForm
 from herders.models import Summoner, MonsterInstance, TeamGroup, Team
 
 
 @username_case_redirect
+@cache_profile_response()
 def teams(request, profile_name):
     return_path = request.GET.get(
         'next',
@@ -40,6 +41,7 @@ def teams(request, profile_name):
         return render(request, 'herders/profile/not_public.html', context)
 
 
+@cache_profile_response()
 def team_list(request, profile_name):
     try:
         summoner = Summoner.objects.select_related('user').get(user__username=profile_name)
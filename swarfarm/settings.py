@@ -1,5 +1,6 @@
 import datetime
 import os
+import tempfile
 
 import environ
 
@@ -12,8 +13,9 @@ env = environ.Env(
     CORS_ALLOWED_ORIGINS=(list, []),
     SITE_ID=(int, 1),
     COMPRESS_ENABLED=(bool, False),
-    CACHE_BACKEND=(str, 'django.core.cache.backends.dummy.DummyCache'),
+    CACHE_BACKEND=(str, 'django.core.cache.backends.locmem.LocMemCache'),
     CACHE_LOCATION=(str, 'swarfarm'),
+    LOCAL_CACHE_MAX_ENTRIES=(int, 10000),
     EMAIL_BACKEND=(str, 'django.core.mail.backends.console.EmailBackend'),
     EMAIL_HOST=(str, ''),
     EMAIL_PORT=(int, 587),
@@ -21,6 +23,14 @@ env = environ.Env(
     EMAIL_HOST_PASSWORD=(str, ''),
     EMAIL_FROM=(str, ''),
     CELERY_BROKER=(str, 'amqp://'),
+    LOG_QUEUE_ENABLED=(bool, False),
+    LOG_QUEUE_BATCH_SIZE=(int, 100),
+    LOG_QUEUE_MAX_ATTEMPTS=(int, 3),
+    LOG_PARTITION_MONTHS_AHEAD=(int, 2),
+    LOG_ARCHIVE_AFTER_DAYS=(int, 365),
+    LOG_DROP_AFTER_DAYS=(int, None),
+    LEVEL_REPORTS=(str, 'full'),
+    PROFILE_IMPORT_DIR=(str, os.path.join(tempfile.gettempdir(), 'swarfarm_imports')),
     GOOGLE_API_KEY=(str, ''),
     RECAPTCHA_PUBLIC_KEY=(str, ''),
     RECAPTCHA_PRIVATE_KEY=(str, ''),
@@ -218,11 +228,21 @@ DATABASES['default']['TEST'] = {
 }
 
 # Cache
+# 'default' must be shared between processes in production, e.g. CACHE_BACKEND=redis_cache.RedisCache (see
+# .env.example-docker). Without a configured backend it is an in-process cache for development and tests, so nothing
+# outlives the process. 'local' is an in-process LRU cache for bestiary data, see bestiary/cache.py.
 CACHES = {
     'default': {
         'BACKEND': env('CACHE_BACKEND'),
         'LOCATION': env('CACHE_LOCATION'),
-    }
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'swarfarm-local',
+        'OPTIONS': {
+            'MAX_ENTRIES': env('LOCAL_CACHE_MAX_ENTRIES'),
+        },
+    },
 }
 
 # Celery
@@ -231,6 +251,40 @@ CELERY_RESULT_BACKEND = 'django-db'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_TRACK_STARTED = True
 
+# Log ingestion
+# When enabled the log upload endpoint only stages payloads in PendingLog.
+# data_log.tasks.process_log_queue must be scheduled with celery beat to parse them. Logs which fail to parse are
+# retried up to LOG_QUEUE_MAX_ATTEMPTS times and then kept in PendingLog with their error.
+LOG_QUEUE_ENABLED = env('LOG_QUEUE_ENABLED')
+LOG_QUEUE_BATCH_SIZE = env('LOG_QUEUE_BATCH_SIZE')
+LOG_QUEUE_MAX_ATTEMPTS = env('LOG_QUEUE_MAX_ATTEMPTS')
+
+# Log retention
+# Log tables are partitioned by month. data_log.tasks.maintain_log_partitions must be scheduled with celery beat to
+# create upcoming partitions and retire old ones. Partitions are archived (detached along with the drops of their
+# logs) archive_after days after their last day, and dropped drop_after days after their last day, or never if None.
+# Entries other than 'default' override it for one log model.
+LOG_PARTITION_MONTHS_AHEAD = env('LOG_PARTITION_MONTHS_AHEAD')
+LOG_RETENTION = {
+    'default': {
+        'archive_after': env('LOG_ARCHIVE_AFTER_DAYS'),
+        'drop_after': env('LOG_DROP_AFTER_DAYS'),
+    },
+    'FullLog': {
+        'archive_after': 90,
+        'drop_after': 365,
+    },
+}
+
+# Level reports
+# How generate_all_reports builds dungeon and rift raid reports: 'full' from the raw logs, 'incremental' from the
+# per-level day buckets of LevelReportAggregate or 'rollup' from the daily LevelLogRollup rows. See data_log.reports.
+LEVEL_REPORTS = env('LEVEL_REPORTS')
+
+# Profile import
+# Uploaded profile exports are saved here until the import task has read them, so workers must be able to read it.
+PROFILE_IMPORT_DIR = env('PROFILE_IMPORT_DIR')
+
 # Session config
 SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 
@@ -299,6 +353,8 @@ REST_FRAMEWORK = {
 REST_FRAMEWORK_EXTENSIONS = {
     'DEFAULT_CACHE_RESPONSE_TIMEOUT': 60 * 60,
     'DEFAULT_CACHE_ERRORS': False,
+    'DEFAULT_OBJECT_CACHE_KEY_FUNC': 'bestiary.cache.object_cache_key_func',
+    'DEFAULT_LIST_CACHE_KEY_FUNC': 'bestiary.cache.list_cache_key_func',
 }
 
 JWT_AUTH = {